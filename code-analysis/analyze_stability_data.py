@@ -1,13 +1,44 @@
 import argparse
-import json
 import os
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+from bootstrap import summary_ci
+from data_store import load_stability
+from plotting import stability_groups, use_headless_backend, violin_plot
+
 
 def main():
     parser = argparse.ArgumentParser()
-    parser.add_argument("--input-file", help="Path to the stability raw data file")
+    parser.add_argument(
+        "--input-file",
+        help="Path to the stability raw data file (JSON or Parquet) or dataset folder",
+    )
+    parser.add_argument("--models", nargs="+", help="Analyze only these models")
+    parser.add_argument(
+        "--bootstrap",
+        type=int,
+        default=0,
+        help="Number of bootstrap resamples of the confidence intervals (0 to skip them)",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the bootstrap")
+    parser.add_argument(
+        "--workers", type=int, default=1, help="Processes computing the bootstrap"
+    )
+
+    parser.add_argument(
+        "--fast-plots",
+        action="store_true",
+        help="Render the plots from precomputed densities and quartiles (see plotting.py)",
+    )
+    parser.add_argument(
+        "--facet", action="store_true", help="One plot per model (with --fast-plots)"
+    )
+    parser.add_argument(
+        "--output-file",
+        default="violin-similarities.svg",
+        help="Path of the plot, the extension gives the format (svg, png, pdf, ...)",
+    )
 
     args = parser.parse_args()
     input_file = args.input_file
@@ -17,10 +48,35 @@ def main():
     font_weight = "bold"
 
     assert os.path.exists(input_file), f"The file {input_file} does not exist"
-    assert input_file.endswith(".json"), f"The file {input_file} must be a json file"
+    assert (
+        input_file.endswith(".json")
+        or input_file.endswith(".parquet")
+        or os.path.isdir(input_file)
+    ), f"The file {input_file} must be a json or parquet file, or a dataset folder"
+
+    data = load_stability(path=input_file, models=args.models)
+
+    X_LABELS = ["Cli", "Csv", "Lang", "Gson", "Chart"]
+
+    if args.bootstrap > 0:
+        for model in data.keys():
+            # the project names are stored in the Parquet data, not in the JSON one
+            projects = data[model].get("projects", X_LABELS)
+            for project, similarities in zip(projects, data[model]["similarities"]):
+                print(
+                    f"Similarities {model} {project}: "
+                    f"{summary_ci(a=similarities, resamples=args.bootstrap, seed=args.seed, workers=args.workers)}"
+                )
 
-    with open(input_file, "r+", encoding="utf-8") as f:
-        data = json.load(f)
+    if args.fast_plots:
+        use_headless_backend()
+        violin_plot(
+            data=stability_groups(data=data, default_projects=X_LABELS),
+            output_file=args.output_file,
+            ylabel="Cosine Similarity",
+            facet=args.facet,
+        )
+        return
 
     all_data = []
     for i, model in enumerate(data.keys()):
@@ -30,11 +86,10 @@ def main():
     # data = data["gpt-3.5-turbo"]["similarities"] + data["gpt-4"]["similarities"]
 
     CUSTOM_PALETTE = ["blue", "orange", "green", "red", "purple"]
-    X_LABELS = ["Cli", "Csv", "Lang", "Gson", "Chart"]
     custom_palette = []
     x_labels = []
-    for i in range(len(data.keys())):
-        x_labels += X_LABELS
+    for i, model in enumerate(data.keys()):
+        x_labels += data[model].get("projects", X_LABELS)
         custom_palette += CUSTOM_PALETTE
         if i != len(data.keys()) - 1:
             x_labels += [" "]
@@ -48,7 +103,7 @@ def main():
     plt.xticks(range(len(x_labels)), x_labels)
     plt.xticks(rotation=15)
     plt.tight_layout()
-    plt.savefig("violin-similarities.svg", format="svg")
+    plt.savefig(args.output_file)
 
 
 if __name__ == "__main__":
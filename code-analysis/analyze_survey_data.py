@@ -1,17 +1,58 @@
 import argparse
-import json
 import os
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+from bootstrap import bootstrap, summary_ci
+from data_store import load_survey
 from effect_size import cohend
+from plotting import box_plot, use_headless_backend
 from power_analysis import parametric_power_analysis
+from stats_engine import all_pairs_tests
 from stats_tests import summary, wilcoxon_test
 
 
 def main():
     parser = argparse.ArgumentParser()
-    parser.add_argument("--input-file", help="Path to the survey raw data file")
+    parser.add_argument(
+        "--input-file", help="Path to the survey raw data file (JSON or Parquet)"
+    )
+    parser.add_argument("--models", nargs="+", help="Analyze only these models")
+    parser.add_argument(
+        "--all-pairs",
+        action="store_true",
+        help="Compare every pair of models instead of every model with dev-written",
+    )
+    parser.add_argument(
+        "--correction",
+        default="holm",
+        help="Multiple-comparison correction of the all-pairs tests (holm, bonferroni, fdr_bh, ...)",
+    )
+    parser.add_argument(
+        "--output-csv", help="Path to save the table of the all-pairs tests"
+    )
+
+    parser.add_argument(
+        "--bootstrap",
+        type=int,
+        default=0,
+        help="Number of bootstrap resamples of the confidence intervals (0 to skip them)",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the bootstrap")
+    parser.add_argument(
+        "--workers", type=int, default=1, help="Processes computing the bootstrap"
+    )
+
+    parser.add_argument(
+        "--fast-plots",
+        action="store_true",
+        help="Render the plot from precomputed quartiles (see plotting.py)",
+    )
+    parser.add_argument(
+        "--output-file",
+        default="boxplots.svg",
+        help="Path of the plot, the extension gives the format (svg, png, pdf, ...)",
+    )
 
     args = parser.parse_args()
     input_file = args.input_file
@@ -26,10 +67,11 @@ def main():
     font_weight = "bold"
 
     assert os.path.exists(input_file), f"The file {input_file} does not exist"
-    assert input_file.endswith(".json"), f"The file {input_file} must be a json file"
+    assert input_file.endswith(".json") or input_file.endswith(
+        ".parquet"
+    ), f"The file {input_file} must be a json or parquet file"
 
-    with open(input_file, "r+", encoding="utf-8") as f:
-        data = json.load(f)
+    data = load_survey(path=input_file, models=args.models)
 
     models = list(data.keys())
     X_LABELS = models
@@ -39,30 +81,73 @@ def main():
     values_model_dev_written = data[model_dev_written]["scores"]
     print(f"Scores {model_dev_written}: {summary(a=values_model_dev_written)}")
 
-    for model in models:
-
-        if model == model_dev_written:
-            continue
-
-        values_1 = data[model_dev_written]["scores"]
-        values_2 = data[model]["scores"]
-
-        print(f"Scores {model}: {summary(a=values_2)}")
-
-        _, p_value = wilcoxon_test(a=values_1, b=values_2)
-        if p_value < alpha:
-            print(
-                f"The models {model_dev_written} and {model} are significantly different"
-            )
-        else:
-            effect_size, _ = cohend(a=values_1, b=values_2)
-            nobs = parametric_power_analysis(
-                effect=effect_size, alpha=alpha, power=power
-            )
+    if args.all_pairs:
+        results = all_pairs_tests(
+            data={model: data[model]["scores"] for model in models},
+            alpha=alpha,
+            correction=args.correction,
+        )
+        print(results.to_string(index=False))
+        if args.output_csv:
+            results.to_csv(args.output_csv, index=False)
+    else:
+        for model in models:
+
+            if model == model_dev_written:
+                continue
+
+            values_1 = data[model_dev_written]["scores"]
+            values_2 = data[model]["scores"]
+
+            print(f"Scores {model}: {summary(a=values_2)}")
+
+            _, p_value = wilcoxon_test(a=values_1, b=values_2)
+            if p_value < alpha:
+                print(
+                    f"The models {model_dev_written} and {model} are significantly different"
+                )
+            else:
+                effect_size, _ = cohend(a=values_1, b=values_2)
+                nobs = parametric_power_analysis(
+                    effect=effect_size, alpha=alpha, power=power
+                )
+                print(
+                    f"The models {model_dev_written} and {model} are not significantly different. "
+                    f"The number of observations needed for statistical significance is {nobs} (with a power of {power})"
+                )
+
+    if args.bootstrap > 0:
+        for model in models:
+            values = data[model]["scores"]
             print(
-                f"The models {model_dev_written} and {model} are not significantly different. "
-                f"The number of observations needed for statistical significance is {nobs} (with a power of {power})"
+                f"Scores {model}: {summary_ci(a=values, resamples=args.bootstrap, seed=args.seed, workers=args.workers)}"
             )
+            if model == model_dev_written:
+                continue
+
+            for statistic in ["cohend", "a12"]:
+                # the scores of the models are paired, as in the Wilcoxon test
+                estimate, low, high = bootstrap(
+                    statistic=statistic,
+                    a=values_model_dev_written,
+                    b=values,
+                    resamples=args.bootstrap,
+                    seed=args.seed,
+                    paired=True,
+                    workers=args.workers,
+                )
+                print(
+                    f"{statistic} {model_dev_written} vs {model}: {estimate} [{low}, {high}]"
+                )
+
+    if args.fast_plots:
+        use_headless_backend()
+        box_plot(
+            data={model: data[model]["scores"] for model in models},
+            output_file=args.output_file,
+            ylabel="Redability Scores",
+        )
+        return
 
     values = list(map(lambda x: x["scores"], list(data.values())))
 
@@ -75,7 +160,7 @@ def main():
     # plt.boxplot(values, labels=models)
     plt.xticks(rotation=15)
     plt.tight_layout()
-    plt.savefig("boxplots.svg", format="svg")
+    plt.savefig(args.output_file)
 
 
 if __name__ == "__main__":
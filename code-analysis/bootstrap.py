@@ -0,0 +1,123 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from effect_size import cohend_batch, vargha_delaney_unpaired_batch
+
+STATISTICS = ["mean", "median", "cohend", "a12"]
+
+# Upper bound of the memory used by the resampled values of a chunk of resamples
+MAX_CHUNK_BYTES = 64 * 1024 * 1024
+
+
+def _statistic_batch(statistic: str, a: np.ndarray, b: Optional[np.ndarray]) -> np.ndarray:
+    # statistic of every row of a (and of the same row of b for the two-sample statistics)
+    if statistic == "mean":
+        return np.mean(a, axis=1)
+    if statistic == "median":
+        return np.median(a, axis=1)
+    if statistic == "cohend":
+        return cohend_batch(a=a, b=b)[0]
+    if statistic == "a12":
+        return vargha_delaney_unpaired_batch(a=a, b=b)[0]
+    raise ValueError(f"Unknown statistic {statistic}, must be one of {STATISTICS}")
+
+
+def _bootstrap_chunk(
+    args: Tuple[str, np.ndarray, Optional[np.ndarray], int, bool, np.random.SeedSequence]
+) -> np.ndarray:
+    statistic, a, b, resamples, paired, seed = args
+    rng = np.random.default_rng(seed)
+
+    # resamples x n index matrix, one bootstrap sample per row
+    index_a = rng.integers(0, len(a), size=(resamples, len(a)))
+    if b is None:
+        return _statistic_batch(statistic=statistic, a=a[index_a], b=None)
+
+    index_b = index_a if paired else rng.integers(0, len(b), size=(resamples, len(b)))
+    return _statistic_batch(statistic=statistic, a=a[index_a], b=b[index_b])
+
+
+def _chunk_sizes(resamples: int, n: int, max_chunk_bytes: int) -> List[int]:
+    # the index matrix (int64) and the resampled values (float64) take 16 bytes per value
+    size = max(1, min(resamples, max_chunk_bytes // (16 * n)))
+    return [min(size, resamples - start) for start in range(0, resamples, size)]
+
+
+def bootstrap(
+    statistic: str,
+    a: List[float],
+    b: Optional[List[float]] = None,
+    resamples: int = 10000,
+    confidence: float = 0.95,
+    seed: int = 0,
+    paired: bool = False,
+    workers: int = 1,
+    max_chunk_bytes: int = MAX_CHUNK_BYTES,
+) -> Tuple[float, float, float]:
+    """
+    Computes a percentile bootstrap confidence interval of a statistic.
+    The resamples are drawn in chunks whose size is bounded by max_chunk_bytes, each chunk
+    with its own generator spawned from the seed: the same seed (and chunk size) gives the
+    same interval whatever the number of workers.
+    :param statistic: one of mean, median (of a), cohend, a12 (of a against b)
+    :param a: a numeric list
+    :param b: another numeric list, for the two-sample statistics
+    :param resamples: the number of bootstrap resamples
+    :param confidence: the confidence level of the interval
+    :param seed: the seed of the resampling
+    :param paired: resample a and b with the same indices (e.g. the scores of the same raters)
+    :param workers: the number of processes, 1 computes the chunks in the current process
+    :param max_chunk_bytes: the memory used by a chunk of resamples
+    :returns the estimate on the original samples and the lower and upper bounds of the interval
+    """
+    assert statistic in STATISTICS, f"Unknown statistic {statistic}, must be one of {STATISTICS}"
+    assert (b is None) == (statistic in ["mean", "median"]), f"{statistic} needs {'two samples' if b is None else 'one sample'}"
+    assert 0 < confidence < 1, "The confidence must be between 0 and 1"
+
+    a = np.asarray(a, dtype=np.float64)
+    b = None if b is None else np.asarray(b, dtype=np.float64)
+    if paired:
+        assert b is not None and len(a) == len(b), "Paired samples must have the same length"
+
+    estimate = float(_statistic_batch(statistic=statistic, a=a[None, :], b=None if b is None else b[None, :])[0])
+
+    n = len(a) + (0 if b is None or paired else len(b))
+    sizes = _chunk_sizes(resamples=resamples, n=n, max_chunk_bytes=max_chunk_bytes)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    chunks = [(statistic, a, b, size, paired, chunk_seed) for size, chunk_seed in zip(sizes, seeds)]
+
+    if workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            values = list(executor.map(_bootstrap_chunk, chunks))
+    else:
+        values = [_bootstrap_chunk(chunk) for chunk in chunks]
+    values = np.concatenate(values)
+
+    tail = (1 - confidence) / 2 * 100
+    low, high = np.nanpercentile(values, [tail, 100 - tail])
+
+    return estimate, float(low), float(high)
+
+
+def summary_ci(
+    a: List[float],
+    resamples: int = 10000,
+    confidence: float = 0.95,
+    seed: int = 0,
+    workers: int = 1,
+) -> str:
+    intervals = []
+    for statistic in ["mean", "median"]:
+        estimate, low, high = bootstrap(
+            statistic=statistic,
+            a=a,
+            resamples=resamples,
+            confidence=confidence,
+            seed=seed,
+            workers=workers,
+        )
+        intervals.append(f"{statistic.capitalize()}: {estimate} [{low}, {high}]")
+
+    return ", ".join(intervals) + f" ({confidence:.0%} CI, {resamples} resamples)"
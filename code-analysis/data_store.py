@@ -0,0 +1,262 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+from typing import Dict, List, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Long (one row per observation) columnar layout of the survey and stability data
+SURVEY_COLUMNS = ["model", "observation", "score"]
+STABILITY_COLUMNS = ["model", "project", "observation", "similarity"]
+
+# Columns of the similarities written by the readability improvement tool (EmbeddingsHelper),
+# in "embeddings results/similarities_<run id>.parquet" of every project
+PIPELINE_SIMILARITY_COLUMNS = ["model", "project", "suite", "test_index", "rep_i", "rep_j", "similarity"]
+PIPELINE_SIMILARITY_PATTERN = ("similarities_", ".parquet")
+
+# Files already ingested in a stability dataset folder (ignored by the Parquet reader as it starts with _)
+MANIFEST_FILENAME = "_manifest.json"
+
+
+def survey_json_to_table(data: Dict[str, Dict[str, List[float]]]) -> pa.Table:
+    models, observations, scores = [], [], []
+    for model, values in data.items():
+        models += [model] * len(values["scores"])
+        observations += list(range(len(values["scores"])))
+        scores += values["scores"]
+
+    return pa.table(
+        {
+            "model": pa.array(models, type=pa.string()),
+            "observation": pa.array(observations, type=pa.int32()),
+            "score": pa.array(scores, type=pa.float64()),
+        }
+    )
+
+
+def stability_json_to_table(
+    data: Dict[str, Dict[str, List[List[float]]]], project_names: Optional[List[str]] = None
+) -> pa.Table:
+    models, projects, observations, similarities = [], [], [], []
+    for model, values in data.items():
+        for i, project_similarities in enumerate(values["similarities"]):
+            project = project_names[i] if project_names else str(i)
+            models += [model] * len(project_similarities)
+            projects += [project] * len(project_similarities)
+            observations += list(range(len(project_similarities)))
+            similarities += project_similarities
+
+    return pa.table(
+        {
+            "model": pa.array(models, type=pa.string()),
+            "project": pa.array(projects, type=pa.string()),
+            "observation": pa.array(observations, type=pa.int32()),
+            "similarity": pa.array(similarities, type=pa.float64()),
+        }
+    )
+
+
+def convert_json(
+    input_file: str, output_file: str, project_names: Optional[List[str]] = None
+) -> pa.Table:
+    """
+    Converts a survey ({model: {"scores": [...]}}) or stability ({model: {"similarities": [[...], ...]}})
+    JSON file to Parquet.
+    :param input_file: the path of the JSON file
+    :param output_file: the path of the Parquet file
+    :param project_names: the names of the projects of the stability data, in the order of the lists
+    :returns the converted table
+    """
+    with open(input_file, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    first = next(iter(data.values()))
+    if "scores" in first:
+        table = survey_json_to_table(data=data)
+    else:
+        table = stability_json_to_table(data=data, project_names=project_names)
+
+    pq.write_table(table, output_file)
+    return table
+
+
+def read_table(
+    path: str, columns: List[str], models: Optional[List[str]] = None
+) -> pa.Table:
+    """
+    Reads the given columns of a Parquet file (or of a folder of Parquet files), memory mapped.
+    :param path: the path of the Parquet file or folder
+    :param columns: the columns to read
+    :param models: read only the rows of these models
+    :returns the table
+    """
+    filters = [("model", "in", list(models))] if models else None
+    return pq.read_table(path, columns=columns, filters=filters, memory_map=True)
+
+
+def _file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _similarity_files(sources: List[str]) -> List[str]:
+    files = []
+    for source in sources:
+        if os.path.isfile(source):
+            files.append(source)
+            continue
+        for root, _, filenames in os.walk(source):
+            files += [
+                os.path.join(root, filename)
+                for filename in sorted(filenames)
+                if filename.startswith(PIPELINE_SIMILARITY_PATTERN[0])
+                and filename.endswith(PIPELINE_SIMILARITY_PATTERN[1])
+            ]
+    return files
+
+
+def ingest_similarities(dataset_path: str, sources: List[str]) -> List[str]:
+    """
+    Adds the similarities written by the readability improvement tool to a stability dataset folder,
+    which the analysis reads as a single table. Only the files not ingested yet (by content) are added.
+    :param dataset_path: the dataset folder, created if needed
+    :param sources: similarities_<run id>.parquet files, or folders searched for them (e.g. the output folder of the tool)
+    :returns the paths of the added files
+    """
+    os.makedirs(dataset_path, exist_ok=True)
+    manifest_path = os.path.join(dataset_path, MANIFEST_FILENAME)
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+
+    added = []
+    for source in _similarity_files(sources=sources):
+        digest = _file_hash(path=source)
+        if digest in manifest:
+            continue
+
+        schema = pq.read_schema(source)
+        missing = [name for name in PIPELINE_SIMILARITY_COLUMNS if name not in schema.names]
+        assert not missing, f"The file {source} misses the columns {missing}"
+
+        part = os.path.join(dataset_path, f"part-{digest[:16]}.parquet")
+        shutil.copyfile(source, part)
+        manifest[digest] = {"source": os.path.abspath(source), "part": os.path.basename(part)}
+        added.append(part)
+
+    # replace the manifest only once it is complete
+    with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+    return added
+
+
+def _is_parquet(path: str) -> bool:
+    return os.path.isdir(path) or path.endswith(".parquet")
+
+
+def _load_json(path: str, models: Optional[List[str]] = None) -> Dict:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    if models:
+        data = {model: values for model, values in data.items() if model in models}
+    return data
+
+
+def load_survey(path: str, models: Optional[List[str]] = None) -> Dict[str, Dict[str, List[float]]]:
+    """
+    Loads the survey scores from a JSON or Parquet file.
+    :param path: the path of the data
+    :param models: load only these models
+    :returns {model: {"scores": [...]}}, as in the JSON file
+    """
+    if not _is_parquet(path):
+        return _load_json(path=path, models=models)
+
+    columns = read_table(path=path, columns=["model", "score"], models=models).to_pydict()
+
+    data = {}
+    for model, score in zip(columns["model"], columns["score"]):
+        data.setdefault(model, {"scores": []})["scores"].append(score)
+    return data
+
+
+def load_stability(path: str, models: Optional[List[str]] = None) -> Dict[str, Dict[str, List]]:
+    """
+    Loads the stability similarities from a JSON or Parquet file.
+    :param path: the path of the data (a JSON or Parquet file, or a dataset folder, see ingest_similarities)
+    :param models: load only these models
+    :returns {model: {"similarities": [[...] per project], "projects": [...]}}, as in the JSON file
+    (the project names are only available in Parquet files)
+    """
+    if not _is_parquet(path):
+        return _load_json(path=path, models=models)
+
+    columns = read_table(
+        path=path, columns=["model", "project", "similarity"], models=models
+    ).to_pydict()
+
+    grouped = {}
+    for model, project, similarity in zip(columns["model"], columns["project"], columns["similarity"]):
+        grouped.setdefault(model, {}).setdefault(project, []).append(similarity)
+
+    return {
+        model: {"similarities": list(projects.values()), "projects": list(projects.keys())}
+        for model, projects in grouped.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    convert = subparsers.add_parser(
+        "convert", help="Convert a survey or stability JSON file to Parquet"
+    )
+    convert.add_argument("--input-file", required=True, help="Path to the JSON file")
+    convert.add_argument("--output-file", help="Path to the Parquet file")
+    convert.add_argument(
+        "--project-names",
+        nargs="+",
+        help="Names of the projects of the stability data, in the order of the lists",
+    )
+
+    ingest = subparsers.add_parser(
+        "ingest",
+        help="Add the similarities of new runs of the readability improvement tool to a stability dataset",
+    )
+    ingest.add_argument("--dataset", required=True, help="Path to the dataset folder")
+    ingest.add_argument(
+        "sources",
+        nargs="+",
+        help="similarities_<run id>.parquet files or folders containing them (e.g. the output folder of the tool)",
+    )
+
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        assert os.path.exists(args.input_file), f"The file {args.input_file} does not exist"
+        output_file = args.output_file or os.path.splitext(args.input_file)[0] + ".parquet"
+        table = convert_json(
+            input_file=args.input_file,
+            output_file=output_file,
+            project_names=args.project_names,
+        )
+        print(f"{table.num_rows} rows written to {output_file}")
+
+    elif args.command == "ingest":
+        added = ingest_similarities(dataset_path=args.dataset, sources=args.sources)
+        print(f"{len(added)} new files ingested in {args.dataset}")
+
+
+if __name__ == "__main__":
+    main()
@@ -37,6 +37,28 @@ def cohend(a: List[float], b: List[float]) -> Tuple[float, str]:
     return effect_size, _get_cohend_thresholds(effect_size=effect_size)
 
 
+def cohend_batch(a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, List[str]]:
+    """
+    Computes Cohen's d of many pairs of samples of the same length at once (see cohend).
+    :param a: a 2-D array, one sample per row (k x m)
+    :param b: another 2-D array, one sample per row (k x m)
+    :returns the k effect sizes and their magnitudes
+    """
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    assert a.shape == b.shape, "The two arrays must have the same shape: {}, {}".format(
+        a.shape, b.shape
+    )
+
+    m = n = a.shape[1]
+    s1, s2 = np.var(a, axis=1, ddof=1), np.var(b, axis=1, ddof=1)
+    s = np.sqrt(((m - 1) * s1 + (n - 1) * s2) / (m + n - 2))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        effect_size = (np.mean(a, axis=1) - np.mean(b, axis=1)) / s
+
+    return effect_size, [_get_cohend_thresholds(effect_size=d) for d in effect_size]
+
+
 def odds_ratio_to_cohend(odds_ratio: float) -> Tuple[float, str]:
     # see https://cran.r-project.org/web/packages/effectsize/effectsize.pdf at pg 15.
     effect_size = np.log(odds_ratio) * np.sqrt(3) / np.pi
@@ -53,6 +75,46 @@ def _compute_magnitude_vargha_delaney(a12: float) -> str:
     return magnitude
 
 
+def _compute_magnitudes_vargha_delaney(a12: np.ndarray) -> List[str]:
+    # same thresholds as _compute_magnitude_vargha_delaney, for an array of A12 values
+    levels = np.asarray([0.147, 0.33, 0.474])
+    magnitude = np.asarray(["negligible", "small", "medium", "large"])
+    scaled_a12 = (np.asarray(a12) - 0.5) * 2
+
+    return magnitude[np.searchsorted(levels, np.abs(scaled_a12), side="left")].tolist()
+
+
+def average_ranks(x: np.ndarray) -> np.ndarray:
+    # ranks along the last axis of a 2-D array, tied values get the average of their ranks
+    # (as scipy.stats.rankdata), in O(n log n) per row
+    k, n = x.shape
+    order = np.argsort(x, axis=1, kind="mergesort")
+    sorted_x = np.take_along_axis(x, order, axis=1)
+
+    # number the groups of tied values, the first value of every row always starts a new group
+    new_group = np.ones((k, n), dtype=bool)
+    new_group[:, 1:] = sorted_x[:, 1:] != sorted_x[:, :-1]
+    group = np.cumsum(new_group.ravel()) - 1
+
+    ordinal = np.tile(np.arange(1, n + 1, dtype=np.float64), k)
+    average = np.bincount(group, weights=ordinal) / np.bincount(group)
+
+    ranks = np.empty((k, n), dtype=np.float64)
+    np.put_along_axis(ranks, order, average[group].reshape(k, n), axis=1)
+    return ranks
+
+
+def _vargha_delaney_from_ranks(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    # A12 of every row of a (k, m) against the same row of b (k, n)
+    m = a.shape[1]
+    n = b.shape[1]
+
+    r1 = average_ranks(np.concatenate([a, b], axis=1))[:, :m].sum(axis=1)
+
+    # A = (r1/m - (m+1)/2)/n # formula (14) in Vargha and Delaney, 2000
+    return (2 * r1 - m * (m + 1)) / (2 * n * m)  # equivalent formula to avoid accuracy errors
+
+
 # https://gist.github.com/timm/5630491
 def vargha_delaney_unpaired(a: List[float], b: List[float]) -> Tuple[float, str]:
     """
@@ -63,6 +125,7 @@ def vargha_delaney_unpaired(a: List[float], b: List[float]) -> Tuple[float, str]
     Journal of Educational and Behavioral Statistics, 25(2):101-132, 2000
     The formula to compute A has been transformed to minimize accuracy errors
     See: http://mtorchiano.wordpress.com/2014/05/19/effect-size-of-r-precision/
+    The samples are ranked together instead of comparing every pair of values: O((m+n) log(m+n)).
     :param a: a numeric list
     :param b: another numeric list
     :returns the value estimate and the magnitude
@@ -70,18 +133,31 @@ def vargha_delaney_unpaired(a: List[float], b: List[float]) -> Tuple[float, str]
     assert isinstance(a, List), "a must be a list"
     assert isinstance(b, List), "a must be a list"
 
-    more = same = 0.0
-    for x in a:
-        for y in b:
-            if x == y:
-                same += 1
-            elif x > y:
-                more += 1
-    A = (more + 0.5 * same) / (len(a) * len(b))
+    A = float(_vargha_delaney_from_ranks(np.asarray([a], dtype=np.float64), np.asarray([b], dtype=np.float64))[0])
 
     return A, _compute_magnitude_vargha_delaney(a12=A)
 
 
+def vargha_delaney_unpaired_batch(a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, List[str]]:
+    """
+    Computes the Vargha and Delaney A index of many pairs of samples at once
+    (see vargha_delaney_unpaired), e.g. bootstrap resamples or all the pairs of models.
+    :param a: a 2-D array, one sample per row (k x m)
+    :param b: another 2-D array, one sample per row (k x n)
+    :returns the k value estimates and their magnitudes
+    """
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    assert a.ndim == 2 and b.ndim == 2, "a and b must be 2-D arrays"
+    assert a.shape[0] == b.shape[0], "a and b must have the same number of rows: {}, {}".format(
+        a.shape[0], b.shape[0]
+    )
+
+    A = _vargha_delaney_from_ranks(a, b)
+
+    return A, _compute_magnitudes_vargha_delaney(a12=A)
+
+
 def vargha_delaney(a: List[float], b: List[float]) -> Tuple[float, str]:
     """
     Computes Vargha and Delaney A index
@@ -104,7 +180,7 @@ def vargha_delaney(a: List[float], b: List[float]) -> Tuple[float, str]:
     assert m == n, "The two list must be of the same length: {}, {}".format(m, n)
 
     r = ss.rankdata(a + b)
-    r1 = sum(r[0:m])
+    r1 = np.sum(r[0:m])
 
     # Compute the measure
     # A = (r1/m - (m+1)/2)/n # formula (14) in Vargha and Delaney, 2000
@@ -113,3 +189,20 @@ def vargha_delaney(a: List[float], b: List[float]) -> Tuple[float, str]:
     )  # equivalent formula to avoid accuracy errors
 
     return A, _compute_magnitude_vargha_delaney(a12=A)
+
+
+def vargha_delaney_batch(a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, List[str]]:
+    """
+    Computes the Vargha and Delaney A index of many pairs of samples of the same
+    length at once (see vargha_delaney).
+    :param a: a 2-D array, one sample per row (k x m)
+    :param b: another 2-D array, one sample per row (k x m)
+    :returns the k value estimates and their magnitudes
+    """
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    assert a.shape == b.shape, "The two arrays must have the same shape: {}, {}".format(
+        a.shape, b.shape
+    )
+
+    return vargha_delaney_unpaired_batch(a, b)
@@ -0,0 +1,200 @@
+import os
+from typing import Dict, List, Optional, Tuple
+
+import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.collections import LineCollection, PolyCollection
+
+# Points of the density curves and bins of the histograms the densities are estimated from
+KDE_POINTS = 64
+KDE_BINS = 1024
+WHISKER_IQR = 1.5
+RASTER_DPI = 150
+MAX_FIGURE_WIDTH = 40
+FACET_COLUMNS = 5
+
+
+def use_headless_backend() -> None:
+    """
+    Switches matplotlib to the Agg backend, rendering only to files without loading any GUI toolkit.
+    Only the --fast-plots mode of the analysis scripts uses it, the default plots keep the backend of the environment.
+    """
+    plt.switch_backend("Agg")
+
+
+def _bandwidth(values: np.ndarray) -> float:
+    # Scott's rule, as scipy.stats.gaussian_kde (used by seaborn)
+    return float(np.std(values, ddof=1) * len(values) ** (-1 / 5)) if len(values) > 1 else 0.0
+
+
+def kde(values: List[float], points: int = KDE_POINTS) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Gaussian kernel density of the values, between their minimum and maximum.
+    The values are binned once and the bins smoothed with the kernel, so that the cost does not
+    depend on the number of values times the number of points.
+    :param values: a numeric list
+    :param points: the number of points of the curve
+    :returns the points and the density at each point
+    """
+    values = np.asarray(values, dtype=np.float64)
+    low, high = float(np.min(values)), float(np.max(values))
+    bandwidth = _bandwidth(values)
+    if high == low or bandwidth == 0:
+        return np.asarray([low, high]), np.ones(2)
+
+    counts, edges = np.histogram(values, bins=KDE_BINS, range=(low - 3 * bandwidth, high + 3 * bandwidth))
+    step = edges[1] - edges[0]
+    offsets = np.arange(-int(np.ceil(3 * bandwidth / step)), int(np.ceil(3 * bandwidth / step)) + 1) * step
+    kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2)
+    smoothed = np.convolve(counts, kernel, mode="same") / (len(values) * bandwidth * np.sqrt(2 * np.pi))
+
+    grid = np.linspace(low, high, points)
+    return grid, np.interp(grid, (edges[:-1] + edges[1:]) / 2, smoothed)
+
+
+def box_stats(values: List[float], label: str) -> Dict:
+    # quartiles, whiskers at 1.5 IQR and outliers, in the format of matplotlib's Axes.bxp
+    values = np.asarray(values, dtype=np.float64)
+    q1, median, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    inside = values[(values >= q1 - WHISKER_IQR * iqr) & (values <= q3 + WHISKER_IQR * iqr)]
+
+    return {
+        "label": label,
+        "med": median,
+        "q1": q1,
+        "q3": q3,
+        "whislo": np.min(inside),
+        "whishi": np.max(inside),
+        "fliers": values[(values < q1 - WHISKER_IQR * iqr) | (values > q3 + WHISKER_IQR * iqr)],
+    }
+
+
+def _draw_violins(ax, groups: List[Tuple[str, List[float]]], colors: List, width: float = 0.8) -> None:
+    # all the violins, whiskers, boxes and medians are drawn as four collections,
+    # the drawing time does not grow with one artist per violin
+    polygons, polygon_colors, whiskers, boxes, medians = [], [], [], [], []
+    for position, ((label, values), color) in enumerate(zip(groups, colors)):
+        if len(values) == 0:
+            continue
+        grid, density = kde(values=values)
+        half_width = density / np.max(density) * width / 2
+        polygons.append(
+            np.column_stack([np.concatenate([position - half_width, (position + half_width)[::-1]]),
+                             np.concatenate([grid, grid[::-1]])])
+        )
+        polygon_colors.append(color)
+
+        stats = box_stats(values=values, label=label)
+        whiskers.append([(position, stats["whislo"]), (position, stats["whishi"])])
+        boxes.append([(position, stats["q1"]), (position, stats["q3"])])
+        medians.append((position, stats["med"]))
+
+    ax.add_collection(PolyCollection(polygons, facecolors=polygon_colors, edgecolors="black", linewidths=0.5))
+    ax.add_collection(LineCollection(whiskers, colors="black", linewidths=1))
+    ax.add_collection(LineCollection(boxes, colors="black", linewidths=4))
+    if medians:
+        ax.scatter(*zip(*medians), color="white", zorder=3, s=12)
+
+    ax.set_xlim(-0.5, len(groups) - 0.5)
+    ax.autoscale_view(scalex=False)
+    ax.set_xticks(range(len(groups)))
+    ax.set_xticklabels([label for label, _ in groups], rotation=15)
+
+
+def _save(fig, output_file: str) -> None:
+    extension = os.path.splitext(output_file)[1][1:].lower() or "png"
+    fig.tight_layout()
+    # Text kept as text in the SVG files instead of one path per glyph, for these plots only
+    with plt.rc_context({"svg.fonttype": "none"}):
+        fig.savefig(output_file, format=extension, dpi=RASTER_DPI)
+    plt.close(fig)
+
+
+def violin_plot(
+    data: Dict[str, Dict[str, List[float]]],
+    output_file: str,
+    ylabel: str,
+    facet: bool = False,
+) -> None:
+    """
+    Draws the distributions of every project of every model as violins (density, quartiles and median).
+    The format (png, svg, pdf, ...) is given by the extension of the output file.
+    :param data: {model: {project: values}}
+    :param output_file: the path of the image
+    :param ylabel: the label of the values
+    :param facet: one subplot per model instead of all the models side by side
+    """
+    models = list(data.keys())
+    projects = list(dict.fromkeys(project for model in models for project in data[model]))
+    palette = plt.get_cmap("tab10")
+    colors = {project: palette(i % 10) for i, project in enumerate(projects)}
+
+    if facet:
+        columns = min(len(models), FACET_COLUMNS)
+        rows = -(-len(models) // columns)
+        fig, axes = plt.subplots(
+            rows,
+            columns,
+            figsize=(min(1 + 0.8 * len(projects) * columns, MAX_FIGURE_WIDTH), 4 * rows),
+            sharey=True,
+            squeeze=False,
+        )
+        for ax, model in zip(axes.flat, models):
+            groups = list(data[model].items())
+            _draw_violins(ax=ax, groups=groups, colors=[colors[project] for project, _ in groups])
+            ax.set_title(model)
+        for ax in axes.flat[len(models):]:
+            ax.set_visible(False)
+        for ax in axes[:, 0]:
+            ax.set_ylabel(ylabel)
+    else:
+        groups, group_colors, centers = [], [], []
+        for model in models:
+            start = len(groups)
+            groups += list(data[model].items())
+            group_colors += [colors[project] for project in data[model]]
+            centers.append((start + len(groups) - 1) / 2)
+            # empty slot between the models
+            groups.append(("", []))
+            group_colors.append("white")
+        groups, group_colors = groups[:-1], group_colors[:-1]
+
+        fig, ax = plt.subplots(figsize=(min(2 + 0.6 * len(groups), MAX_FIGURE_WIDTH), 5))
+        _draw_violins(ax=ax, groups=groups, colors=group_colors)
+        ax.set_ylabel(ylabel)
+        for center, model in zip(centers, models):
+            ax.annotate(model, xy=(center, 1.0), xycoords=("data", "axes fraction"), ha="center", va="bottom")
+
+    _save(fig=fig, output_file=output_file)
+
+
+def box_plot(data: Dict[str, List[float]], output_file: str, ylabel: str) -> None:
+    """
+    Draws the distribution of every model as a box plot, from precomputed quartiles.
+    The format (png, svg, pdf, ...) is given by the extension of the output file.
+    :param data: {model: values}
+    :param output_file: the path of the image
+    :param ylabel: the label of the values
+    """
+    fig, ax = plt.subplots(figsize=(min(2 + 1.2 * len(data), MAX_FIGURE_WIDTH), 5))
+    ax.bxp([box_stats(values=values, label=model) for model, values in data.items()], patch_artist=True)
+    ax.set_ylabel(ylabel)
+    ax.tick_params(axis="x", labelrotation=15)
+
+    _save(fig=fig, output_file=output_file)
+
+
+def stability_groups(
+    data: Dict[str, Dict[str, List]], default_projects: Optional[List[str]] = None
+) -> Dict[str, Dict[str, List[float]]]:
+    # {model: {project: similarities}} from the data loaded by data_store.load_stability
+    groups = {}
+    for model, values in data.items():
+        projects = (
+            values.get("projects")
+            or default_projects
+            or [str(i) for i in range(len(values["similarities"]))]
+        )
+        groups[model] = dict(zip(projects, values["similarities"]))
+    return groups
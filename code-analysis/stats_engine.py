@@ -0,0 +1,123 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from statsmodels.stats.multitest import multipletests
+
+from effect_size import cohend_batch, vargha_delaney_unpaired_batch
+from stats_tests import mannwhitney_test_batch, wilcoxon_test_batch
+
+# Pairs of models tested together, bounds the memory used by the (pairs x observations) arrays
+PAIRS_PER_BATCH = 256
+
+
+def score_matrix(data: Dict[str, List[float]]) -> Tuple[List[str], np.ndarray]:
+    models = list(data.keys())
+    lengths = {model: len(data[model]) for model in models}
+    assert (
+        len(set(lengths.values())) == 1
+    ), f"All the models must have the same number of observations: {lengths}"
+
+    return models, np.asarray([data[model] for model in models], dtype=np.float64)
+
+
+def model_pairs(models: List[str], reference: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+    if reference is None:
+        return np.triu_indices(len(models), k=1)
+
+    assert reference in models, f"The model {reference} is not in the data"
+    first = models.index(reference)
+    second = np.asarray([i for i in range(len(models)) if i != first])
+    return np.full(len(second), first), second
+
+
+def pairwise_tests(
+    models: List[str],
+    scores: np.ndarray,
+    reference: Optional[str] = None,
+    alpha: float = 0.05,
+    correction: str = "holm",
+) -> pd.DataFrame:
+    """
+    Compares every pair of models (or every model with a reference model) with the Wilcoxon
+    signed-rank and Mann-Whitney U tests, Cohen's d and the Vargha and Delaney A12 index.
+    The p-values of each test are corrected for multiple comparisons with statsmodels.
+    :param models: the names of the models, one per row of scores
+    :param scores: the models x observations score matrix
+    :param reference: compare only this model with the others
+    :param alpha: the family-wise error rate (or false discovery rate)
+    :param correction: a method of statsmodels.stats.multitest.multipletests (e.g. holm, bonferroni, fdr_bh)
+    :returns one row per pair of models
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    assert scores.shape[0] == len(models), "There must be one row of scores per model"
+
+    first, second = model_pairs(models=models, reference=reference)
+    columns = {
+        "wilcoxon_statistic": [],
+        "wilcoxon_p": [],
+        "mannwhitney_statistic": [],
+        "mannwhitney_p": [],
+        "cohend": [],
+        "cohend_magnitude": [],
+        "a12": [],
+        "a12_magnitude": [],
+    }
+
+    for start in range(0, len(first), PAIRS_PER_BATCH):
+        a = scores[first[start:start + PAIRS_PER_BATCH]]
+        b = scores[second[start:start + PAIRS_PER_BATCH]]
+
+        statistic, p_value = wilcoxon_test_batch(a=a, b=b)
+        columns["wilcoxon_statistic"].append(statistic)
+        columns["wilcoxon_p"].append(p_value)
+
+        statistic, p_value = mannwhitney_test_batch(a=a, b=b)
+        columns["mannwhitney_statistic"].append(statistic)
+        columns["mannwhitney_p"].append(p_value)
+
+        effect_size, magnitude = cohend_batch(a=a, b=b)
+        columns["cohend"].append(effect_size)
+        columns["cohend_magnitude"].append(magnitude)
+
+        effect_size, magnitude = vargha_delaney_unpaired_batch(a=a, b=b)
+        columns["a12"].append(effect_size)
+        columns["a12_magnitude"].append(magnitude)
+
+    results = pd.DataFrame(
+        {
+            "model_a": np.asarray(models, dtype=object)[first],
+            "model_b": np.asarray(models, dtype=object)[second],
+            "n": scores.shape[1],
+            "mean_a": scores[first].mean(axis=1),
+            "mean_b": scores[second].mean(axis=1),
+            "median_a": np.median(scores[first], axis=1),
+            "median_b": np.median(scores[second], axis=1),
+            **{name: np.concatenate(values) for name, values in columns.items()},
+        }
+    )
+
+    for test in ["wilcoxon", "mannwhitney"]:
+        if len(results) == 0:
+            results[f"{test}_p_adjusted"] = []
+            results[f"{test}_significant"] = []
+            continue
+        significant, p_adjusted, _, _ = multipletests(
+            results[f"{test}_p"], alpha=alpha, method=correction
+        )
+        results[f"{test}_p_adjusted"] = p_adjusted
+        results[f"{test}_significant"] = significant
+
+    return results
+
+
+def all_pairs_tests(
+    data: Dict[str, List[float]],
+    reference: Optional[str] = None,
+    alpha: float = 0.05,
+    correction: str = "holm",
+) -> pd.DataFrame:
+    models, scores = score_matrix(data=data)
+    return pairwise_tests(
+        models=models, scores=scores, reference=reference, alpha=alpha, correction=correction
+    )
@@ -4,6 +4,12 @@ import numpy as np
 import scipy.stats as stats
 import math
 
+from effect_size import average_ranks
+
+# Below this number of non-zero differences the batched Wilcoxon test falls back to scipy,
+# which uses the exact distribution for small samples instead of the normal approximation
+WILCOXON_NORMAL_APPROXIMATION_MIN_N = 25
+
 
 def wilcoxon_test(a: List[float], b: List[float]) -> Tuple[float, float]:
     assert len(a) == len(b), "The two list must be of the same length: {}, {}".format(
@@ -19,6 +25,95 @@ def mannwhitney_test(a: List[float], b: List[float]) -> Tuple[float, float]:
     return stats.mannwhitneyu(a, b)
 
 
+def _tie_terms(x: np.ndarray) -> np.ndarray:
+    # sum of (t^3 - t) over the groups of t tied values of every row of a 2-D array
+    k, n = x.shape
+    sorted_x = np.sort(x, axis=1)
+    new_group = np.ones((k, n), dtype=bool)
+    new_group[:, 1:] = sorted_x[:, 1:] != sorted_x[:, :-1]
+
+    t = np.bincount(np.cumsum(new_group.ravel()) - 1).astype(np.float64)
+    rows = np.repeat(np.arange(k), n)[new_group.ravel()]
+    return np.bincount(rows, weights=t ** 3 - t, minlength=k)
+
+
+def wilcoxon_test_batch(a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Two-sided Wilcoxon signed-rank test of every row of a against the same row of b.
+    Zero differences are discarded (zero_method="wilcox", as scipy.stats.wilcoxon) and the p-value
+    uses the normal approximation with tie correction. Rows with less than
+    WILCOXON_NORMAL_APPROXIMATION_MIN_N non-zero differences are computed with scipy.
+    :param a: a 2-D array, one sample per row (k x n)
+    :param b: another 2-D array, one sample per row (k x n)
+    :returns the k statistics (min of the positive and negative rank sums) and p-values
+    """
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    assert a.shape == b.shape, "The two arrays must have the same shape: {}, {}".format(
+        a.shape, b.shape
+    )
+
+    d = a - b
+    abs_d = np.abs(d)
+    zeros = np.count_nonzero(d == 0, axis=1)
+    n = d.shape[1] - zeros
+
+    # the zeros are the smallest absolute differences: once ranked with the others,
+    # removing them shifts the ranks of the non-zero differences by their number
+    ranks = average_ranks(abs_d) - zeros[:, None]
+    r_plus = np.sum(np.where(d > 0, ranks, 0.0), axis=1)
+    r_minus = np.sum(np.where(d < 0, ranks, 0.0), axis=1)
+    statistic = np.minimum(r_plus, r_minus)
+
+    ties = _tie_terms(abs_d) - (zeros ** 3 - zeros)
+    mean = n * (n + 1) / 4.0
+    sd = np.sqrt(n * (n + 1) * (2 * n + 1) / 24.0 - ties / 48.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = (statistic - mean) / sd
+    p_value = np.minimum(2 * stats.norm.sf(np.abs(z)), 1.0)
+
+    # identical samples: no evidence of a difference (scipy raises a ValueError)
+    p_value[n == 0] = 1.0
+
+    for row in np.flatnonzero((n > 0) & (n < WILCOXON_NORMAL_APPROXIMATION_MIN_N)):
+        statistic[row], p_value[row] = wilcoxon_test(a=a[row], b=b[row])
+
+    return statistic, p_value
+
+
+def mannwhitney_test_batch(a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Two-sided Mann-Whitney U test of every row of a against the same row of b,
+    with the normal approximation, tie and continuity corrections.
+    :param a: a 2-D array, one sample per row (k x m)
+    :param b: another 2-D array, one sample per row (k x n)
+    :returns the k U statistics of a and p-values
+    """
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    assert a.shape[0] == b.shape[0], "a and b must have the same number of rows: {}, {}".format(
+        a.shape[0], b.shape[0]
+    )
+
+    m = a.shape[1]
+    n = b.shape[1]
+    x = np.concatenate([a, b], axis=1)
+
+    u1 = average_ranks(x)[:, :m].sum(axis=1) - m * (m + 1) / 2.0
+    u = np.maximum(u1, m * n - u1)
+
+    mean = m * n / 2.0
+    sd = np.sqrt(m * n / 12.0 * ((m + n + 1) - _tie_terms(x) / ((m + n) * (m + n - 1))))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = (u - mean - 0.5) / sd
+    p_value = np.minimum(2 * stats.norm.sf(z), 1.0)
+
+    # all the values are equal
+    p_value[sd == 0] = 1.0
+
+    return u1, p_value
+
+
 def summary(a: List[float]) -> str:
     array = np.asarray(a)
 
@@ -0,0 +1,106 @@
+import json
+import os
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+import data_store as ds
+
+FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SURVEY_JSON = os.path.join(FOLDER, "qualtrics_data.json")
+STABILITY_JSON = os.path.join(FOLDER, "stability_data.json")
+
+
+def read_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_survey_round_trip(tmp_path):
+    output_file = str(tmp_path / "survey.parquet")
+
+    table = ds.convert_json(input_file=SURVEY_JSON, output_file=output_file)
+
+    assert table.column_names == ds.SURVEY_COLUMNS
+    assert ds.load_survey(output_file) == ds.load_survey(SURVEY_JSON) == read_json(SURVEY_JSON)
+
+
+def test_stability_round_trip(tmp_path):
+    output_file = str(tmp_path / "stability.parquet")
+    data = read_json(STABILITY_JSON)
+    projects = [f"project{i}" for i in range(len(next(iter(data.values()))["similarities"]))]
+
+    table = ds.convert_json(input_file=STABILITY_JSON, output_file=output_file, project_names=projects)
+
+    assert table.column_names == ds.STABILITY_COLUMNS
+    loaded = ds.load_stability(output_file)
+    assert loaded == {model: {"similarities": values["similarities"], "projects": projects}
+                      for model, values in data.items()}
+
+
+def test_load_only_some_models(tmp_path):
+    output_file = str(tmp_path / "survey.parquet")
+    ds.convert_json(input_file=SURVEY_JSON, output_file=output_file)
+
+    assert list(ds.load_survey(output_file, models=["gpt-4"])) == ["gpt-4"]
+    assert list(ds.load_survey(SURVEY_JSON, models=["gpt-4"])) == ["gpt-4"]
+
+
+def write_similarities(path, model, project, similarities):
+    rows = {
+        "model": [model] * len(similarities),
+        "project": [project] * len(similarities),
+        "suite": ["FooTest"] * len(similarities),
+        "test_index": list(range(len(similarities))),
+        "rep_i": [0] * len(similarities),
+        "rep_j": [1] * len(similarities),
+        "similarity": similarities,
+    }
+    pq.write_table(pa.table(rows), path)
+    return str(path)
+
+
+def test_ingest_similarities(tmp_path):
+    output = tmp_path / "output"
+    output.mkdir()
+    write_similarities(output / "similarities_run1.parquet", "gpt-4", "commons-cli", [0.9, 0.8])
+    write_similarities(output / "similarities_run2.parquet", "gpt-4", "commons-lang", [0.7])
+    write_similarities(output / "other.parquet", "gpt-4", "commons-io", [0.1])
+    dataset = str(tmp_path / "dataset")
+
+    added = ds.ingest_similarities(dataset_path=dataset, sources=[str(output)])
+
+    assert len(added) == 2
+    manifest = read_json(os.path.join(dataset, ds.MANIFEST_FILENAME))
+    assert sorted(os.path.basename(entry["source"]) for entry in manifest.values()) == [
+        "similarities_run1.parquet", "similarities_run2.parquet"]
+    loaded = ds.load_stability(dataset)
+    assert sorted(zip(loaded["gpt-4"]["projects"], loaded["gpt-4"]["similarities"])) == [
+        ("commons-cli", [0.9, 0.8]), ("commons-lang", [0.7])]
+
+
+def test_ingest_again_adds_only_new_files(tmp_path):
+    output = tmp_path / "output"
+    output.mkdir()
+    first = write_similarities(output / "similarities_run1.parquet", "gpt-4", "commons-cli", [0.9])
+    dataset = str(tmp_path / "dataset")
+    ds.ingest_similarities(dataset_path=dataset, sources=[first])
+
+    second = write_similarities(output / "similarities_run2.parquet", "gpt-4", "commons-cli", [0.5])
+    added = ds.ingest_similarities(dataset_path=dataset, sources=[str(output)])
+
+    assert [os.path.basename(path) for path in added] == [f"part-{ds._file_hash(second)[:16]}.parquet"]
+    assert ds.ingest_similarities(dataset_path=dataset, sources=[str(output)]) == []
+    assert len(read_json(os.path.join(dataset, ds.MANIFEST_FILENAME))) == 2
+    assert sorted(ds.load_stability(dataset)["gpt-4"]["similarities"][0]) == [0.5, 0.9]
+
+
+def test_ingest_rejects_missing_columns(tmp_path):
+    source = str(tmp_path / "similarities_run1.parquet")
+    pq.write_table(pa.table({"model": ["gpt-4"], "similarity": [0.9]}), source)
+    dataset = str(tmp_path / "dataset")
+
+    with pytest.raises(AssertionError, match="misses the columns"):
+        ds.ingest_similarities(dataset_path=dataset, sources=[source])
+    assert not os.path.exists(os.path.join(dataset, ds.MANIFEST_FILENAME))
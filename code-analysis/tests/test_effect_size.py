@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+import scipy.stats as ss
+
+from effect_size import (
+    average_ranks,
+    cohend,
+    cohend_batch,
+    vargha_delaney,
+    vargha_delaney_batch,
+    vargha_delaney_unpaired,
+    vargha_delaney_unpaired_batch,
+)
+
+
+def brute_force_a12(a, b):
+    # probability that a value of a is larger than a value of b, ties counting for half
+    greater = sum(x > y for x in a for y in b)
+    equal = sum(x == y for x in a for y in b)
+    return (greater + 0.5 * equal) / (len(a) * len(b))
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(42)
+
+
+def test_average_ranks_matches_scipy(rng):
+    # Likert-like scores, with many ties
+    x = rng.integers(1, 6, size=(20, 37)).astype(np.float64)
+
+    np.testing.assert_array_equal(average_ranks(x), np.vstack([ss.rankdata(row) for row in x]))
+
+
+def test_vargha_delaney_unpaired_matches_brute_force(rng):
+    for m, n in [(1, 1), (5, 9), (30, 17)]:
+        a = rng.integers(1, 6, size=m).astype(float).tolist()
+        b = rng.integers(1, 6, size=n).astype(float).tolist()
+
+        estimate, _ = vargha_delaney_unpaired(a, b)
+
+        assert estimate == pytest.approx(brute_force_a12(a, b))
+
+
+def test_vargha_delaney_paired_matches_brute_force(rng):
+    a = rng.normal(size=40).round(1).tolist()
+    b = rng.normal(0.3, size=40).round(1).tolist()
+
+    assert vargha_delaney(a, b)[0] == pytest.approx(brute_force_a12(a, b))
+
+
+def test_vargha_delaney_magnitudes():
+    assert vargha_delaney_unpaired([1.0, 2.0], [1.0, 2.0]) == (0.5, "negligible")
+    assert vargha_delaney_unpaired([3.0, 4.0], [1.0, 2.0]) == (1.0, "large")
+    assert vargha_delaney_unpaired([1.0, 2.0], [3.0, 4.0]) == (0.0, "large")
+
+
+def test_vargha_delaney_batches_match_the_single_pairs(rng):
+    a = rng.integers(1, 6, size=(15, 12)).astype(np.float64)
+    b = rng.integers(1, 6, size=(15, 12)).astype(np.float64)
+
+    estimates, magnitudes = vargha_delaney_unpaired_batch(a, b)
+    expected = [vargha_delaney_unpaired(row_a.tolist(), row_b.tolist()) for row_a, row_b in zip(a, b)]
+
+    np.testing.assert_allclose(estimates, [estimate for estimate, _ in expected])
+    assert magnitudes == [magnitude for _, magnitude in expected]
+    np.testing.assert_allclose(vargha_delaney_batch(a, b)[0], estimates)
+
+
+def test_cohend_batch_matches_the_single_pairs(rng):
+    a = rng.normal(size=(10, 25))
+    b = rng.normal(0.5, size=(10, 25))
+
+    estimates, magnitudes = cohend_batch(a, b)
+    expected = [cohend(row_a.tolist(), row_b.tolist()) for row_a, row_b in zip(a, b)]
+
+    np.testing.assert_allclose(estimates, [estimate for estimate, _ in expected])
+    assert magnitudes == [magnitude for _, magnitude in expected]
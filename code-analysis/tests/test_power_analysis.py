@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+from statsmodels.stats.power import TTestIndPower
+
+import power_analysis as pa
+
+
+def test_parametric_power_analysis_matches_statsmodels():
+    for effect in [0.2, 0.5, 0.8, -0.8, 1.7]:
+        expected = TTestIndPower().solve_power(abs(effect), power=0.8, alpha=0.05)
+        assert pa.parametric_power_analysis(effect=effect) == pytest.approx(expected)
+
+
+def test_parametric_power_analysis_is_memoized():
+    pa._solve_power.cache_clear()
+
+    pa.parametric_power_analysis(effect=0.5)
+    pa.parametric_power_analysis(effect=0.5 + 1e-12)
+    pa.parametric_power_analysis(effect=-0.5)
+
+    assert pa._solve_power.cache_info().misses == 1
+
+
+def test_parametric_power_is_the_inverse_of_the_sample_size():
+    nobs = pa.parametric_power_analysis(effect=0.5, power=0.9)
+
+    assert pa.parametric_power(effect=0.5, nobs=nobs) == pytest.approx(0.9)
+
+
+def test_grid_power_analysis_matches_the_solver():
+    effects = np.geomspace(0.02, 2.9, 37)
+
+    grid = pa.grid_power_analysis(effects, alpha=0.05, power=0.8)
+    solved = [TTestIndPower().solve_power(effect, power=0.8, alpha=0.05) for effect in effects]
+
+    np.testing.assert_allclose(grid, solved, rtol=1e-3)
+
+
+def test_grid_power_analysis_outside_of_the_grid():
+    result = pa.grid_power_analysis(np.asarray([[0.0, 0.005], [-4.0, 0.5]]))
+
+    assert result.shape == (2, 2)
+    assert result[0, 0] == np.inf
+    assert result[0, 1] == pytest.approx(TTestIndPower().solve_power(0.005, power=0.8, alpha=0.05))
+    assert result[1, 0] == pytest.approx(TTestIndPower().solve_power(4.0, power=0.8, alpha=0.05))
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+import scipy.stats as ss
+from statsmodels.stats.multitest import multipletests
+
+from effect_size import cohend, vargha_delaney_unpaired
+from stats_engine import all_pairs_tests, model_pairs
+from stats_tests import mannwhitney_test_batch, wilcoxon_test_batch
+
+
+@pytest.fixture
+def scores():
+    # Likert-like scores of 5 models on the same 60 tests, with many ties and zero differences
+    rng = np.random.default_rng(7)
+    return {f"model{i}": rng.integers(1, 6, size=60).astype(float).tolist() for i in range(5)}
+
+
+def test_wilcoxon_batch_matches_scipy(scores):
+    a = np.asarray([scores["model0"], scores["model1"], scores["model2"]])
+    b = np.asarray([scores["model3"], scores["model4"], scores["model0"]])
+
+    statistics, p_values = wilcoxon_test_batch(a, b)
+
+    for row in range(len(a)):
+        expected = ss.wilcoxon(a[row], b[row], zero_method="wilcox", correction=False, method="approx")
+        assert statistics[row] == pytest.approx(expected.statistic)
+        assert p_values[row] == pytest.approx(expected.pvalue)
+
+
+def test_wilcoxon_batch_of_identical_samples(scores):
+    a = np.asarray([scores["model0"]])
+
+    assert wilcoxon_test_batch(a, a)[1].tolist() == [1.0]
+
+
+def test_mannwhitney_batch_matches_scipy(scores):
+    a = np.asarray([scores["model0"], scores["model1"]])
+    b = np.asarray([scores["model2"][:45], scores["model3"][:45]])
+
+    statistics, p_values = mannwhitney_test_batch(a, b)
+
+    for row in range(len(a)):
+        expected = ss.mannwhitneyu(a[row], b[row], use_continuity=True, alternative="two-sided", method="asymptotic")
+        assert statistics[row] == pytest.approx(expected.statistic)
+        assert p_values[row] == pytest.approx(expected.pvalue)
+
+
+def test_model_pairs():
+    first, second = model_pairs(["a", "b", "c"])
+    assert list(zip(first.tolist(), second.tolist())) == [(0, 1), (0, 2), (1, 2)]
+
+    first, second = model_pairs(["a", "b", "c"], reference="b")
+    assert list(zip(first.tolist(), second.tolist())) == [(1, 0), (1, 2)]
+
+
+def test_all_pairs_tests_matches_one_pair_at_a_time(scores):
+    results = all_pairs_tests(scores, correction="holm")
+
+    assert len(results) == 10
+    for row in results.itertuples():
+        a, b = scores[row.model_a], scores[row.model_b]
+        assert row.cohend == pytest.approx(cohend(a, b)[0])
+        assert row.a12 == pytest.approx(vargha_delaney_unpaired(a, b)[0])
+        assert row.wilcoxon_p == pytest.approx(
+            ss.wilcoxon(a, b, zero_method="wilcox", correction=False, method="approx").pvalue)
+
+    for test in ["wilcoxon", "mannwhitney"]:
+        significant, adjusted, _, _ = multipletests(results[f"{test}_p"], alpha=0.05, method="holm")
+        np.testing.assert_allclose(results[f"{test}_p_adjusted"], adjusted)
+        assert results[f"{test}_significant"].tolist() == significant.tolist()
+
+
+def test_all_pairs_tests_with_a_reference(scores):
+    results = all_pairs_tests(scores, reference="model2")
+
+    assert results["model_a"].tolist() == ["model2"] * 4
+    assert results["model_b"].tolist() == ["model0", "model1", "model3", "model4"]
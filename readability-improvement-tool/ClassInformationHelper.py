@@ -0,0 +1,195 @@
+import argparse
+import hashlib
+import logging
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+
+import Parser as p
+import Telemetry as tm
+
+# File, in the output folder of the tool, holding the class summary of every source already parsed. It does not
+# depend on the project, the model or the run, so all the runs on the same output folder share it.
+CLASS_INFORMATION_FILENAME = "class_information.sqlite"
+
+# Changing the summaries built by Parser.class_information_extraction invalidates all the stored ones
+CLASS_INFORMATION_VERSION = 1
+
+# Summaries already read in this process, by source hash
+_summaries = {}
+_summaries_lock = threading.Lock()
+
+
+def source_hash(sourcecode):
+    """
+    Args:
+        sourcecode (str): The Java source code of a class.
+
+    Returns:
+        str: The key of the summary of the class.
+    """
+    return hashlib.sha256(f"{CLASS_INFORMATION_VERSION}\n{sourcecode}".encode("utf-8")).hexdigest()
+
+
+class ClassInformationStore:
+    """
+    Class summaries (see Parser.class_information_extraction), by source hash, kept across the runs of the tool on
+    the same output folder.
+    """
+
+    def __init__(self, output_path):
+        os.makedirs(output_path, exist_ok=True)
+        self.path = os.path.join(output_path, CLASS_INFORMATION_FILENAME)
+
+        with closing(self._connect()) as connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS summaries (hash TEXT PRIMARY KEY, summary TEXT NOT NULL, "
+                               "created_at REAL NOT NULL)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def get_many(self, hashes):
+        """
+        Looks up summaries.
+
+        Args:
+            hashes (list): The source hashes.
+
+        Returns:
+            dict: {source hash: summary} of the hashes found.
+        """
+        found = {}
+        unique = list(dict.fromkeys(hashes))
+
+        with closing(self._connect()) as connection:
+            # SQLite limits the number of parameters of a query
+            for start in range(0, len(unique), 500):
+                chunk = unique[start:start + 500]
+                found.update(connection.execute(f"SELECT hash, summary FROM summaries WHERE hash IN "
+                                                f"({', '.join('?' * len(chunk))})", chunk).fetchall())
+
+        return found
+
+    def put_many(self, summaries):
+        """
+        Stores summaries.
+
+        Args:
+            summaries (dict): {source hash: summary}.
+
+        Returns:
+            None
+        """
+        now = time.time()
+        with closing(self._connect()) as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.executemany("INSERT OR REPLACE INTO summaries (hash, summary, created_at) VALUES (?, ?, ?)",
+                                   [(key, summary, now) for key, summary in summaries.items()])
+            connection.execute("COMMIT")
+
+
+def class_information(sourcecode, output_path=None):
+    """
+    Returns the summary of a class for the context prompt, parsing the source only the first time it is seen.
+
+    Args:
+        sourcecode (str): The Java source code of the class.
+        output_path (str): The output folder of the tool, holding the persistent cache. Without it, the summary is
+            only cached in the memory of the process.
+
+    Returns:
+        str: The summary (see Parser.class_information_extraction).
+    """
+    key = source_hash(sourcecode)
+    with _summaries_lock:
+        if key in _summaries:
+            tm.count("class_information.cached", 1)
+            return _summaries[key]
+
+    store = ClassInformationStore(output_path) if output_path else None
+    summary = store.get_many([key]).get(key) if store else None
+
+    if summary is None:
+        summary = p.class_information_extraction(sourcecode)
+        if store:
+            store.put_many({key: summary})
+        tm.count("class_information.parsed", 1)
+    else:
+        tm.count("class_information.cached", 1)
+
+    with _summaries_lock:
+        _summaries[key] = summary
+
+    return summary
+
+
+def _summarize(sourcecode):
+    # runs in a worker process: a class that cannot be parsed is left to the LLM stage, that reports the error
+    try:
+        return p.class_information_extraction(sourcecode)
+    except Exception:
+        return None
+
+
+@tm.timed("class_information.prebuild")
+def prebuild(output_path, project_paths, workers=None):
+    """
+    Builds the missing summaries of the classes under test of whole projects in parallel, before the LLM stage.
+
+    Args:
+        output_path (str): The output folder of the tool.
+        project_paths (list): The root paths of the projects.
+        workers (int): The number of processes, by default the number of CPUs.
+
+    Returns:
+        dict: The number of classes "parsed", already "cached" and "failed".
+    """
+    sources = {}
+    for path in project_paths:
+        for sourcecode in p.extract_sourcecode_from_testsuite(path, p.extract_testsuites_from_path(path)).values():
+            sources[source_hash(sourcecode)] = sourcecode
+
+    store = ClassInformationStore(output_path)
+    cached = store.get_many(list(sources))
+    missing = [key for key in sources if key not in cached]
+
+    built = {}
+    if missing:
+        # Parsing is CPU bound: the classes are parsed by worker processes, started fresh as the caller may be
+        # running other threads (e.g. the heartbeat of a job), and no more than one per 8 classes
+        workers = min(workers or os.cpu_count() or 1, (len(missing) + 7) // 8)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            for key, summary in zip(missing, executor.map(_summarize, [sources[key] for key in missing],
+                                                          chunksize=8)):
+                if summary is not None:
+                    built[key] = summary
+        store.put_many(built)
+
+    with _summaries_lock:
+        _summaries.update(cached)
+        _summaries.update(built)
+
+    counts = {"parsed": len(built), "cached": len(cached), "failed": len(missing) - len(built)}
+    logging.info(f"Class summaries: {counts['parsed']} built, {counts['cached']} already cached, "
+                 f"{counts['failed']} not parsable.")
+
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Builds the class summaries of projects ahead of the LLM stage.")
+    parser.add_argument("output_path", help="The output folder of the tool.")
+    parser.add_argument("project_paths", nargs="+", help="The root paths of the projects.")
+    parser.add_argument("--workers", type=int, default=None, help="Processes parsing the classes.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    print(prebuild(args.output_path, args.project_paths, args.workers))
+
+
+if __name__ == "__main__":
+    main()
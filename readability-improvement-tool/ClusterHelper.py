@@ -0,0 +1,144 @@
+import re
+import zlib
+
+import javalang
+import numpy as np
+
+import Parser as p
+
+# Consecutive normalized tokens of a shingle
+SHINGLE_SIZE = 4
+
+# Length of the MinHash signatures, split in LSH_BANDS bands: two tests sharing a band are compared
+NUM_PERMUTATIONS = 64
+LSH_BANDS = 16
+
+# Minimum estimated Jaccard similarity of the shingles of two tests of the same cluster
+SIMILARITY_THRESHOLD = 0.8
+
+# Variables named by EvoSuite after their type, and numbered (string0, intArray0, options1)
+GENERATED_NAME = re.compile(r"[a-z][A-Za-z]*\d+")
+
+# Hash functions (a * x + b) mod MERSENNE_PRIME of the signatures, the same in every run
+MERSENNE_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(0)
+_HASH_A = _rng.integers(1, MERSENNE_PRIME, NUM_PERMUTATIONS, dtype=np.int64)
+_HASH_B = _rng.integers(0, MERSENNE_PRIME, NUM_PERMUTATIONS, dtype=np.int64)
+
+
+def normalized_tokens(test_method):
+    """
+    Tokenizes a test, hiding what differs between the near-duplicate tests generated by EvoSuite: the literals are
+    replaced by their kind, the numbers of the generated variable names are dropped and the name of the test is
+    removed.
+
+    Args:
+        test_method (str): The test method.
+
+    Returns:
+        list: The normalized tokens.
+    """
+    try:
+        tokens = list(javalang.tokenizer.tokenize(test_method))
+    except javalang.tokenizer.LexerError:
+        # Compared as written
+        return test_method.split()
+
+    normalized = []
+    for index, token in enumerate(tokens):
+        if isinstance(token, javalang.tokenizer.Literal):
+            normalized.append(f"<{type(token).__name__}>")
+        elif isinstance(token, javalang.tokenizer.Identifier) and index > 0 and tokens[index - 1].value == "void":
+            normalized.append("<test>")
+        elif isinstance(token, javalang.tokenizer.Identifier) and GENERATED_NAME.fullmatch(token.value):
+            normalized.append(token.value.rstrip("0123456789") + "#")
+        else:
+            normalized.append(token.value)
+
+    return normalized
+
+
+def minhash_signature(tokens):
+    """
+    Computes the MinHash signature of the shingles of a test.
+
+    Args:
+        tokens (list): The normalized tokens of the test.
+
+    Returns:
+        ndarray: NUM_PERMUTATIONS minimum hashes.
+    """
+    shingles = {"\x1f".join(tokens[start:start + SHINGLE_SIZE])
+                for start in range(max(len(tokens) - SHINGLE_SIZE + 1, 1))}
+    hashes = np.array([zlib.crc32(shingle.encode("utf-8")) % MERSENNE_PRIME for shingle in shingles], dtype=np.int64)
+
+    # Both factors are below 2^31, the products fit in 64 bits
+    return ((_HASH_A[:, None] * hashes[None, :] + _HASH_B[:, None]) % MERSENNE_PRIME).min(axis=1)
+
+
+def cluster_tests(tests, threshold=SIMILARITY_THRESHOLD):
+    """
+    Groups the near-duplicate tests of a test suite: the tests sharing a band of their MinHash signature are
+    compared, and joined (union-find) when the estimated similarity of their shingles reaches the threshold.
+
+    Args:
+        tests (list): The test methods.
+        threshold (float): The minimum estimated Jaccard similarity.
+
+    Returns:
+        list: The clusters, lists of test indexes in the order of the tests, the first one being the representative
+            of the cluster. Tests without near duplicates are alone in their cluster.
+    """
+    if not tests:
+        return []
+
+    signatures = np.stack([minhash_signature(normalized_tokens(test)) for test in tests])
+    rows = NUM_PERMUTATIONS // LSH_BANDS
+    parent = list(range(len(tests)))
+
+    def find(index):
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+
+    for band in range(LSH_BANDS):
+        buckets = {}
+        for index, signature in enumerate(signatures):
+            buckets.setdefault(signature[band * rows:(band + 1) * rows].tobytes(), []).append(index)
+
+        for bucket in buckets.values():
+            for position, index in enumerate(bucket[1:], 1):
+                for other in bucket[:position]:
+                    root_other, root_index = find(other), find(index)
+                    if root_other != root_index and np.mean(signatures[other] == signatures[index]) >= threshold:
+                        # The root of a cluster is its first test
+                        parent[max(root_other, root_index)] = min(root_other, root_index)
+                        break
+
+    clusters = {}
+    for index in range(len(tests)):
+        clusters.setdefault(find(index), []).append(index)
+
+    return list(clusters.values())
+
+
+def derive_test(member_test, renames):
+    """
+    Renames the variables of a test with the names chosen for the representative of its cluster.
+
+    Args:
+        member_test (str): The test to rename.
+        renames (dict): {original name: new name} of the names declared inside the representative (see
+            Parser.rename_map).
+
+    Returns:
+        str: The renamed test (with its original name), None if the test is too different from the representative:
+            some of its generated variables do not exist in the representative, or the names would clash.
+    """
+    try:
+        if any(GENERATED_NAME.fullmatch(name) and name not in renames for name in p.variable_names(member_test)):
+            return None
+        return p.apply_renames(member_test, renames)
+    except javalang.tokenizer.LexerError:
+        return None
@@ -0,0 +1,307 @@
+import logging
+import os
+import shutil
+import struct
+import numpy as np
+
+import Parser as p
+import Telemetry as tm
+
+# JUnit listener dumping the JaCoCo execution data of each test (see jacoco/PerTestCoverageListener.java)
+LISTENER_NAME = "PerTestCoverageListener"
+LISTENER_SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "jacoco", LISTENER_NAME + ".java")
+
+# Folder, relative to the project, where the listener writes one exec file per test
+PER_TEST_EXEC_DIR = "target/jacoco-per-test"
+
+# Block types of the JaCoCo exec file format
+BLOCK_HEADER = 0x01
+BLOCK_SESSIONINFO = 0x10
+BLOCK_EXECUTIONDATA = 0x11
+EXEC_MAGIC_NUMBER = 0xC0C0
+
+
+class ListenerNotConfiguredError(RuntimeError):
+    """
+    The per-test coverage listener did not run: it is not registered in the Surefire configuration of the project
+    (see README). Retrying the run cannot fix it.
+    """
+
+
+def install_listener(project_path):
+    """
+    Copies the per-test coverage listener in the test sources of the project.
+
+    Args:
+        project_path (str): Path to the project directory.
+
+    Returns:
+        str: Path of the copied listener, to be removed with remove_listener.
+    """
+    destination = os.path.join(project_path, "src/test/java", LISTENER_NAME + ".java")
+    shutil.copy(LISTENER_SOURCE, destination)
+
+    return destination
+
+
+def remove_listener(project_path):
+    """
+    Removes the per-test coverage listener from the test sources of the project.
+
+    Args:
+        project_path (str): Path to the project directory.
+
+    Returns:
+        None
+    """
+    listener_path = os.path.join(project_path, "src/test/java", LISTENER_NAME + ".java")
+    if os.path.isfile(listener_path):
+        os.remove(listener_path)
+
+
+def _read_varint(data, pos):
+    value = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80 == 0:
+            return value, pos
+        shift += 7
+
+
+def _read_utf(data, pos):
+    length = struct.unpack_from(">H", data, pos)[0]
+    pos += 2
+
+    return data[pos:pos + length].decode("utf-8", errors="replace"), pos + length
+
+
+def read_exec_data(path):
+    """
+    Reads a JaCoCo exec file.
+
+    Args:
+        path (str): Path to the exec file.
+
+    Returns:
+        dict: {(class id, class name): numpy.ndarray of booleans with the probes hit by the execution}.
+    """
+    with open(path, 'rb') as file:
+        data = file.read()
+
+    probes = {}
+    pos = 0
+    while pos < len(data):
+        block = data[pos]
+        pos += 1
+
+        if block == BLOCK_HEADER:
+            magic_number = struct.unpack_from(">H", data, pos)[0]
+            if magic_number != EXEC_MAGIC_NUMBER:
+                raise ValueError(f"{path} is not a JaCoCo exec file.")
+            pos += 4
+
+        elif block == BLOCK_SESSIONINFO:
+            _, pos = _read_utf(data, pos)
+            # Start and dump timestamps
+            pos += 16
+
+        elif block == BLOCK_EXECUTIONDATA:
+            class_id = struct.unpack_from(">q", data, pos)[0]
+            class_name, pos = _read_utf(data, pos + 8)
+            probes_count, pos = _read_varint(data, pos)
+            probes_bytes = (probes_count + 7) // 8
+            bits = np.frombuffer(data, dtype=np.uint8, count=probes_bytes, offset=pos)
+            probes[(class_id, class_name)] = np.unpackbits(bits, bitorder="little")[:probes_count].astype(bool)
+            pos += probes_bytes
+
+        else:
+            raise ValueError(f"Unknown block type {block:#x} in {path}.")
+
+    return probes
+
+
+def collect_per_test_coverage(exec_dir):
+    """
+    Builds the coverage vector of every test from the exec files written by the per-test listener.
+
+    The probes of all the classes are concatenated in a single vector per test, stored as a packed bitset.
+
+    Args:
+        exec_dir (str): Folder containing the <test class>#<test method>.exec files.
+
+    Returns:
+        dict: Arrays describing the coverage: "tests" (test identifiers), "class_ids", "class_names",
+        "offsets" (first probe of each class, plus the total number of probes) and "bits" (tests x probes,
+        packed with numpy.packbits).
+
+    Raises:
+        ListenerNotConfiguredError: If the listener did not write the folder.
+    """
+    if not os.path.isdir(exec_dir):
+        raise ListenerNotConfiguredError(f"No per-test coverage in {exec_dir}: the {LISTENER_NAME} listener is not "
+                                         f"registered in the Surefire configuration of the pom.xml (see README).")
+
+    tests = sorted(filename[:-5] for filename in os.listdir(exec_dir) if filename.endswith(".exec"))
+    executions = [read_exec_data(os.path.join(exec_dir, test + ".exec")) for test in tests]
+
+    # Probes layout shared by all the tests, the listener itself is not part of the coverage
+    classes = sorted({key for execution in executions for key in execution
+                      if not key[1].endswith(LISTENER_NAME)}, key=lambda key: (key[1], key[0]))
+    sizes = {}
+    for execution in executions:
+        for key, probes in execution.items():
+            sizes[key] = len(probes)
+    offsets = np.zeros(len(classes) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([sizes[key] for key in classes])
+
+    coverage = np.zeros((len(tests), offsets[-1]), dtype=bool)
+    for row, execution in enumerate(executions):
+        for column, key in enumerate(classes):
+            if key in execution:
+                coverage[row, offsets[column]:offsets[column + 1]] = execution[key]
+
+    return {
+        "tests": np.array(tests, dtype=str),
+        "class_ids": np.array([key[0] for key in classes], dtype=np.int64),
+        "class_names": np.array([key[1] for key in classes], dtype=str),
+        "offsets": offsets,
+        "bits": np.packbits(coverage, axis=1),
+    }
+
+
+@tm.timed("jacoco.per_test_save")
+def save_per_test_coverage(output_path, project_path, rep):
+    """
+    Saves the per-test coverage of the last test run of a project.
+
+    Args:
+        output_path (str): Directory to save the coverage (the jacocoresults folder).
+        project_path (str): Path to the project directory.
+        rep (int): Iteration number, -1 for original.
+
+    Returns:
+        str: Path of the saved coverage file.
+    """
+    filename = "per_test_original.npz" if rep == -1 else f"per_test_{rep}.npz"
+    destination = os.path.join(output_path, filename)
+    os.makedirs(output_path, exist_ok=True)
+
+    np.savez_compressed(destination, **collect_per_test_coverage(os.path.join(project_path, PER_TEST_EXEC_DIR)))
+    logging.info(f"Per-test coverage for iteration number {rep} saved.")
+
+    return destination
+
+
+def _load_per_test_coverage(path):
+    with np.load(path) as coverage:
+        return {key: coverage[key] for key in coverage.files}
+
+
+def _suite_test_names(testsuite_folder):
+    # {test class simple name: [test method names in the order of the file]}
+    names = {}
+    for filename in sorted(os.listdir(testsuite_folder)):
+        if filename.endswith(".java"):
+            with open(os.path.join(testsuite_folder, filename), 'r', encoding="utf-8") as file:
+                methods = p.java_methods_extraction(file.read())
+            names[filename[:-5]] = [p.extract_test_name(method) for method in methods]
+
+    return names
+
+
+def compare_per_test_coverage(original, current, original_suites, current_suites):
+    """
+    Compares the coverage of every original test with the coverage of the test that replaced it.
+
+    Tests are paired by their position in the test suite, since the rewriting changes their names. Only the
+    classes instrumented identically in both runs are compared, which excludes the rewritten test classes.
+
+    Args:
+        original (dict): Per-test coverage of the original suites (see collect_per_test_coverage).
+        current (dict): Per-test coverage of the modified suites.
+        original_suites (dict): {test class: [original test names]}.
+        current_suites (dict): {test class: [modified test names]}.
+
+    Returns:
+        list: One dict per pair of tests (suite, original_test, modified_test, equal, probes_lost,
+        probes_gained).
+    """
+    original_columns = {}
+    for index, key in enumerate(zip(original["class_ids"].tolist(), original["class_names"].tolist())):
+        original_columns[key] = np.arange(original["offsets"][index], original["offsets"][index + 1])
+    current_columns = {}
+    for index, key in enumerate(zip(current["class_ids"].tolist(), current["class_names"].tolist())):
+        current_columns[key] = np.arange(current["offsets"][index], current["offsets"][index + 1])
+
+    common = [key for key in original_columns if key in current_columns]
+    original_index = np.concatenate([original_columns[key] for key in common] or [np.zeros(0, dtype=np.int64)])
+    current_index = np.concatenate([current_columns[key] for key in common] or [np.zeros(0, dtype=np.int64)])
+
+    original_rows = {test.split(".")[-1]: row for row, test in enumerate(original["tests"].tolist())}
+    current_rows = {test.split(".")[-1]: row for row, test in enumerate(current["tests"].tolist())}
+
+    def vector(coverage, rows, test, index):
+        row = rows.get(test)
+        if row is None:
+            return None
+        bits = np.unpackbits(coverage["bits"][row], count=int(coverage["offsets"][-1]))
+        return bits[index].astype(bool)
+
+    results = []
+    for suite, original_tests in original_suites.items():
+        for original_test, current_test in zip(original_tests, current_suites.get(suite, [])):
+            before = vector(original, original_rows, f"{suite}#{original_test}", original_index)
+            after = vector(current, current_rows, f"{suite}#{current_test}", current_index)
+
+            if before is None or after is None:
+                results.append({"suite": suite, "original_test": original_test, "modified_test": current_test,
+                                "equal": False, "probes_lost": None, "probes_gained": None})
+                continue
+
+            results.append({"suite": suite,
+                            "original_test": original_test,
+                            "modified_test": current_test,
+                            "equal": bool(np.array_equal(before, after)),
+                            "probes_lost": int(np.count_nonzero(before & ~after)),
+                            "probes_gained": int(np.count_nonzero(after & ~before))})
+
+    return results
+
+
+@tm.timed("coverage.per_test_compare")
+def compare_per_test_results(jacoco_files_path, output_path):
+    """
+    Compares the per-test coverage of every iteration with the per-test coverage of the original suites.
+
+    Args:
+        jacoco_files_path (str): Path to the directory containing the per-test coverage files.
+        output_path (str): Path to the project output directory (containing evosuite/ and the iterations).
+
+    Returns:
+        list: The pairs of tests whose coverage differs, as returned by compare_per_test_coverage with the
+        iteration number added.
+    """
+    original = _load_per_test_coverage(os.path.join(jacoco_files_path, "per_test_original.npz"))
+    original_suites = _suite_test_names(os.path.join(output_path, "evosuite"))
+
+    rows = []
+    for filename in sorted(os.listdir(jacoco_files_path)):
+        if not filename.startswith("per_test_") or not filename.endswith(".npz") or filename == "per_test_original.npz":
+            continue
+
+        rep = filename[len("per_test_"):-len(".npz")]
+        current = _load_per_test_coverage(os.path.join(jacoco_files_path, filename))
+        current_suites = _suite_test_names(os.path.join(output_path, rep))
+
+        for result in compare_per_test_coverage(original, current, original_suites, current_suites):
+            rows.append({"rep": rep, **result})
+
+    with open(os.path.join(output_path, "comparison_results_per_test.csv"), 'w') as file:
+        file.write("rep,suite,original_test,modified_test,equal,probes_lost,probes_gained\n")
+        for row in rows:
+            file.write(",".join("" if value is None else str(value) for value in row.values()) + "\n")
+
+    return [row for row in rows if not row["equal"]]
@@ -1,5 +1,6 @@
 import logging
 import os
+import time
 from langchain_openai import OpenAIEmbeddings
 from dotenv import load_dotenv
 import numpy as np
@@ -7,16 +8,21 @@ from numpy.linalg import norm
 
 import Parser as p
 import Output_handler as oh
+import Telemetry as tm
 
 # Main function for calculating cosine similarity of embeddings for each test in a suite
-def embeddings_cosine_similarity(output_path, project_paths, repetition):
+def embeddings_cosine_similarity(output_path, project_paths, repetition, model=None):
     """
     Computes the cosine similarity of embeddings for test methods across multiple iterations.
 
+    Besides the text results of every test suite, the similarities of each project are saved in
+    "embeddings results/similarities_<run id>.parquet" (see Output_handler.SIMILARITY_SCHEMA).
+
     Args:
         output_path (str): Path to the directory containing the output test suites.
         project_paths (str): Paths to the original projects.
         repetition (int): Number of iterations performed for each test suite.
+        model (str): The model that rewrote the test suites, recorded with the similarities.
 
     Returns:
         None: Results are saved to the specified output path.
@@ -29,7 +35,11 @@ def embeddings_cosine_similarity(output_path, project_paths, repetition):
     embeddings_model = OpenAIEmbeddings(openai_api_key=os.environ['OPENAI_API_KEY_EMBEDDINGS'],
                                         model="text-embedding-3-small")
 
+    run_id = tm.current_run_id() or time.strftime("%Y%m%d-%H%M%S")
+
     for project in project_names:
+        rows = {name: [] for name in oh.SIMILARITY_SCHEMA.names}
+
         # Extract the names of the test suites from the project's output path
         test_suites = extract_testsuite_names(os.path.join(output_path + "/" + project, "0"))
 
@@ -51,24 +61,35 @@ def embeddings_cosine_similarity(output_path, project_paths, repetition):
                 tests = [main_dict[rep][n] for rep in range(repetition)]
 
                 # Generate embeddings for each test method
-                embeddings = embeddings_model.embed_documents(tests)
+                with tm.span("embeddings.request", project=project, suite=testsuite, test=n,
+                             documents=len(tests)):
+                    embeddings = embeddings_model.embed_documents(tests)
+                tm.count("embeddings.documents", len(tests), project=project, suite=testsuite)
 
                 # Calculate pairwise cosine similarity between embeddings
-                for i in range(len(embeddings) - 1):
-                    for j in range(i + 1, len(embeddings)):
-                        similarity = cosine_similarity_of_two_embeddings(embeddings[i], embeddings[j])
-                        pair = (i, j)
-                        if pair not in results:
-                            results[pair] = []
-                        results[pair].append(round(similarity, 2))
-
-                print(results)
+                with tm.span("embeddings.similarity", project=project, suite=testsuite, test=n):
+                    for i in range(len(embeddings) - 1):
+                        for j in range(i + 1, len(embeddings)):
+                            similarity = cosine_similarity_of_two_embeddings(embeddings[i], embeddings[j])
+                            for name, value in zip(oh.SIMILARITY_SCHEMA.names,
+                                                   (model, project, testsuite[:-5], n, i, j, float(similarity))):
+                                rows[name].append(value)
+                            pair = (i, j)
+                            if pair not in results:
+                                results[pair] = []
+                            results[pair].append(round(similarity, 2))
+
+            logging.info(f"EMBEDDINGS - {project}/{testsuite}: {results}")
 
             # Export cosine similarity results
             oh.export_cosine_similarity_results(os.path.join(output_path + "/" + project, "embeddings results"),
                                                 testsuite,
                                                 results)
 
+        oh.export_cosine_similarity_table(os.path.join(output_path + "/" + project, "embeddings results"),
+                                          run_id,
+                                          rows)
+
 
 def cosine_similarity_of_two_embeddings(vec1, vec2):
     """
@@ -0,0 +1,195 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from contextlib import closing
+
+import langchainHelper as lch
+import Parser as p
+
+# File, in the output folder of each project, holding the rewrite of every test already sent to an LLM
+FINGERPRINTS_FILENAME = "fingerprints.sqlite"
+
+# Changing the format of the fingerprints invalidates all the stored rewrites
+FINGERPRINT_VERSION = 1
+
+
+def model_config(case, temperature, cascade=None, clustering=False):
+    """
+    Describes everything besides the test that changes the answer of the LLM: the model (and the cascade), the
+    temperature, the way the rewrites are generated and the wording of the prompts, so that editing a prompt
+    invalidates the previous rewrites.
+
+    Args:
+        case (int): The identifier of the model.
+        temperature (int): The temperature of the LLM.
+        cascade (list): Cheaper models tried first.
+        clustering (bool): The rewrites of the near-duplicate tests are derived from one test of their cluster (see
+            ClusterHelper), they are not reused by the runs rewriting every test, nor the other way around.
+
+    Returns:
+        dict: The configuration.
+    """
+    prompts = lch.context_prompt("{class_information}") + lch.generation_prompt("{test}", "{method_calls}")
+    if clustering:
+        prompts += lch.naming_prompt(["{test}"])
+
+    return {"version": FINGERPRINT_VERSION,
+            "model": lch.MODELS.get(case),
+            "case": case,
+            "cascade": list(cascade or []),
+            "temperature": temperature,
+            "generation": "clustered" if clustering else "single",
+            "prompts": hashlib.sha256(prompts.encode("utf-8")).hexdigest()}
+
+
+def test_fingerprint(single_test, sourcecode_test_calls, config, repetition):
+    """
+    Hashes a test, the source code of the methods it calls and the model configuration.
+
+    Args:
+        single_test (str): The test method.
+        sourcecode_test_calls (str): The source code of the methods called in the test (see
+            Parser.find_all_method_calls).
+        config (dict): The model configuration (see model_config).
+        repetition (int): The repetition, each repetition keeps its own rewrite.
+
+    Returns:
+        str: The fingerprint.
+    """
+    digest = hashlib.sha256()
+    for part in (json.dumps(config, sort_keys=True), str(repetition), single_test, sourcecode_test_calls):
+        digest.update(hashlib.sha256(part.encode("utf-8")).digest())
+
+    return digest.hexdigest()
+
+
+def suite_fingerprints(testsuite, sourcecode, config, repetition):
+    """
+    Fingerprints every test of a test suite.
+
+    Args:
+        testsuite (list): The test methods.
+        sourcecode (dict): The methods and constructors of the class under test (see Parser.fill_sourcecode_memory).
+        config (dict): The model configuration (see model_config).
+        repetition (int): The repetition.
+
+    Returns:
+        list: The fingerprint of every test.
+    """
+    return [test_fingerprint(single_test, p.find_all_method_calls(single_test, sourcecode), config, repetition)
+            for single_test in testsuite]
+
+
+class FingerprintStore:
+    """
+    Rewrites of the tests of a project, by fingerprint, kept across the runs of the tool on the same output folder.
+    """
+
+    def __init__(self, project_output_path):
+        os.makedirs(project_output_path, exist_ok=True)
+        self.path = os.path.join(project_output_path, FINGERPRINTS_FILENAME)
+
+        with closing(self._connect()) as connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS rewrites (fingerprint TEXT PRIMARY KEY, test TEXT NOT NULL, "
+                               "created_at REAL NOT NULL)")
+            # Rewrites of a repetition still running, only reused once the repetition succeeded
+            connection.execute("CREATE TABLE IF NOT EXISTS staged (fingerprint TEXT PRIMARY KEY, test TEXT NOT NULL, "
+                               "repetition INTEGER NOT NULL)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def get_many(self, fingerprints):
+        """
+        Looks up rewrites.
+
+        Args:
+            fingerprints (list): The fingerprints.
+
+        Returns:
+            dict: {fingerprint: rewritten test} of the fingerprints found.
+        """
+        found = {}
+        unique = list(dict.fromkeys(fingerprints))
+
+        with closing(self._connect()) as connection:
+            # SQLite limits the number of parameters of a query
+            for start in range(0, len(unique), 500):
+                chunk = unique[start:start + 500]
+                found.update(connection.execute(f"SELECT fingerprint, test FROM rewrites WHERE fingerprint IN "
+                                                f"({', '.join('?' * len(chunk))})", chunk).fetchall())
+
+        return found
+
+    def put_many(self, rewrites):
+        """
+        Stores rewrites, replacing the previous rewrite of the same fingerprints.
+
+        Args:
+            rewrites (dict): {fingerprint: rewritten test}.
+
+        Returns:
+            None
+        """
+        now = time.time()
+        with closing(self._connect()) as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.executemany("INSERT OR REPLACE INTO rewrites (fingerprint, test, created_at) VALUES (?, ?, ?)",
+                                   [(fingerprint, test, now) for fingerprint, test in rewrites.items()])
+            connection.execute("COMMIT")
+
+    def stage_many(self, rewrites, repetition):
+        """
+        Stores the rewrites of a repetition that has not been compiled, run and measured yet: they are not returned
+        by get_many before commit_repetition.
+
+        Args:
+            rewrites (dict): {fingerprint: rewritten test}.
+            repetition (int): The repetition.
+
+        Returns:
+            None
+        """
+        with closing(self._connect()) as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.executemany("INSERT OR REPLACE INTO staged (fingerprint, test, repetition) VALUES (?, ?, ?)",
+                                   [(fingerprint, test, repetition) for fingerprint, test in rewrites.items()])
+            connection.execute("COMMIT")
+
+    def commit_repetition(self, repetition):
+        """
+        Makes the staged rewrites of a repetition that succeeded reusable.
+
+        Args:
+            repetition (int): The repetition.
+
+        Returns:
+            None
+        """
+        now = time.time()
+        with closing(self._connect()) as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.execute("INSERT OR REPLACE INTO rewrites (fingerprint, test, created_at) "
+                               "SELECT fingerprint, test, ? FROM staged WHERE repetition = ?", (now, repetition))
+            connection.execute("DELETE FROM staged WHERE repetition = ?", (repetition,))
+            connection.execute("COMMIT")
+
+    def discard_repetition(self, repetition):
+        """
+        Drops the staged rewrites of a repetition that failed, and the rewrites stored for the same fingerprints, so
+        that its retry sends the tests to the LLM again.
+
+        Args:
+            repetition (int): The repetition.
+
+        Returns:
+            None
+        """
+        with closing(self._connect()) as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.execute("DELETE FROM rewrites WHERE fingerprint IN "
+                               "(SELECT fingerprint FROM staged WHERE repetition = ?)", (repetition,))
+            connection.execute("DELETE FROM staged WHERE repetition = ?", (repetition,))
+            connection.execute("COMMIT")
@@ -0,0 +1,359 @@
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from contextlib import closing
+
+import Output_handler as oh
+import Parser as p
+import Telemetry as tm
+import pipeline as pl
+
+# Database of the jobs, shared by the Streamlit sessions and the workers
+DEFAULT_DB_PATH = os.environ.get("JOB_QUEUE_PATH",
+                                 os.path.join(os.path.dirname(os.path.abspath(__file__)), "jobs.sqlite"))
+
+# Seconds between two polls of an idle worker, and between two heartbeats of a running job
+POLL_INTERVAL_S = 2
+HEARTBEAT_INTERVAL_S = 30
+
+# A running job without heartbeat for this long belongs to a dead worker: its project is unlocked and the job
+# queued again
+STALE_JOB_S = 300
+
+STATUSES = ["queued", "running", "done", "failed"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    project_path TEXT NOT NULL,
+    output_path TEXT NOT NULL,
+    model_case INTEGER NOT NULL,
+    temperature REAL NOT NULL,
+    repetition INTEGER NOT NULL,
+    options TEXT NOT NULL DEFAULT '{}',
+    status TEXT NOT NULL DEFAULT 'queued',
+    worker TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    submitted_at REAL NOT NULL,
+    started_at REAL,
+    heartbeat_at REAL,
+    finished_at REAL,
+    trace_path TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+CREATE TABLE IF NOT EXISTS project_locks (
+    project_path TEXT PRIMARY KEY,
+    job_id INTEGER NOT NULL,
+    acquired_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS job_messages (
+    job_id INTEGER NOT NULL,
+    ts REAL NOT NULL,
+    level TEXT NOT NULL,
+    message TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS job_messages_job ON job_messages (job_id, ts);
+"""
+
+
+def connect(db_path=DEFAULT_DB_PATH):
+    """
+    Opens the job database, creating it if needed.
+
+    Args:
+        db_path (str): Path of the SQLite database.
+
+    Returns:
+        sqlite3.Connection: The connection, in autocommit mode (transactions are opened explicitly).
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    connection = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+    connection.row_factory = sqlite3.Row
+
+    # Readers (the sessions polling the progress) do not block the workers
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.executescript(SCHEMA)
+
+    return connection
+
+
+def submit(project_path, output_path, case, temperature, repetition, options=None, db_path=DEFAULT_DB_PATH):
+    """
+    Queues the rewriting of a project.
+
+    Args:
+        project_path (str): The root path of the project.
+        output_path (str): The output folder of the tool.
+        case (int): The identifier for selecting the LLM model to use.
+        temperature (int): The temperature setting for the LLM.
+        repetition (int): Number of repetitions.
+        options (dict): The other arguments of pipeline.run_project (per_test_coverage, multi_variant, cascade,
+            incremental, clustering).
+        db_path (str): Path of the job database.
+
+    Returns:
+        int: The identifier of the job.
+
+    Raises:
+        ValueError: If the options cannot be used together (see pipeline.check_options).
+    """
+    pl.check_options(options or {})
+
+    with closing(connect(db_path)) as connection:
+        cursor = connection.execute("INSERT INTO jobs (project_path, output_path, model_case, temperature, repetition, "
+                                    "options, submitted_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                    (project_path, output_path, case, temperature, repetition,
+                                     json.dumps(options or {}), time.time()))
+        return cursor.lastrowid
+
+
+def _requeue_stale_jobs(connection):
+    # the jobs of the workers which stopped sending heartbeats are queued again
+    stale = time.time() - STALE_JOB_S
+    jobs = [row["id"] for row in connection.execute("SELECT id FROM jobs WHERE status = 'running' AND "
+                                                    "heartbeat_at < ?", (stale,))]
+    for job_id in jobs:
+        logging.warning(f"Job {job_id} has no heartbeat since {STALE_JOB_S} s, queued again.")
+        connection.execute("UPDATE jobs SET status = 'queued', worker = NULL WHERE id = ?", (job_id,))
+        connection.execute("DELETE FROM project_locks WHERE job_id = ?", (job_id,))
+
+
+def claim_job(worker, db_path=DEFAULT_DB_PATH):
+    """
+    Takes the oldest queued job whose project is not locked by a running job, and locks its project.
+
+    Args:
+        worker (str): Name of the worker.
+        db_path (str): Path of the job database.
+
+    Returns:
+        dict: The job, None if no job can be started.
+    """
+    with closing(connect(db_path)) as connection:
+        # The write lock of the database is taken before reading, two workers never claim the same job
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            _requeue_stale_jobs(connection)
+            row = connection.execute("SELECT * FROM jobs WHERE status = 'queued' AND project_path NOT IN "
+                                     "(SELECT project_path FROM project_locks) ORDER BY id LIMIT 1").fetchone()
+            if row is None:
+                connection.execute("COMMIT")
+                return None
+
+            now = time.time()
+            connection.execute("INSERT INTO project_locks (project_path, job_id, acquired_at) VALUES (?, ?, ?)",
+                               (row["project_path"], row["id"], now))
+            connection.execute("UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, "
+                               "started_at = ?, heartbeat_at = ? WHERE id = ?", (worker, now, now, row["id"]))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    return {**dict(row), "options": json.loads(row["options"])}
+
+
+def heartbeat(job_id, db_path=DEFAULT_DB_PATH):
+    """
+    Records that the job is still running.
+    """
+    with closing(connect(db_path)) as connection:
+        connection.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ?", (time.time(), job_id))
+
+
+def finish_job(job_id, error=None, db_path=DEFAULT_DB_PATH):
+    """
+    Marks a job as done (or failed) and unlocks its project.
+
+    Args:
+        job_id (int): The identifier of the job.
+        error (str): The error which stopped the job, None if it succeeded.
+        db_path (str): Path of the job database.
+
+    Returns:
+        None
+    """
+    with closing(connect(db_path)) as connection:
+        connection.execute("BEGIN IMMEDIATE")
+        connection.execute("UPDATE jobs SET status = ?, finished_at = ?, error = ? WHERE id = ?",
+                           ("failed" if error else "done", time.time(), error, job_id))
+        connection.execute("DELETE FROM project_locks WHERE job_id = ?", (job_id,))
+        connection.execute("COMMIT")
+
+
+def add_message(job_id, level, message, db_path=DEFAULT_DB_PATH):
+    """
+    Records a progress message of a job (see pipeline.run_project).
+    """
+    with closing(connect(db_path)) as connection:
+        connection.execute("INSERT INTO job_messages (job_id, ts, level, message) VALUES (?, ?, ?, ?)",
+                           (job_id, time.time(), level, message))
+
+
+def list_jobs(job_ids=None, db_path=DEFAULT_DB_PATH):
+    """
+    Reads the state of jobs.
+
+    Args:
+        job_ids (list): The identifiers of the jobs, all the jobs if None.
+        db_path (str): Path of the job database.
+
+    Returns:
+        list: The jobs as dictionaries, in submission order.
+    """
+    with closing(connect(db_path)) as connection:
+        if job_ids is None:
+            rows = connection.execute("SELECT * FROM jobs ORDER BY id").fetchall()
+        else:
+            job_ids = list(job_ids)
+            rows = connection.execute(f"SELECT * FROM jobs WHERE id IN ({', '.join('?' * len(job_ids))}) "
+                                      f"ORDER BY id", job_ids).fetchall()
+
+    return [{**dict(row), "options": json.loads(row["options"])} for row in rows]
+
+
+def job_messages(job_id, db_path=DEFAULT_DB_PATH):
+    """
+    Reads the progress messages of a job.
+
+    Returns:
+        list: (level, message) in the order they were recorded.
+    """
+    with closing(connect(db_path)) as connection:
+        return [(row["level"], row["message"]) for row in
+                connection.execute("SELECT level, message FROM job_messages WHERE job_id = ? ORDER BY ts",
+                                   (job_id,))]
+
+
+def run_job(job, db_path=DEFAULT_DB_PATH):
+    """
+    Runs a claimed job, sending heartbeats while it runs.
+
+    Args:
+        job (dict): The job returned by claim_job.
+        db_path (str): Path of the job database.
+
+    Returns:
+        None
+    """
+    stop = threading.Event()
+
+    def send_heartbeats():
+        while not stop.wait(HEARTBEAT_INTERVAL_S):
+            heartbeat(job["id"], db_path)
+
+    threading.Thread(target=send_heartbeats, name=f"heartbeat-{job['id']}", daemon=True).start()
+
+    error = None
+    try:
+        # A previous attempt stopped in the middle of a repetition: the project still holds modified test suites
+        initial_tests = os.path.join(job["output_path"] + p.extract_project_name(job["project_path"]), "evosuite")
+        if job["attempts"] > 0 and os.path.isdir(initial_tests):
+            oh.replace_files(os.path.join(job["project_path"], "src/test/java"), initial_tests)
+
+        trace_path = tm.start_run(job["output_path"], run_id=time.strftime("%Y%m%d-%H%M%S-") + f"job{job['id']}")
+        with closing(connect(db_path)) as connection:
+            connection.execute("UPDATE jobs SET trace_path = ? WHERE id = ?", (trace_path, job["id"]))
+
+        pl.run_project(job["project_path"],
+                       job["output_path"],
+                       job["model_case"],
+                       job["temperature"],
+                       job["repetition"],
+                       report=lambda level, message: add_message(job["id"], level, message, db_path),
+                       **job["options"])
+    except Exception as e:
+        logging.exception(f"Job {job['id']} failed")
+        error = repr(e)
+    finally:
+        stop.set()
+        tm.end_run()
+        finish_job(job["id"], error, db_path)
+
+
+def work(worker, db_path=DEFAULT_DB_PATH, once=False):
+    """
+    Runs the queued jobs one after the other.
+
+    Args:
+        worker (str): Name of the worker.
+        db_path (str): Path of the job database.
+        once (bool): Stop when no job can be started instead of waiting for new ones.
+
+    Returns:
+        None
+    """
+    logging.info(f"Worker {worker} started on {db_path}")
+
+    while True:
+        job = claim_job(worker, db_path)
+        if job is None:
+            if once:
+                return
+            time.sleep(POLL_INTERVAL_S)
+            continue
+
+        logging.info(f"Worker {worker} runs job {job['id']} ({job['project_path']})")
+        run_job(job, db_path)
+
+
+def start_workers(count, db_path=DEFAULT_DB_PATH):
+    """
+    Starts workers in the background, in a process independent from the caller (e.g. the Streamlit server).
+
+    Args:
+        count (int): Number of worker processes.
+        db_path (str): Path of the job database.
+
+    Returns:
+        subprocess.Popen: The process starting the workers.
+    """
+    return subprocess.Popen([sys.executable, os.path.abspath(__file__), "worker", "--workers", str(count),
+                             "--db", db_path],
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Workers of the readability improvement jobs")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    worker = subparsers.add_parser("worker", help="Run the queued jobs")
+    worker.add_argument("--workers", type=int, default=1,
+                        help="Number of worker processes (jobs of different projects run in parallel)")
+    worker.add_argument("--once", action="store_true", help="Stop when the queue is empty")
+
+    subparsers.add_parser("status", help="List the jobs")
+
+    for subparser in (worker, subparsers.choices["status"]):
+        subparser.add_argument("--db", default=DEFAULT_DB_PATH, help="Path of the job database")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(processName)s - %(levelname)s - %(message)s')
+
+    if args.command == "worker":
+        # One process per worker: the telemetry of a run is global to its process
+        names = [f"{socket.gethostname()}-{os.getpid()}-{i}" for i in range(args.workers)]
+        processes = [multiprocessing.Process(target=work, args=(name, args.db, args.once), name=name)
+                     for name in names]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+    elif args.command == "status":
+        for job in list_jobs(db_path=args.db):
+            print(f"{job['id']:>5} {job['status']:<8} {job['project_path']} (model {job['model_case']}, "
+                  f"{job['repetition']} repetitions) {job['error'] or ''}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+import Telemetry as tm
+
+# Settings of the local model, read from the environment (or the .env file):
+# LOCAL_MODEL_PATH (required): a GGUF file, or a Hugging Face repository together with LOCAL_MODEL_FILE
+# LOCAL_MODEL_TYPE: the architecture for ctransformers (llama, mistral, starcoder, ...)
+# LOCAL_MODEL_TEMPLATE: the chat template of the model (see PROMPT_TEMPLATES)
+DEFAULT_MODEL_TYPE = "llama"
+DEFAULT_TEMPLATE = "chatml"
+CONTEXT_LENGTH = 4096
+MAX_NEW_TOKENS = 1024
+
+# Prompts taken from the queue at once by the worker, and tokens of the prompts evaluated together
+MAX_BATCH_PROMPTS = 32
+PROMPT_BATCH_TOKENS = 512
+
+# Chat templates: (system message, user message, start of the answer)
+PROMPT_TEMPLATES = {
+    "chatml": ("<|im_start|>system\n{}<|im_end|>\n", "<|im_start|>user\n{}<|im_end|>\n", "<|im_start|>assistant\n"),
+    "llama3": ("<|start_header_id|>system<|end_header_id|>\n\n{}<|eot_id|>",
+               "<|start_header_id|>user<|end_header_id|>\n\n{}<|eot_id|>",
+               "<|start_header_id|>assistant<|end_header_id|>\n\n"),
+    "mistral": ("{}\n\n", "[INST] {} [/INST]", ""),
+}
+
+# Workers already started, the model is loaded once for the whole run
+_workers = {}
+_workers_lock = threading.Lock()
+
+
+def format_prompt(messages, template=DEFAULT_TEMPLATE):
+    """
+    Renders a list of chat messages with the chat template of the model.
+
+    Args:
+        messages (list): The LangChain messages.
+        template (str): The name of the template (see PROMPT_TEMPLATES).
+
+    Returns:
+        str: The prompt.
+    """
+    system, user, answer = PROMPT_TEMPLATES[template]
+
+    prompt = ""
+    for message in messages:
+        if isinstance(message, SystemMessage):
+            prompt += system.format(message.content)
+        elif isinstance(message, AIMessage):
+            prompt += f"{message.content}\n"
+        else:
+            prompt += user.format(message.content)
+
+    return prompt + answer
+
+
+class LocalModelWorker:
+    """
+    Thread owning a local model, generating the prompts submitted by all the tests of the run.
+
+    The model is loaded once, when the worker starts, and generates one prompt at a time (ctransformers models are
+    not thread safe): the prompts queued while a generation runs are taken together, up to MAX_BATCH_PROMPTS, and
+    generated back to back without going through the requesting threads.
+    """
+
+    def __init__(self, model_path, model_type=DEFAULT_MODEL_TYPE, model_file=None, threads=None):
+        self.model_path = model_path
+        self.model_type = model_type
+        self.model_file = model_file
+        self.threads = threads or os.cpu_count()
+        self._queue = queue.Queue()
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name="local-model-worker", daemon=True)
+        self._thread.start()
+
+    def _load(self):
+        # Imported here, ctransformers is only needed by the runs using a local model
+        from ctransformers import AutoModelForCausalLM
+
+        with tm.span("llm.local.load", model=self.model_path):
+            return AutoModelForCausalLM.from_pretrained(self.model_path,
+                                                        model_type=self.model_type,
+                                                        model_file=self.model_file,
+                                                        context_length=CONTEXT_LENGTH,
+                                                        batch_size=PROMPT_BATCH_TOKENS,
+                                                        threads=self.threads)
+
+    def _run(self):
+        try:
+            model = self._load()
+        except Exception as e:
+            logging.error(f"The local model {self.model_path} could not be loaded: {e}")
+            self._error = e
+            model = None
+
+        while True:
+            # Wait for a prompt, then take all the prompts queued in the meantime
+            batch = [self._queue.get()]
+            while len(batch) < MAX_BATCH_PROMPTS:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            tm.count("llm.local.batches", 1, prompts=len(batch))
+
+            for prompt, parameters, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                if model is None:
+                    future.set_exception(self._error)
+                    continue
+                try:
+                    tokens_in = len(model.tokenize(prompt))
+                    text = model(prompt, **parameters)
+                    future.set_result((text, tokens_in, len(model.tokenize(text))))
+                except Exception as e:
+                    future.set_exception(e)
+
+    def submit(self, prompt, **parameters):
+        """
+        Queues a prompt.
+
+        Args:
+            prompt (str): The formatted prompt.
+            **parameters: Generation parameters of ctransformers (temperature, max_new_tokens, stop, ...).
+
+        Returns:
+            Future: Resolved with (text, prompt tokens, completion tokens).
+        """
+        future = Future()
+        self._queue.put((prompt, parameters, future))
+        return future
+
+
+def get_worker(model_path, model_type=DEFAULT_MODEL_TYPE, model_file=None):
+    """
+    Returns the worker of a local model, starting it (and loading the model) on first use.
+
+    Args:
+        model_path (str): A GGUF file, or a Hugging Face repository.
+        model_type (str): The architecture of the model for ctransformers.
+        model_file (str): The GGUF file in the repository.
+
+    Returns:
+        LocalModelWorker: The worker.
+    """
+    key = (model_path, model_type, model_file)
+    with _workers_lock:
+        if key not in _workers:
+            _workers[key] = LocalModelWorker(model_path, model_type, model_file)
+        return _workers[key]
+
+
+class LocalChatModel(BaseChatModel):
+    """
+    LangChain chat model sending its requests to a LocalModelWorker.
+
+    Concurrent requests (e.g. llm.batch over the tests of a suite) are queued together in the worker.
+    """
+
+    model_path: str
+    model_type: str = DEFAULT_MODEL_TYPE
+    model_file: Optional[str] = None
+    template: str = DEFAULT_TEMPLATE
+    temperature: float = 0.8
+    max_new_tokens: int = MAX_NEW_TOKENS
+
+    @property
+    def _llm_type(self):
+        return "ctransformers-chat"
+
+    @property
+    def _identifying_params(self):
+        return {"model_path": self.model_path, "model_file": self.model_file, "temperature": self.temperature}
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        worker = get_worker(self.model_path, self.model_type, self.model_file)
+        future = worker.submit(format_prompt(messages, self.template),
+                               temperature=self.temperature,
+                               max_new_tokens=self.max_new_tokens,
+                               stop=stop,
+                               reset=True)
+        text, tokens_in, tokens_out = future.result()
+
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))],
+                          llm_output={"token_usage": {"prompt_tokens": tokens_in, "completion_tokens": tokens_out}})
+
+
+def local_chat_model(temperature):
+    """
+    Builds the local model configured in the environment (LOCAL_MODEL_PATH, LOCAL_MODEL_TYPE, LOCAL_MODEL_FILE,
+    LOCAL_MODEL_TEMPLATE).
+
+    Args:
+        temperature (int): The temperature setting for the LLM to control the creativity of the output.
+
+    Returns:
+        LocalChatModel: The model.
+    """
+    template = os.environ.get("LOCAL_MODEL_TEMPLATE", DEFAULT_TEMPLATE)
+    assert template in PROMPT_TEMPLATES, f"Unknown chat template {template}, must be one of {list(PROMPT_TEMPLATES)}"
+
+    return LocalChatModel(model_path=os.environ["LOCAL_MODEL_PATH"],
+                          model_type=os.environ.get("LOCAL_MODEL_TYPE", DEFAULT_MODEL_TYPE),
+                          model_file=os.environ.get("LOCAL_MODEL_FILE"),
+                          template=template,
+                          temperature=temperature)
@@ -1,10 +1,30 @@
+import gzip
+import hashlib
+import json
 import os
+import re
 import subprocess
 import shutil
 import logging
-import pandas as pd
-import csv
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import xml.etree.ElementTree as ET
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+import pyarrow.parquet as pq
+
+import CoverageHelper as ch
+import Telemetry as tm
+
+try:
+    import fcntl
+except ImportError:
+    # Windows, where the copies are never cloned
+    fcntl = None
 
 def check_output_path(output_path):
     """
@@ -27,55 +47,269 @@ def check_output_path(output_path):
     return True, "The folder exists."
 
 
-def export_new_testsuite(output_path, filename, initial_content, content):
+# Written last in the folder of a repetition, once all its test suites are complete and on disk
+EXPORT_MANIFEST_FILENAME = "_manifest.json"
+
+
+def _fsync_directory(path):
+    # makes the renames in the folder durable (not supported on Windows, where os.replace is already durable)
+    if os.name != "posix":
+        return
+    descriptor = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+
+def _temp_path(file_path):
+    # temporary file of the same folder, unique to the writing thread
+    return f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+def _atomic_write(file_path, data, fsync=True):
+    # the data is written to a temporary file of the same folder, then renamed over the final file: readers see
+    # either the previous file or the complete new one
+    temp_path = _temp_path(file_path)
+    try:
+        with open(temp_path, 'w', encoding="utf-8") as file:
+            file.write(data)
+            if fsync:
+                file.flush()
+                os.fsync(file.fileno())
+        os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+# Folder, in the output folder of each project, holding every test suite once by hash. The files of the evosuite and
+# repetition folders are hard links to these blobs, so that identical test suites take the disk space of one.
+BLOBS_DIRNAME = "blobs"
+
+
+def _store_blob(folder, data, fsync=True, mtime_ns=None):
+    # stores the content of a file of a folder of the project output (evosuite or repetition) in the blobs of the
+    # project, unless an identical file is already stored, and returns the path of the blob. mtime_ns is the
+    # modification time of a new blob, the one of the copied file (see sync_files).
+    digest = hashlib.sha256(data).hexdigest()
+    blob_dir = os.path.join(os.path.dirname(os.path.abspath(folder)), BLOBS_DIRNAME, digest[:2])
+    blob_path = os.path.join(blob_dir, digest)
+
+    if os.path.exists(blob_path):
+        tm.count("export.deduplicated", 1)
+        return blob_path
+
+    os.makedirs(blob_dir, exist_ok=True)
+    temp_path = _temp_path(blob_path)
+    try:
+        with open(temp_path, 'wb') as file:
+            file.write(data)
+            if fsync:
+                file.flush()
+                os.fsync(file.fileno())
+        if mtime_ns is not None:
+            os.utime(temp_path, ns=(mtime_ns, mtime_ns))
+        try:
+            # Unlike a rename, the link never replaces the blob stored in the meantime by another thread, that
+            # may already be linked
+            os.link(temp_path, blob_path)
+        except FileExistsError:
+            tm.count("export.deduplicated", 1)
+        except OSError:
+            os.replace(temp_path, blob_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    return blob_path
+
+
+def _link_blob(blob_path, file_path):
+    # replaces the file with a hard link to the blob in a single rename, or with a copy of the blob where hard links
+    # are not supported (e.g. FAT file systems). Blobs are never written again, the files linked to them are only
+    # replaced by new links. Returns False if the file was already linked to the blob.
+    if os.path.exists(file_path) and os.path.samefile(blob_path, file_path):
+        return False
+
+    temp_path = _temp_path(file_path)
+    try:
+        try:
+            os.link(blob_path, temp_path)
+        except OSError:
+            shutil.copy2(blob_path, temp_path)
+        os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    return True
+
+
+def prune_blobs(project_output_path):
+    """
+    Removes the blobs no longer linked from any folder of the project output, e.g. the test suites of a repetition
+    written again.
+
+    Args:
+        project_output_path (str): The output folder of the project.
+
+    Returns:
+        int: The number of blobs removed.
+    """
+    removed = 0
+    for dirpath, dirnames, filenames in os.walk(os.path.join(project_output_path, BLOBS_DIRNAME)):
+        for filename in filenames:
+            blob_path = os.path.join(dirpath, filename)
+            # The blob itself is the only link left
+            if os.stat(blob_path).st_nlink == 1:
+                os.remove(blob_path)
+                removed += 1
+
+    logging.info(f"{removed} unused blobs removed from {project_output_path}.")
+    return removed
+
+
+@tm.timed("export.testsuite")
+def export_new_testsuite(output_path, filename, initial_content, content, fsync=True):
     """
     Exports a new test suite to a specified output path.
 
+    The test suite is built in memory and stored once by hash in the blobs of the project, with a single write to a
+    temporary file renamed over the blob, then linked in the output folder (see _store_blob and _link_blob): a crash
+    never leaves a partial test suite, and the identical test suites of the repetitions share their disk space.
+
     Args:
         output_path (str): The directory to save the file.
         filename (str): The name of the file.
         initial_content (str): Initial content such as imports and class declarations.
         content (list): List of test methods to be added to the test suite.
+        fsync (bool): Flush the file to the disk before renaming it. The exports of a repetition skip it, as
+            commit_export flushes all the test suites of the repetition at once.
 
     Returns:
-        int: 1 if successful, otherwise an exception.
+        int: 1 if successful.
+
+    Raises:
+        OSError: If the file cannot be written.
     """
     # Constructs the full path to the file including the folder path and file name
     file_path = os.path.join(output_path, filename)
 
     os.makedirs(os.path.dirname(file_path), exist_ok=True)
-    logging.info(f"Directory '{os.path.dirname(file_path)}' ensured for output.")
 
-    try:
-        with open(file_path, 'w') as file:
-            # Initial content (import, ...)
-            file.write(initial_content + "\n")
+    # Initial content (import, ...), new test suite content and final closing bracket
+    data = initial_content + "\n" + "".join(c + "\n" + "\n" for c in content) + "}"
+    _link_blob(_store_blob(output_path, data.encode("utf-8"), fsync), file_path)
+    logging.info(f"File '{file_path}' written correctly.")
 
-            # Add new test suite content
-            for c in content:
-                file.write(c + "\n" + "\n")
+    return 1
 
-            # Final closing bracket
-            file.write("}")
 
-            logging.info(f"File '{file_path}' written correctly.")
+def discard_export(output_path):
+    """
+    Removes the manifest of a repetition folder before its test suites are written again, so that the folder is not
+    used until commit_export is called.
 
-        return 1
+    Args:
+        output_path (str): The folder of the repetition.
+
+    Returns:
+        None
+    """
+    manifest_path = os.path.join(output_path, EXPORT_MANIFEST_FILENAME)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
 
-    except Exception as e:
-        return e
 
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
 
-def run_jacoco(project_path):
+
+@tm.timed("export.commit")
+def commit_export(output_path, fsync=True):
+    """
+    Commits the test suites of a repetition folder: flushes all of them to the disk in a single pass, then writes
+    the manifest listing them with their hash. Only committed folders are copied in the projects (see
+    replace_files).
+
+    Args:
+        output_path (str): The folder of the repetition.
+        fsync (bool): Flush the test suites and the manifest to the disk.
+
+    Returns:
+        dict: The manifest, {"files": {filename: sha256}, "committed_at": timestamp}.
+    """
+    files = sorted(filename for filename in os.listdir(output_path) if filename.endswith(".java"))
+
+    if fsync:
+        for filename in files:
+            descriptor = os.open(os.path.join(output_path, filename), os.O_RDONLY)
+            try:
+                os.fsync(descriptor)
+            finally:
+                os.close(descriptor)
+        _fsync_directory(output_path)
+
+    manifest = {"files": {filename: _file_sha256(os.path.join(output_path, filename)) for filename in files},
+                "committed_at": time.time()}
+    _atomic_write(os.path.join(output_path, EXPORT_MANIFEST_FILENAME), json.dumps(manifest, indent=2), fsync)
+    if fsync:
+        _fsync_directory(output_path)
+
+    return manifest
+
+
+def read_export_manifest(output_path):
+    """
+    Reads the manifest of a repetition folder and checks that its test suites are the committed ones.
+
+    Args:
+        output_path (str): The folder of the repetition.
+
+    Returns:
+        dict: The manifest.
+
+    Raises:
+        ValueError: If the folder was not committed or a test suite changed since.
+    """
+    manifest_path = os.path.join(output_path, EXPORT_MANIFEST_FILENAME)
+    if not os.path.exists(manifest_path):
+        raise ValueError(f"The test suites of {output_path} were not committed.")
+
+    with open(manifest_path, 'r', encoding="utf-8") as file:
+        manifest = json.load(file)
+
+    for filename, digest in manifest["files"].items():
+        file_path = os.path.join(output_path, filename)
+        if not os.path.exists(file_path) or _file_sha256(file_path) != digest:
+            raise ValueError(f"The test suite {file_path} differs from the committed one.")
+
+    return manifest
+
+
+@tm.timed("maven")
+def run_jacoco(project_path, per_test=False):
     """
     Runs JaCoCo to collect code coverage information for the specified project.
 
     Args:
         project_path (str): Path to the project directory.
+        per_test (bool): If True, the per-test coverage listener is added to the test sources for the run,
+            so that every test method also gets its own exec file (see CoverageHelper).
 
     Returns:
         None: Logs the success or failure of the command.
     """
+    if per_test:
+        ch.install_listener(project_path)
+
     try:
         subprocess.run("mvn clean test",
                        shell=True,
@@ -90,46 +324,191 @@ def run_jacoco(project_path):
         logging.error("\n\nError running JaCoCo: " + str(e))
         return e
 
+    finally:
+        if per_test:
+            ch.remove_listener(project_path)
+
+
+# Threads copying the files of a sync_files call
+SYNC_WORKERS = 16
+
+# ioctl cloning a file on the Linux file systems supporting copy-on-write copies (btrfs, XFS, ...)
+FICLONE = 0x40049409
+
+
+def _clone_file(source_path, destination_path):
+    # copy-on-write clone of the file, sharing its blocks until one of the two files is written. Returns False where
+    # cloning is not supported, leaving an empty destination file.
+    if fcntl is None or not sys.platform.startswith("linux"):
+        return False
+
+    with open(source_path, 'rb') as source, open(destination_path, 'wb') as destination:
+        try:
+            fcntl.ioctl(destination.fileno(), FICLONE, source.fileno())
+        except OSError:
+            return False
+
+    return True
+
+
+def _same_file_content(source_path, destination_path, compare):
+    # compares two files by size and modification time (preserved by the copies), or by hash
+    source_stat, destination_stat = os.stat(source_path), os.stat(destination_path)
+    if source_stat.st_size != destination_stat.st_size:
+        return False
+    if compare == "hash":
+        return _file_sha256(source_path) == _file_sha256(destination_path)
+
+    return source_stat.st_mtime_ns == destination_stat.st_mtime_ns
+
+
+def _sync_file(source_path, destination_path, compare, blobs):
+    # brings a single file up to date, returning what was done
+    if blobs:
+        with open(source_path, 'rb') as file:
+            blob_path = _store_blob(os.path.dirname(destination_path), file.read(), fsync=False,
+                                    mtime_ns=os.fstat(file.fileno()).st_mtime_ns)
+        return "linked" if _link_blob(blob_path, destination_path) else "skipped"
+
+    if os.path.isfile(destination_path) and _same_file_content(source_path, destination_path, compare):
+        return "skipped"
+
+    # The copy is renamed over the destination, that is never seen half written
+    temp_path = _temp_path(destination_path)
+    try:
+        outcome = "cloned" if _clone_file(source_path, temp_path) else "copied"
+        if outcome == "copied":
+            shutil.copyfile(source_path, temp_path)
+        shutil.copystat(source_path, temp_path)
+        os.replace(temp_path, destination_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    return outcome
+
+
+def sync_files(pairs, compare="stat", blobs=False, workers=SYNC_WORKERS):
+    """
+    Copies many files at once with a pool of threads, skipping the files already up to date.
+
+    A destination is up to date when it has the size and the modification time of its source (the copies preserve
+    it), or the same hash when compare is "hash". Copies are cloned (copy-on-write) where the file system supports
+    it, and written to a temporary file renamed over the destination otherwise.
+
+    Args:
+        pairs (list): (source path, destination path) of every file.
+        compare (str): "stat" or "hash".
+        blobs (bool): Hard link the destinations to the blobs of the project output instead of copying them (only for
+            the folders of the project output, see _store_blob).
+        workers (int): The number of threads.
+
+    Returns:
+        dict: {outcome: number of files}, the outcomes being "copied", "cloned", "linked", "skipped" and "failed".
+    """
+    def sync(pair):
+        try:
+            return _sync_file(pair[0], pair[1], compare, blobs)
+        except Exception as e:
+            logging.error(f"Error copying {pair[0]} to {pair[1]}: {e}")
+            return "failed"
+
+    counts = {"copied": 0, "cloned": 0, "linked": 0, "skipped": 0, "failed": 0}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for outcome in executor.map(sync, pairs):
+            counts[outcome] += 1
 
-def replace_files(project_path, output_path):
+    for outcome, number in counts.items():
+        if number:
+            tm.count(f"files.{outcome}", number)
+
+    return counts
+
+
+@tm.timed("files.replace")
+def replace_files(project_path, output_path, committed=False):
     """
     Replaces Java files in the project directory with those from the output directory.
 
+    Only the files differing from the output directory are copied (see sync_files). The project gets copies, never
+    hard links, as its files can be edited in place.
+
     Args:
         project_path (str): Path to the project's source directory.
         output_path (str): Path to the directory containing files to replace.
+        committed (bool): Only copy the test suites listed in the manifest of the folder, after checking them
+            (see commit_export), raising a ValueError if the folder was not committed.
 
     Returns:
-        None: Logs the number of files replaced.
+        dict: The number of files copied, skipped, ... (see sync_files).
+
+    Raises:
+        OSError: If committed and some of the test suites could not be copied, the project would run a mix of the
+            test suites of the folder and of the previous ones.
     """
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-    output_files = {filename: os.path.join(output_path, filename) for filename in os.listdir(output_path)}
+    if committed:
+        output_files = {filename: os.path.join(output_path, filename)
+                        for filename in read_export_manifest(output_path)["files"]}
+    else:
+        output_files = {filename: os.path.join(output_path, filename) for filename in os.listdir(output_path)}
+
+    pairs = [(output_files[filename], os.path.join(root, filename))
+             for root, dirs, files in os.walk(project_path)
+             for filename in files if filename in output_files]
 
-    replaced_count = 0
+    counts = sync_files(pairs)
+    logging.info(f"Operation completed. Files replaced: {counts['copied'] + counts['cloned']}, "
+                 f"unchanged: {counts['skipped']}, failed: {counts['failed']}.")
 
-    for root, dirs, files in os.walk(project_path):
-        for filename in files:
-            if filename in output_files:
-                try:
-                    source_file_path = os.path.join(root, filename)
-                    output_file_path = output_files[filename]
+    if committed and counts["failed"]:
+        raise OSError(f"{counts['failed']} test suites of {output_path} could not be copied to {project_path}.")
+
+    return counts
 
-                    if os.path.isfile(source_file_path):
-                        os.remove(source_file_path)
-                    shutil.copy2(output_file_path, source_file_path)
-                    logging.info(f"File {filename} successfully replaced in {root}.")
-                    replaced_count += 1
-                except Exception as e:
-                    logging.error(f"Error replacing file {filename} in {root}: {e}")
 
-    logging.info(f"Operation completed. Number of files replaced: {replaced_count}.")
+# Compression of the raw JaCoCo reports kept in the output: "gzip", or "zstd" (requires the zstandard package)
+JACOCO_COMPRESSION = os.environ.get("JACOCO_COMPRESSION", "gzip")
 
 
+def compress_file(source_path, destination_path, compression=JACOCO_COMPRESSION):
+    """
+    Writes a compressed copy of a file.
+
+    Args:
+        source_path (str): The file to compress.
+        destination_path (str): The compressed file, without the extension of the compression.
+        compression (str): "gzip" or "zstd".
+
+    Returns:
+        str: The path of the compressed file (.gz or .zst).
+    """
+    if compression == "zstd":
+        # Imported here, zstandard is only needed when the reports are compressed with zstd
+        import zstandard
+
+        destination_path += ".zst"
+        with open(source_path, 'rb') as source, open(destination_path, 'wb') as destination:
+            zstandard.ZstdCompressor(level=10).copy_stream(source, destination)
+    else:
+        destination_path += ".gz"
+        with open(source_path, 'rb') as source, gzip.open(destination_path, 'wb', compresslevel=6) as destination:
+            shutil.copyfileobj(source, destination, 1024 * 1024)
+
+    return destination_path
+
+
+@tm.timed("jacoco.save")
 def save_jacoco_csv(output_path, project_path, rep):
     """
     Saves the JaCoCo CSV and XML results to the specified output path.
 
+    The coverage tables used by the comparisons are written as Parquet files (jacoco_<rep>.parquet and
+    jacoco_<rep>_xml.parquet) straight from the reports of the project, while the raw reports are only kept
+    compressed (see JACOCO_COMPRESSION).
+
     Args:
         output_path (str): Directory to save the JaCoCo results.
         project_path (str): Path to the project's JaCoCo output.
@@ -150,100 +529,166 @@ def save_jacoco_csv(output_path, project_path, rep):
     destination_file_csv = os.path.join(output_path, new_filename_csv)
     destination_file_xml = os.path.join(output_path, new_filename_xml)
     if rep == -1: os.makedirs(os.path.dirname(destination_file_csv), exist_ok=True)
-    shutil.copy(project_path, destination_file_csv)
-    shutil.copy(project_path[: -4] + ".xml", destination_file_xml)
 
     # XML information extraction
-    extract_xml_coverage_info(destination_file_xml)
+    extract_xml_coverage_info(project_path[: -4] + ".xml",
+                              os.path.splitext(destination_file_xml)[0] + "_xml.parquet")
 
-    pd.read_csv(destination_file_csv).query("INSTRUCTION_COVERED != 0").to_csv(destination_file_csv, index=False)
+    # Keep only the covered rows of the aggregate report
+    table = pv.read_csv(project_path)
+    table = table.filter(pc.not_equal(table["INSTRUCTION_COVERED"], 0))
+    pq.write_table(table, os.path.splitext(destination_file_csv)[0] + ".parquet")
+
+    compress_file(project_path, destination_file_csv)
+    compress_file(project_path[: -4] + ".xml", destination_file_xml)
 
     logging.info(f'JaCoCo files for iteration number {rep} saved.')
 
 
-def extract_xml_coverage_info(path):
+# Columns of the method level coverage table extracted from the JaCoCo XML report
+XML_COVERAGE_SCHEMA = pa.schema([
+    ("sourcefile", pa.string()),
+    ("classname", pa.string()),
+    ("method", pa.string()),
+    ("desc", pa.string()),
+    ("line_nr", pa.int32()),
+    ("instr_missed", pa.int64()),
+    ("instr_covered", pa.int64()),
+    ("line_missed", pa.int64()),
+    ("line_covered", pa.int64()),
+    ("comp_missed", pa.int64()),
+    ("comp_covered", pa.int64()),
+    ("meth_missed", pa.int64()),
+    ("meth_covered", pa.int64()),
+    ("class_missed", pa.int64()),
+    ("class_covered", pa.int64()),
+])
+
+# JaCoCo counter type -> prefix of the corresponding columns
+COUNTER_COLUMNS = {
+    "INSTRUCTION": "instr",
+    "LINE": "line",
+    "COMPLEXITY": "comp",
+    "METHOD": "meth",
+    "CLASS": "class",
+}
+
+
+@tm.timed("jacoco.xml_parse")
+def read_xml_coverage_table(path):
     """
-    Extracts coverage information from a JaCoCo XML file and saves it to a CSV.
+    Reads a JaCoCo XML report in streaming mode and returns its method level coverage as a columnar table.
+
+    Elements are cleared as soon as they have been processed, so the memory used does not depend on the
+    size of the report.
 
     Args:
         path (str): Path to the JaCoCo XML file.
 
     Returns:
-        None: Saves the extracted information to a CSV file.
+        pyarrow.Table: One row per method, with the columns described by XML_COVERAGE_SCHEMA.
     """
-    try:
-        # Parse the XML file
-        tree = ET.parse(path)
-        root = tree.getroot()
+    columns = {name: [] for name in XML_COVERAGE_SCHEMA.names}
+
+    sourcefile_name = classname = None
+    method_counters = None
+
+    for event, element in ET.iterparse(path, events=("start", "end")):
+        tag = element.tag
+
+        if event == "start":
+            if tag == "class":
+                sourcefile_name = element.get('sourcefilename')
+                classname = element.get('name')
+            elif tag == "method":
+                method_counters = {}
+            continue
+
+        if tag == "counter":
+            # Only the counters of a method are relevant, class and package totals are skipped
+            if method_counters is not None and element.get('type') in COUNTER_COLUMNS:
+                prefix = COUNTER_COLUMNS[element.get('type')]
+                method_counters[prefix + "_missed"] = int(element.get('missed'))
+                method_counters[prefix + "_covered"] = int(element.get('covered'))
+
+        elif tag == "method":
+            line_nr = element.get('line')
+            columns["sourcefile"].append(sourcefile_name)
+            columns["classname"].append(classname)
+            columns["method"].append(element.get('name'))
+            # Descriptor of the parameter and return types, telling apart the overloads and the synthetic methods
+            columns["desc"].append(element.get('desc'))
+            columns["line_nr"].append(int(line_nr) if line_nr is not None else None)
+            for name in XML_COVERAGE_SCHEMA.names[5:]:
+                columns[name].append(method_counters.get(name))
+            method_counters = None
+            element.clear()
+
+        elif tag in ("class", "sourcefile", "package", "group"):
+            element.clear()
+
+    return pa.table(columns, schema=XML_COVERAGE_SCHEMA)
+
+
+def read_coverage_table(path, columns=None):
+    """
+    Reads a coverage table previously saved as Parquet, memory mapping the file.
+
+    Args:
+        path (str): Path to the Parquet file.
+        columns (list): Optional subset of columns to read.
+
+    Returns:
+        pyarrow.Table: The coverage table.
+    """
+    return pq.read_table(path, columns=columns, memory_map=True)
+
+
+def extract_xml_coverage_info(path, parquet_path=None):
+    """
+    Extracts coverage information from a JaCoCo XML file and saves it to a Parquet file.
+
+    Args:
+        path (str): Path to the JaCoCo XML file.
+        parquet_path (str): Path of the Parquet file, by default <report name>_xml.parquet next to the XML file.
+
+    Returns:
+        None: Saves the extracted information to the Parquet file.
 
+    Raises:
+        ET.ParseError: If the report is corrupt or truncated, no Parquet file is written.
+        FileNotFoundError: If the report does not exist.
+    """
+    if parquet_path is None:
         # Extract the filename without extension
         base_filename = os.path.splitext(os.path.basename(path))[0]
-        # Create the new CSV filename
-        new_csv_filename = f"{base_filename}_xml.csv"
-        new_csv_path = os.path.join(os.path.dirname(path), new_csv_filename)
-
-        # Collect data to write to the new CSV
-        data_to_append = [["sourcefile", "classname", "method", "line_nr", "instr_missed", "instr_covered", "line_missed", "line_covered", "comp_missed", "comp_covered", "meth_missed", "meth_covered", "class_missed", "class_covered"]]  # Including headers
-
-        for package in root.findall('package'):
-            for class_element in package.findall('class'):
-                sourcefile_name = class_element.get('sourcefilename')
-                classname = class_element.get('name')
-
-                for method in class_element.findall('method'):
-                    method_name = method.get('name')
-                    line_nr = method.get('line')
-
-                    instr_missed = instr_covered = line_missed = line_covered = comp_missed = comp_covered = meth_missed = meth_covered = class_missed = class_covered = ""
-
-                    for counter in method.findall('counter'):
-                        counter_type = counter.get('type')
-                        missed = counter.get('missed')
-                        covered = counter.get('covered')
-
-                        if counter_type == "INSTRUCTION":
-                            instr_missed = missed
-                            instr_covered = covered
-                        elif counter_type == "LINE":
-                            line_missed = missed
-                            line_covered = covered
-                        elif counter_type == "COMPLEXITY":
-                            comp_missed = missed
-                            comp_covered = covered
-                        elif counter_type == "METHOD":
-                            meth_missed = missed
-                            meth_covered = covered
-                        elif counter_type == "CLASS":
-                            class_missed = missed
-                            class_covered = covered
-
-                    data_to_append.append([sourcefile_name, classname, method_name, line_nr, instr_missed, instr_covered, line_missed, line_covered, comp_missed, comp_covered, meth_missed, meth_covered, class_missed, class_covered])
-
-        # Write the collected data to the new CSV file
-        with open(new_csv_path, 'w', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerows(data_to_append)
-
-        logging.info(f"Data successfully written to {new_csv_path}")
+        # Create the new Parquet filename
+        parquet_path = os.path.join(os.path.dirname(path), f"{base_filename}_xml.parquet")
 
+    try:
+        table = read_xml_coverage_table(path)
     except ET.ParseError as e:
-        logging.error(f"Error parsing the XML file: {e}")
-    except FileNotFoundError as e:
-        logging.error(f"File not found: {e}")
-    except Exception as e:
-        logging.error(f"An error occurred: {e}")
+        raise ET.ParseError(f"Error parsing the JaCoCo XML report {path}: {e}") from e
 
+    pq.write_table(table, parquet_path)
 
+    logging.info(f"Data successfully written to {parquet_path}")
+
+
+@tm.timed("files.copy_initial")
 def copy_initial_files(project_path, output_path):
     """
     Copies the initial Java test files to the specified output path.
 
+    The copies are hard links to the blobs of the project output (see _store_blob), shared with the identical test
+    suites of the repetitions.
+
     Args:
         project_path (str): Path to the project's test directory.
         output_path (str): Path to the directory where the files should be copied.
 
     Returns:
-        None: Logs the copy operation.
+        dict: The number of files linked, skipped, ... (see sync_files).
     """
     # Setting up logging
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -251,66 +696,151 @@ def copy_initial_files(project_path, output_path):
     # Ensure the output directory exists
     os.makedirs(output_path, exist_ok=True)
 
-    # Walk through the directory tree starting at project_path
-    for dirpath, dirnames, filenames in os.walk(project_path):
-        for filename in filenames:
-            if filename.endswith(".java"):
-                # Construct the full path to the source file
-                source_file = os.path.join(dirpath, filename)
+    # Every Java file of the directory tree starting at project_path, placed directly in the root of output_path
+    pairs = [(os.path.join(dirpath, filename), os.path.join(output_path, filename))
+             for dirpath, dirnames, filenames in os.walk(project_path)
+             for filename in filenames if filename.endswith(".java")]
+
+    counts = sync_files(pairs, blobs=True)
+    logging.info(f"Initial test files copied to {output_path}: {counts['linked']} updated, "
+                 f"{counts['skipped']} unchanged, {counts['failed']} failed.")
 
-                # Construct the full path to the destination file in the root of output_path
-                destination_file = os.path.join(output_path, filename)
+    return counts
 
-                # Copy the file to the output directory, placing it directly in the root of output_path
-                shutil.copy2(source_file, destination_file)
-                logging.info(f"Copied: {source_file} to {destination_file}")
 
+# Columns identifying a row of the aggregate (CSV) and of the method level (XML) coverage tables
+AGGREGATE_KEYS = ["PACKAGE", "CLASS"]
+SPECIFIC_KEYS = ["classname", "method", "desc", "line_nr"]
 
-def compare_jacoco_csv(jacoco_files_path, output_path):
+
+def load_coverage_baseline(jacoco_files_path):
+    """
+    Loads the coverage tables of the original test suite, indexed by their identifying columns.
+
+    Args:
+        jacoco_files_path (str): Path to the directory containing the JaCoCo Parquet files.
+
+    Returns:
+        dict: {"aggregate": DataFrame, "specific": DataFrame} with the original coverage.
+    """
+    return {
+        "aggregate": read_coverage_table(os.path.join(jacoco_files_path, "jacoco_original.parquet"))
+                     .to_pandas().set_index(AGGREGATE_KEYS),
+        "specific": read_coverage_table(os.path.join(jacoco_files_path, "jacoco_original_xml.parquet"))
+                    .to_pandas().set_index(SPECIFIC_KEYS),
+    }
+
+
+def diff_coverage(original, current):
+    """
+    Compares two coverage tables indexed by the same keys and reports the rows whose counters changed.
+
+    The tables are aligned with a single hash join on their index, so the order of the rows is irrelevant.
+
+    Args:
+        original (DataFrame): Coverage of the original test suite.
+        current (DataFrame): Coverage of the modified test suite.
+
+    Returns:
+        DataFrame: One row per changed element, with the element key, a status ("changed", "missing" or
+        "added") and a description of the changed counters. Empty if the coverage is identical.
+    """
+    joined = original.join(current, how="outer", lsuffix="_original", rsuffix="_current").convert_dtypes()
+
+    in_original = joined.index.isin(original.index)
+    in_current = joined.index.isin(current.index)
+
+    changed = pd.Series(False, index=joined.index)
+    changes = pd.Series("", index=joined.index)
+    for column in original.columns:
+        before = joined[column + "_original"]
+        after = joined[column + "_current"]
+        # Missing counters are equal on both sides
+        column_changed = (before != after).fillna(True) & ~(before.isna() & after.isna())
+        changed |= column_changed
+        description = (column + ": " + before.astype(object).astype(str)
+                       + " -> " + after.astype(object).astype(str) + "; ")
+        changes += description.where(column_changed & in_original & in_current, "")
+
+    diff = pd.DataFrame({
+        "element": [".".join(str(part) for part in key) if isinstance(key, tuple) else str(key)
+                    for key in joined.index],
+        "status": "changed",
+        "changes": changes.str.rstrip("; ").values,
+    }, index=joined.index)
+    diff.loc[~in_current, "status"] = "missing"
+    diff.loc[~in_original, "status"] = "added"
+
+    return diff[changed.values | ~in_original | ~in_current].reset_index(drop=True)
+
+
+# Parquet coverage tables of the iterations, jacoco_<rep>.parquet and jacoco_<rep>_xml.parquet
+ITERATION_TABLE = re.compile(r"jacoco_(\d+)(?:_xml)?\.parquet")
+
+
+@tm.timed("coverage.compare")
+def compare_jacoco_csv(jacoco_files_path, output_path, repetitions=None):
     """
-    Compares JaCoCo CSV files to check for differences in code coverage between iterations.
+    Compares the JaCoCo coverage of every iteration with the coverage of the original test suite.
+
+    The original coverage is loaded only once. Besides the Boolean results of each iteration, the elements
+    (classes for the aggregate report, methods for the specific one) whose counters changed are written to
+    comparison_results_diff.csv. An iteration missing one of its coverage tables fails the comparison, with the
+    status "not_measured".
 
     Args:
-        jacoco_files_path (str): Path to the directory containing JaCoCo CSV files.
+        jacoco_files_path (str): Path to the directory containing the JaCoCo Parquet files.
         output_path (str): Path to the directory where comparison results will be saved.
+        repetitions (int): The number of iterations of the run, all expected to be measured. By default, the
+            iterations having at least one of their coverage tables saved.
 
     Returns:
-        None: Writes comparison results to text files.
+        DataFrame: All the differences found, one row per changed element and iteration.
     """
-    # Aggregate info
-    jacoco_original_path = os.path.join(jacoco_files_path, "jacoco_original.csv")
     output_txt_path = os.path.join(output_path, "comparison_results_aggregate.txt")
-
-    # Specific info
-    jacoco_original_path_xml = os.path.join(jacoco_files_path, "jacoco_original_xml.csv")
     output_txt_path_xml = os.path.join(output_path, "comparison_results_specific.txt")
+    output_diff_path = os.path.join(output_path, "comparison_results_diff.csv")
 
-    # Read the original CSV files
-    with open(jacoco_original_path, newline='') as original_file:
-        original_reader = list(csv.reader(original_file))
-
-    with open(jacoco_original_path_xml, newline='') as original_file_xml:
-        original_reader_xml = list(csv.reader(original_file_xml))
+    baseline = load_coverage_baseline(jacoco_files_path)
 
     # Results storage
     results_aggregate = []
     results_specific = []
+    diffs = []
 
-    # Compare files
-    for filename in os.listdir(jacoco_files_path):
-        current_path = os.path.join(jacoco_files_path, filename)
-
-        if filename.startswith("jacoco_") and filename.endswith(".csv") and filename != "jacoco_original.csv" and filename != "jacoco_original_xml.csv":
-            with open(current_path, newline='') as current_file:
-                current_reader = list(csv.reader(current_file))
-                if filename.endswith("_xml.csv"):
-                    comparison_result = (current_reader == original_reader_xml)
-                    file_number = filename.replace('jacoco_', '').replace('_xml.csv', '')
-                    results_specific.append(f"{file_number}: {comparison_result}")
-                else:
-                    comparison_result = (current_reader == original_reader)
-                    file_number = filename.replace('jacoco_', '').replace('.csv', '')
-                    results_aggregate.append(f"{file_number}: {comparison_result}")
+    # Collect the iteration numbers of the saved coverage tables
+    if repetitions is None:
+        iterations = sorted({int(match.group(1)) for match in map(ITERATION_TABLE.fullmatch,
+                                                                  os.listdir(jacoco_files_path)) if match})
+    else:
+        iterations = range(repetitions)
+
+    for rep in iterations:
+        for report, keys, filename, results in (
+                ("aggregate", AGGREGATE_KEYS, f"jacoco_{rep}.parquet", results_aggregate),
+                ("specific", SPECIFIC_KEYS, f"jacoco_{rep}_xml.parquet", results_specific)):
+            current_path = os.path.join(jacoco_files_path, filename)
+            if not os.path.exists(current_path):
+                # The coverage of the iteration was not saved: it cannot be the original one
+                results.append(f"{rep}: False")
+                diffs.append(pd.DataFrame([{"rep": rep, "report": report, "element": filename,
+                                            "status": "not_measured", "changes": ""}]))
+                logging.error(f"Coverage of iteration {rep} not compared: {current_path} does not exist.")
+                continue
+
+            current = read_coverage_table(current_path).to_pandas().set_index(keys)
+            diff = diff_coverage(baseline[report], current)
+            results.append(f"{rep}: {diff.empty}")
+
+            if not diff.empty:
+                diff.insert(0, "report", report)
+                diff.insert(0, "rep", rep)
+                diffs.append(diff)
+                logging.warning(f"Coverage of iteration {rep} differs from the original in "
+                                f"{len(diff)} {report} elements, see {output_diff_path}")
+
+    diffs = pd.concat(diffs, ignore_index=True) if diffs else pd.DataFrame(
+        columns=["rep", "report", "element", "status", "changes"])
 
     # Write results to output files
     with open(output_txt_path, 'w') as result_file:
@@ -321,7 +851,47 @@ def compare_jacoco_csv(jacoco_files_path, output_path):
         for result in results_specific:
             result_file_xml.write(result + "\n")
 
+    diffs.to_csv(output_diff_path, index=False)
+
+    return diffs
+
+
+# Structured similarities written next to the text results, one file per run, read by code-analysis/data_store.py
+SIMILARITY_SCHEMA = pa.schema([
+    ("model", pa.string()),
+    ("project", pa.string()),
+    ("suite", pa.string()),
+    ("test_index", pa.int32()),
+    ("rep_i", pa.int32()),
+    ("rep_j", pa.int32()),
+    ("similarity", pa.float64()),
+])
+
+
+@tm.timed("export.similarities")
+def export_cosine_similarity_table(output_path, run_id, rows):
+    """
+    Exports the cosine similarities of a run as a Parquet file.
+
+    Every run writes its own file, so that the folder can be read (and ingested) as a single dataset.
+
+    Args:
+        output_path (str): Directory to save the results (the embeddings results folder).
+        run_id (str): Identifier of the run.
+        rows (dict): Columns of the similarities, as described by SIMILARITY_SCHEMA.
+
+    Returns:
+        str: Path of the written file.
+    """
+    os.makedirs(output_path, exist_ok=True)
+
+    file_path = os.path.join(output_path, f"similarities_{run_id}.parquet")
+    pq.write_table(pa.table(rows, schema=SIMILARITY_SCHEMA), file_path)
+
+    return file_path
+
 
+@tm.timed("export.similarities")
 def export_cosine_similarity_results(output_path, testsuite, result):
     """
     Exports the cosine similarity results to a file.
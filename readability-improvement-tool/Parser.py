@@ -1,5 +1,6 @@
 import javalang
 import os
+import re
 
 # Extracts individual test methods from a test suite string.
 # Returns a list of the test methods in string format.
@@ -53,11 +54,63 @@ def new_test_extraction(response):
     return test_text
 
 
+# Renders a type of the javalang AST as written in Java, with its generic arguments and array dimensions.
+def type_to_string(type_node, dimensions=None):
+    """
+    Renders a type of the javalang AST (e.g. Map.Entry<String, List<? extends T>>[]).
+
+    Args:
+        type_node (javalang.tree.Type): The type, None for void.
+        dimensions (list): Dimensions declared after the name of a variable (int values[]).
+
+    Returns:
+        str: The type.
+    """
+    if type_node is None:
+        return "void"
+
+    type_str = type_node.name
+    if getattr(type_node, "arguments", None):
+        arguments = []
+        for argument in type_node.arguments:
+            if argument.pattern_type == "?":
+                arguments.append("?")
+            elif argument.pattern_type is not None:
+                arguments.append(f"? {argument.pattern_type} {type_to_string(argument.type)}")
+            else:
+                arguments.append(type_to_string(argument.type))
+        type_str += f"<{', '.join(arguments)}>"
+
+    # Qualified types (java.util.List, Map.Entry) are nested, the dimensions are on the outermost one
+    if getattr(type_node, "sub_type", None) is not None:
+        type_str += "." + type_to_string(type_node.sub_type)
+
+    return type_str + "[]" * (len(type_node.dimensions or []) + len(dimensions or []))
+
+
+# Renders the parameters of a method or constructor, with their full types.
+def parameters_to_string(parameters):
+    """
+    Renders the parameters of a method or constructor declaration.
+
+    Args:
+        parameters (list): The javalang FormalParameter nodes.
+
+    Returns:
+        str: The parameters separated by commas (String... values for varargs).
+    """
+    return ', '.join(f"{type_to_string(param.type)}{'...' if param.varargs else ''} {param.name}"
+                     for param in parameters)
+
+
 # Extracts main information of a Java class (class name, constructors, fields, methods).
 def class_information_extraction(sourcecode):
     """
     Extracts key information from a Java source code file, such as class name, constructors, fields, and methods.
 
+    The types are rendered in full, generic arguments and arrays included (see type_to_string). The summaries are
+    cached across runs by ClassInformationHelper.
+
     Args:
         sourcecode (str): The Java source code as a string.
 
@@ -79,22 +132,29 @@ def class_information_extraction(sourcecode):
                         isinstance(constructor, javalang.tree.ConstructorDeclaration)]
         info_str += "\nConstructors:\n"
         for constructor in constructors:
-            param_list = ', '.join(f"{param.type.name} {param.name}" for param in constructor.parameters)
-            info_str += f"- {constructor.name}({param_list})\n"
+            info_str += f"- {constructor.name}({parameters_to_string(constructor.parameters)})\n"
 
-        # Fields
+        # Fields, one line per variable of the declaration
         info_str += "\nFields:\n"
         for field in node.fields:
             access_modifier = "public" if "public" in field.modifiers else "private"
-            info_str += f"- {access_modifier} {field.type.name} {field.declarators[0].name}\n"
+            for declarator in field.declarators:
+                info_str += f"- {access_modifier} {type_to_string(field.type, declarator.dimensions)} " \
+                            f"{declarator.name}\n"
 
         # Methods
         info_str += "\nMethods:\n"
         for method in node.methods:
             if method.name != class_name:
                 access_modifier = "public" if "public" in method.modifiers else "private"
-                param_list = ', '.join(f"{param.type.name} {param.name}" for param in method.parameters)
-                method_signature = f"{access_modifier} {method.name}({param_list})"
+                type_parameters = ""
+                if method.type_parameters:
+                    type_parameters = "<" + ", ".join(
+                        parameter.name + (" extends " + " & ".join(type_to_string(bound) for bound in parameter.extends)
+                                          if parameter.extends else "")
+                        for parameter in method.type_parameters) + "> "
+                method_signature = f"{access_modifier} {type_parameters}{type_to_string(method.return_type)} " \
+                                   f"{method.name}({parameters_to_string(method.parameters)})"
                 info_str += f"- {method_signature}\n"
 
     return info_str
@@ -246,6 +306,23 @@ def extract_initial_info_of_the_test_suite(testsuite):
     return '\n'.join(lines_to_keep)
 
 
+# Extracts the name of a test method.
+def extract_test_name(test_method):
+    """
+    Extracts the name of a test method.
+
+    Args:
+        test_method (str): The test method as a string.
+
+    Returns:
+        str: The name of the test method.
+    """
+    start = test_method.find("void") + 4
+    end = test_method.find("(", start)
+
+    return test_method[start:end].strip()
+
+
 # Identifies duplicate test methods in a test suite.
 def find_duplicate_tests(test_list):
     """
@@ -260,9 +337,7 @@ def find_duplicate_tests(test_list):
     method_indices = {}
 
     for index, test_method in enumerate(test_list):
-        start = test_method.find("void") + 4
-        end = test_method.find("(", start)
-        method_name = test_method[start:end].strip()
+        method_name = extract_test_name(test_method)
 
         if method_name in method_indices:
             method_indices[method_name].append(index)
@@ -345,3 +420,266 @@ def extract_project_name(project_path):
     project_name = os.path.basename(project_path)
 
     return '/' + project_name
+
+
+# Checks that a test is a syntactically valid Java method.
+def is_parsable_test(test_method):
+    """
+    Checks that a test method parses as Java code, inside an empty class.
+
+    Args:
+        test_method (str): The test method as a string.
+
+    Returns:
+        bool: True if the test parses, False otherwise.
+    """
+    try:
+        javalang.parse.parse("class ReadabilityTest {\n" + test_method + "\n}")
+    except (javalang.parser.JavaSyntaxError, javalang.tokenizer.LexerError, TypeError, IndexError, StopIteration):
+        return False
+
+    return True
+
+
+# Extracts the names declared inside a test: its local variables and the parameters of its catch clauses and lambdas.
+def declared_names(test_method):
+    """
+    Extracts the names declared inside a test, the only identifiers that a rewrite may rename with the name of the
+    test: the local variables (for and try-with-resources ones included) and the parameters of the catch clauses and
+    of the lambdas.
+
+    Args:
+        test_method (str): The test method as a string.
+
+    Returns:
+        set: The names, empty if the test does not parse.
+    """
+    try:
+        tree = javalang.parse.parse("class ReadabilityTest {\n" + test_method + "\n}")
+    except (javalang.parser.JavaSyntaxError, javalang.tokenizer.LexerError, TypeError, IndexError, StopIteration):
+        return set()
+
+    names = set()
+    for _, node in tree.filter(javalang.tree.VariableDeclarator):
+        names.add(node.name)
+    for _, node in tree.filter(javalang.tree.TryResource):
+        names.add(node.name)
+    for _, node in tree.filter(javalang.tree.CatchClauseParameter):
+        names.add(node.name)
+    for _, node in tree.filter(javalang.tree.LambdaExpression):
+        for parameter in node.parameters:
+            # A single parameter without parentheses is parsed as a MemberReference
+            names.add(parameter.member if isinstance(parameter, javalang.tree.MemberReference) else parameter.name)
+
+    return names
+
+
+# Classifies the identifiers of the tokens of a test.
+def _identifier_roles(tokens, declared):
+    # {token index: role} of the identifiers: "test" for the name of the test, "variable" for the uses of the names
+    # declared inside the test, "fixed" for the called methods, the accessed members, the types and the classes, that
+    # are never renamed
+    roles = {}
+    for index, token in enumerate(tokens):
+        if not isinstance(token, javalang.tokenizer.Identifier):
+            continue
+        previous = tokens[index - 1].value if index > 0 else None
+        following = tokens[index + 1].value if index + 1 < len(tokens) else None
+
+        if previous == "void" and "test" not in roles.values():
+            roles[index] = "test"
+        elif token.value in declared and previous != "." and following != "(":
+            roles[index] = "variable"
+        else:
+            roles[index] = "fixed"
+
+    return roles
+
+
+# Maps the identifiers of a test to their names in a rewrite that only renames identifiers.
+def rename_map(original_test, modified_test):
+    """
+    Maps the names declared inside the original test (see declared_names), and the name of the test, to their names
+    in the modified test, if the modified test differs from the original one only by these names: the tokens must be
+    the same except these identifiers, renamed consistently (the same original name always gets the same new name,
+    two names are never merged and no name is renamed to a class or field used by the test). The called methods,
+    the accessed members, the types and the classes are not renamed.
+
+    Args:
+        original_test (str): The original test method.
+        modified_test (str): The rewritten test method.
+
+    Returns:
+        dict: {original name: new name} of the test and of its declared names (the unchanged ones included), None if
+            the rewrite does more than renaming them.
+    """
+    try:
+        original_tokens = list(javalang.tokenizer.tokenize(original_test))
+        modified_tokens = list(javalang.tokenizer.tokenize(modified_test))
+    except javalang.tokenizer.LexerError:
+        return None
+
+    if len(original_tokens) != len(modified_tokens):
+        return None
+
+    roles = _identifier_roles(original_tokens, declared_names(original_test))
+    renamed = {}
+    # Classes and fields used without qualification, that a local variable of the same name would hide
+    unqualified = set()
+    for index, (original, modified) in enumerate(zip(original_tokens, modified_tokens)):
+        if type(original) is not type(modified):
+            return None
+        if index not in roles or roles[index] == "fixed":
+            if original.value != modified.value:
+                return None
+            if index in roles and original_tokens[index - 1].value != "." and \
+                    (index + 1 == len(original_tokens) or original_tokens[index + 1].value != "("):
+                unqualified.add(original.value)
+            continue
+
+        if renamed.setdefault(original.value, modified.value) != modified.value:
+            return None
+
+    # Two original names renamed to the same new name
+    if len(set(renamed.values())) != len(renamed):
+        return None
+    if any(new_name != name and new_name in unqualified for name, new_name in renamed.items()):
+        return None
+
+    return renamed
+
+
+# Checks that a rewritten test only renames the identifiers of the original test.
+def is_rename_only(original_test, modified_test):
+    """
+    Checks that the modified test differs from the original one only by the name of the test and of its
+    variables (see rename_map).
+
+    Args:
+        original_test (str): The original test method.
+        modified_test (str): The rewritten test method.
+
+    Returns:
+        bool: True if the rewrite only renames identifiers, False otherwise.
+    """
+    return rename_map(original_test, modified_test) is not None
+
+
+# Extracts the names of the variables of a test (the identifiers that a rewrite may rename).
+def variable_names(test_method):
+    """
+    Extracts the names declared inside a test that it uses as variables (see declared_names).
+
+    Args:
+        test_method (str): The test method as a string.
+
+    Returns:
+        set: The names.
+    """
+    tokens = list(javalang.tokenizer.tokenize(test_method))
+    roles = _identifier_roles(tokens, declared_names(test_method))
+
+    return {tokens[index].value for index, role in roles.items() if role == "variable"}
+
+
+# Unicode escapes of the Java sources (\u00e9): a backslash starts one unless it is escaped itself.
+UNICODE_ESCAPE = re.compile(r"(?<!\\)((?:\\\\)*)(\\u+[0-9a-fA-F]{4})")
+
+
+# Maps the positions in a source whose unicode escapes were decoded to the positions in the source as written.
+def _raw_offsets(source):
+    """
+    Decodes the unicode escapes of a Java source as javalang does before the tokenization, the positions of the
+    tokens being counted in the decoded source.
+
+    Args:
+        source (str): The source as written.
+
+    Returns:
+        tuple: (the decoded source, the offset in the written source of every decoded character and of the end).
+    """
+    decoded = []
+    offsets = []
+    position = 0
+    for match in UNICODE_ESCAPE.finditer(source):
+        escape_start = match.start(2)
+        decoded.append(source[position:escape_start])
+        offsets.extend(range(position, escape_start))
+
+        # The whole escape is one decoded character
+        decoded.append(chr(int(match.group(2)[-4:], 16)))
+        offsets.append(escape_start)
+        position = match.end()
+
+    decoded.append(source[position:])
+    offsets.extend(range(position, len(source) + 1))
+
+    return "".join(decoded), offsets
+
+
+# Renames the variables and the test, keeping everything else of the test as written.
+def apply_renames(test_method, renames, test_name=None):
+    """
+    Renames the variables of a test, and the test itself.
+
+    The positions of the tokens are mapped back to the test as written, as they are counted after the unicode escapes
+    are decoded; an identifier written with escapes is replaced as a whole.
+
+    Args:
+        test_method (str): The test method as a string.
+        renames (dict): {original name: new name} of the variables (see rename_map), the other names are kept.
+        test_name (str): The new name of the test, None to keep it.
+
+    Returns:
+        str: The renamed test, None if the result does more than renaming the identifiers (see is_rename_only), e.g.
+            when a new name is already used by another variable.
+    """
+    tokens = list(javalang.tokenizer.tokenize(test_method))
+    decoded, offsets = _raw_offsets(test_method)
+
+    # Offset of the start of every line, the positions of the tokens are (line, column) from 1
+    line_offsets = [0]
+    for line in decoded.split("\n"):
+        line_offsets.append(line_offsets[-1] + len(line) + 1)
+
+    replacements = []
+    for index, role in _identifier_roles(tokens, declared_names(test_method)).items():
+        token = tokens[index]
+        if role == "test":
+            new_name = test_name or token.value
+        elif role == "variable":
+            new_name = renames.get(token.value, token.value)
+        else:
+            continue
+        if new_name != token.value:
+            start = line_offsets[token.position.line - 1] + token.position.column - 1
+            replacements.append((offsets[start], offsets[start + len(token.value)], new_name))
+
+    # From the end, so that the offsets of the tokens still to replace do not move
+    renamed_test = test_method
+    for start, end, new_name in reversed(replacements):
+        renamed_test = renamed_test[:start] + new_name + renamed_test[end:]
+
+    if not is_rename_only(test_method, renamed_test):
+        return None
+
+    return renamed_test
+
+
+# Extracts the test names of the response to a names-only request.
+def test_names_extraction(response):
+    """
+    Extracts the names of the answer to langchainHelper.naming_prompt, one "<test number>: <name>" line per test.
+
+    Args:
+        response (str): The model's response.
+
+    Returns:
+        dict: {test number: name} of the lines holding a valid Java identifier.
+    """
+    names = {}
+    for number, name in re.findall(r"^\W*(?:test\s*)?(\d+)\s*[:.)-]\s*`?([A-Za-z_$][\w$]*)`?\s*$", response,
+                                   re.IGNORECASE | re.MULTILINE):
+        names.setdefault(int(number), name)
+
+    return names
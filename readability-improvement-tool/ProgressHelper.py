@@ -0,0 +1,140 @@
+import numpy as np
+import pandas as pd
+
+import Telemetry as tm
+
+# Percentiles of the latency of the LLM requests shown while a run progresses
+LATENCY_PERCENTILES = (50, 90, 99)
+
+# Window of the throughput (tests rewritten per minute) of a running job
+THROUGHPUT_WINDOW_S = 300
+
+
+class RunProgress:
+    """
+    Progress of a run, aggregated from its telemetry trace while it is written by the worker running the job.
+
+    Every poll only reads the records appended since the previous one, so that the page following the run can
+    poll it every few seconds (the object is kept in st.session_state between the reruns of the page).
+    """
+
+    def __init__(self, trace_path):
+        self.trace_path = trace_path
+        self.offset = 0
+        self.suites = {}  # {(suite, repetition): {"tests": tests of the suite, "done": tests rewritten}}
+        self.generations = []  # (end time, tests) of every generation request
+        self.llm_latencies = []
+        self.maven_durations = []
+        self.summary = None
+
+    def poll(self):
+        """
+        Reads the new records of the trace.
+
+        Returns:
+            int: The number of new records.
+        """
+        records, self.offset = tm.read_trace(self.trace_path, self.offset)
+        for record in records:
+            self.update(record)
+
+        return len(records)
+
+    def update(self, record):
+        """
+        Adds a trace record to the progress.
+
+        Args:
+            record (dict): A record of the trace (see Telemetry).
+
+        Returns:
+            None
+        """
+        if record["type"] == "run_end":
+            self.summary = {"stages": record["stages"], "counters": record["counters"]}
+            return
+        if record["type"] == "counter" and record["name"] in ("tests.reused", "tests.derived"):
+            # Tests reused from a previous run, or derived from a near-duplicate test, never sent to the LLM
+            attributes = record["attributes"]
+            suite = self.suites.setdefault((attributes.get("suite"), attributes.get("repetition")),
+                                           {"tests": None, "done": 0})
+            suite["done"] += record["value"]
+            return
+        if record["type"] != "span":
+            return
+
+        name, attributes = record["name"], record["attributes"]
+        key = (attributes.get("suite"), attributes.get("repetition"))
+
+        if name == "parse.testsuite" and "tests" in attributes:
+            # The parsing of a suite starts its rewriting (once per repetition, or once for all the variants)
+            tests = attributes["tests"] * (attributes.get("variants") or 1)
+            self.suites[key] = {"tests": tests, "done": 0}
+
+        elif name == "llm.generation" and attributes.get("stage", 0) == 0:
+            # One test (or a batch of tests, or all the variants of a test), the escalations of a cascade excluded
+            tests = attributes.get("tests", 1) * (attributes.get("variants") or 1)
+            self.generations.append((record["ts"], tests))
+            suite = self.suites.setdefault(key, {"tests": None, "done": 0})
+            suite["done"] += tests
+
+        elif name == "llm.request" and record["status"] == "ok":
+            self.llm_latencies.append(record["duration_s"])
+
+        elif name == "maven":
+            self.maven_durations.append(record["duration_s"])
+
+    def suite_table(self):
+        """
+        Returns:
+            DataFrame: suite, repetition, tests, done and progress (between 0 and 1) of every suite started.
+        """
+        rows = [{"suite": suite, "repetition": repetition, "tests": values["tests"], "done": values["done"],
+                 "progress": min(values["done"] / values["tests"], 1.0) if values["tests"] else None}
+                for (suite, repetition), values in self.suites.items()]
+
+        return pd.DataFrame(rows, columns=["suite", "repetition", "tests", "done", "progress"])
+
+    def tests_per_minute(self, window_s=THROUGHPUT_WINDOW_S):
+        """
+        Computes the number of tests rewritten per minute over the last window_s seconds of the run.
+
+        Returns:
+            float: The throughput, None before the second generation.
+        """
+        if len(self.generations) < 2:
+            return None
+
+        end = self.generations[-1][0]
+        recent = [(ts, tests) for ts, tests in self.generations if ts >= end - window_s]
+        if len(recent) < 2 or recent[-1][0] == recent[0][0]:
+            return None
+
+        # The tests of the first generation were rewritten before the window starts
+        return sum(tests for _, tests in recent[1:]) / (recent[-1][0] - recent[0][0]) * 60
+
+    def llm_latency_percentiles(self, percentiles=LATENCY_PERCENTILES):
+        """
+        Returns:
+            dict: {"p<percentile>": seconds} of the LLM requests, empty before the first request.
+        """
+        if not self.llm_latencies:
+            return {}
+
+        values = np.percentile(self.llm_latencies, percentiles)
+        return {f"p{percentile}": round(float(value), 3) for percentile, value in zip(percentiles, values)}
+
+    def metrics(self):
+        """
+        Returns:
+            dict: The live metrics of the run (tests done, throughput, LLM latency percentiles, Maven durations).
+        """
+        throughput = self.tests_per_minute()
+
+        return {"tests_done": sum(values["done"] for values in self.suites.values()),
+                "tests_per_minute": None if throughput is None else round(throughput, 2),
+                "llm_requests": len(self.llm_latencies),
+                **{f"llm_latency_{name}_s": value for name, value in self.llm_latency_percentiles().items()},
+                "maven_runs": len(self.maven_durations),
+                "maven_mean_s": round(float(np.mean(self.maven_durations)), 1) if self.maven_durations else None,
+                "maven_last_s": round(self.maven_durations[-1], 1) if self.maven_durations else None}
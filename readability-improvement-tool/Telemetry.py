@@ -0,0 +1,292 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from functools import wraps
+from langchain_core.callbacks import BaseCallbackHandler
+
+# State of the current run, shared by all the modules of the tool
+_lock = threading.Lock()
+_trace_file = None
+_run_id = None
+_stages = {}  # {stage name: [number of spans, total seconds]}
+_counters = {}  # {counter name: total}
+
+
+def start_run(output_path, run_id=None):
+    """
+    Starts recording a run, writing its trace as JSON lines in <output_path>/telemetry/trace_<run_id>.jsonl.
+
+    Args:
+        output_path (str): The output folder of the tool.
+        run_id (str): Identifier of the run, generated if not given.
+
+    Returns:
+        str: Path of the trace file.
+    """
+    global _trace_file, _run_id
+
+    end_run()
+
+    _run_id = run_id or time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+    trace_path = os.path.join(output_path, "telemetry", f"trace_{_run_id}.jsonl")
+    os.makedirs(os.path.dirname(trace_path), exist_ok=True)
+
+    with _lock:
+        _stages.clear()
+        _counters.clear()
+        _trace_file = open(trace_path, 'a', buffering=1)
+
+    _emit({"type": "run_start"})
+    logging.info(f"Telemetry trace written to {trace_path}")
+
+    return trace_path
+
+
+def end_run():
+    """
+    Stops recording the current run, writing a summary of the stage timings and of the counters.
+
+    Returns:
+        dict: {"stages": {name: {"count", "total_s", "mean_s"}}, "counters": {name: total}}, or None if no run
+        was being recorded.
+    """
+    global _trace_file, _run_id
+
+    if _trace_file is None:
+        return None
+
+    summary = run_summary()
+    _emit({"type": "run_end", **summary})
+
+    with _lock:
+        _trace_file.close()
+        _trace_file = None
+        _run_id = None
+
+    return summary
+
+
+def current_run_id():
+    """
+    Returns:
+        str: Identifier of the run being recorded, None if no run is being recorded.
+    """
+    return _run_id
+
+
+def run_summary():
+    """
+    Summarizes the stage timings and the counters recorded so far.
+
+    Returns:
+        dict: {"stages": {name: {"count", "total_s", "mean_s"}}, "counters": {name: total}}.
+    """
+    with _lock:
+        stages = {name: {"count": count, "total_s": round(total, 6), "mean_s": round(total / count, 6)}
+                  for name, (count, total) in sorted(_stages.items(), key=lambda item: -item[1][1])}
+        counters = dict(_counters)
+
+    return {"stages": stages, "counters": counters}
+
+
+def _emit(record):
+    with _lock:
+        if _trace_file is None:
+            return
+        record = {"ts": time.time(), "run_id": _run_id, "thread": threading.current_thread().name, **record}
+        _trace_file.write(json.dumps(record, default=str) + "\n")
+
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Times a stage of the pipeline.
+
+    The yielded dictionary holds the attributes of the span, stages can add their own results to it.
+
+    Args:
+        name (str): Name of the stage (e.g. "maven", "llm.generation").
+        **attributes: Attributes recorded with the span (project, suite, repetition, ...).
+
+    Yields:
+        dict: The attributes of the span.
+    """
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield attributes
+    except BaseException as e:
+        status = "error"
+        attributes["error"] = repr(e)
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        with _lock:
+            stage = _stages.setdefault(name, [0, 0.0])
+            stage[0] += 1
+            stage[1] += duration
+        _emit({"type": "span", "name": name, "duration_s": round(duration, 6), "status": status,
+               "attributes": attributes})
+
+
+def timed(name):
+    """
+    Decorator recording every call of the decorated function as a span.
+
+    Args:
+        name (str): Name of the stage.
+
+    Returns:
+        function: The decorator.
+    """
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def count(name, value=1, **attributes):
+    """
+    Increments a counter of the run.
+
+    Args:
+        name (str): Name of the counter (e.g. "llm.tokens_in").
+        value (int): Increment.
+        **attributes: Attributes recorded with the increment.
+
+    Returns:
+        None
+    """
+    if value is None:
+        return
+
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+    _emit({"type": "counter", "name": name, "value": value, "attributes": attributes})
+
+
+def read_trace(trace_path, offset=0):
+    """
+    Reads the records appended to a trace file since a previous read, e.g. to follow a run from another process.
+
+    Args:
+        trace_path (str): Path of the trace file.
+        offset (int): Position in the file returned by the previous read, 0 to read the whole file.
+
+    Returns:
+        tuple: (the new records, the position to give to the next read). A line still being written is left for
+        the next read.
+    """
+    if not os.path.exists(trace_path):
+        return [], offset
+
+    records = []
+    with open(trace_path, 'rb') as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            offset += len(line)
+            records.append(json.loads(line))
+
+    return records, offset
+
+
+def extract_token_usage(response):
+    """
+    Extracts the prompt and completion tokens from an LLM response, when the provider returns them.
+
+    Args:
+        response (LLMResult): The response received by a LangChain callback.
+
+    Returns:
+        tuple: (tokens in, tokens out), None for the values the provider did not return.
+    """
+    llm_output = response.llm_output or {}
+    usage = llm_output.get("token_usage") or llm_output.get("usage") or {}
+    if usage:
+        return usage.get("prompt_tokens", usage.get("input_tokens")), \
+            usage.get("completion_tokens", usage.get("output_tokens"))
+
+    tokens_in = tokens_out = None
+    for generations in response.generations:
+        for generation in generations:
+            usage_metadata = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage_metadata:
+                tokens_in = (tokens_in or 0) + usage_metadata.get("input_tokens", 0)
+                tokens_out = (tokens_out or 0) + usage_metadata.get("output_tokens", 0)
+
+    return tokens_in, tokens_out
+
+
+def extract_cached_tokens(response):
+    """
+    Extracts the prompt tokens read from the provider's prompt cache, when the provider returns them.
+
+    Args:
+        response (LLMResult): The response received by a LangChain callback.
+
+    Returns:
+        int: The cached prompt tokens (OpenAI prompt_tokens_details, Anthropic cache_read_input_tokens), None
+        if the provider did not return them.
+    """
+    llm_output = response.llm_output or {}
+    usage = llm_output.get("token_usage") or llm_output.get("usage") or {}
+
+    details = usage.get("prompt_tokens_details") or {}
+    if details.get("cached_tokens") is not None:
+        return details["cached_tokens"]
+
+    return usage.get("cache_read_input_tokens")
+
+
+class TelemetryCallbackHandler(BaseCallbackHandler):
+    """
+    LangChain callback recording the latency and the tokens of every LLM request as an "llm.request" span.
+    """
+
+    def __init__(self, **attributes):
+        self.attributes = attributes
+        self._starts = {}
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._starts[run_id] = time.perf_counter()
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._starts[run_id] = time.perf_counter()
+
+    def token_usage(self, response, run_id):
+        """
+        Returns the tokens of a request, (None, None) when the provider did not return them.
+        """
+        return extract_token_usage(response)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        latency = time.perf_counter() - self._starts.pop(run_id, time.perf_counter())
+        tokens_in, tokens_out = self.token_usage(response, run_id)
+
+        with _lock:
+            stage = _stages.setdefault("llm.request", [0, 0.0])
+            stage[0] += 1
+            stage[1] += latency
+        _emit({"type": "span", "name": "llm.request", "duration_s": round(latency, 6), "status": "ok",
+               "attributes": {**self.attributes, "tokens_in": tokens_in, "tokens_out": tokens_out}})
+        count("llm.requests", 1, **self.attributes)
+        count("llm.tokens_in", tokens_in, **self.attributes)
+        count("llm.tokens_out", tokens_out, **self.attributes)
+        count("llm.tokens_cached", extract_cached_tokens(response), **self.attributes)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        latency = time.perf_counter() - self._starts.pop(run_id, time.perf_counter())
+        _emit({"type": "span", "name": "llm.request", "duration_s": round(latency, 6), "status": "error",
+               "attributes": {**self.attributes, "error": repr(error)}})
+        count("llm.errors", 1, **self.attributes)
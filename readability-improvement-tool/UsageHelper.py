@@ -0,0 +1,306 @@
+import logging
+import os
+import time
+import pandas as pd
+import tiktoken
+
+import ClassInformationHelper as ci
+import langchainHelper as lch
+import Parser as p
+import Telemetry as tm
+
+# List prices in USD per million tokens (input, output), update them when the providers change their pricing
+PRICES = {
+    "gpt-4": (30.0, 60.0),
+    "gpt-3.5-turbo": (0.5, 1.5),
+    "gemini-1.5-pro-001": (3.5, 10.5),
+    "meta.llama3-8b-instruct-v1:0": (0.3, 0.6),
+    "meta.llama3-70b-instruct-v1:0": (2.65, 3.5),
+    "anthropic.claude-3-haiku-20240307-v1:0": (0.25, 1.25),
+    "anthropic.claude-3-sonnet-20240229-v1:0": (3.0, 15.0),
+    "mistral.mistral-7b-instruct-v0:2": (0.15, 0.2),
+    "mistral.mixtral-8x7b-instruct-v0:1": (0.45, 0.7),
+    "amazon.titan-text-express-v1": (0.2, 0.6),
+    "mistral.mistral-large-2402-v1:0": (8.0, 24.0),
+    "local-gguf": (0.0, 0.0),
+}
+
+# File, in the output folder of each project, collecting the usage of every request
+USAGE_FILENAME = "token_usage.csv"
+USAGE_COLUMNS = ["model", "case", "project", "suite", "repetition", "tokens_in", "tokens_cached", "tokens_out",
+                 "estimated", "latency_s"]
+
+# File, in the output folder of each project, collecting the outcome of every stage of the model cascades
+CASCADE_FILENAME = "cascade_stages.csv"
+CASCADE_COLUMNS = ["model", "case", "stage", "project", "suite", "repetition", "test", "outcome"]
+
+# Assumptions used to estimate a run when no previous usage of the model is available
+COMPLETION_TO_TEST_RATIO = 1.2
+DEFAULT_LATENCY_S = 10.0
+
+_encoding = None
+
+
+def count_tokens(text):
+    """
+    Estimates the number of tokens of a text with the tiktoken cl100k_base encoding.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        int: The number of tokens (approximated from the characters if the encoding cannot be loaded).
+    """
+    global _encoding
+
+    if _encoding is None:
+        try:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            # The encoding is downloaded on first use, without network fall back to ~4 characters per token
+            logging.warning(f"tiktoken encoding not available ({e}), approximating the tokens.")
+            _encoding = False
+
+    if _encoding is False:
+        return (len(text) + 3) // 4
+
+    return len(_encoding.encode(text, disallowed_special=()))
+
+
+class UsageCallbackHandler(tm.TelemetryCallbackHandler):
+    """
+    LangChain callback recording the tokens and the latency of every request of a test suite.
+
+    The tokens returned by the provider are used when available, otherwise they are estimated with tiktoken.
+    """
+
+    def __init__(self, model, **labels):
+        super().__init__(model=model, **labels)
+        self.records = []
+        self._prompts = {}
+        self._pending = {}  # {run id: record}, the requests of a batch end in any order
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        super().on_llm_start(serialized, prompts, run_id=run_id, **kwargs)
+        self._prompts[run_id] = "\n".join(prompts)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        super().on_chat_model_start(serialized, messages, run_id=run_id, **kwargs)
+        self._prompts[run_id] = "\n".join(str(message.content) for batch in messages for message in batch)
+
+    def token_usage(self, response, run_id):
+        tokens_in, tokens_out = super().token_usage(response, run_id)
+        prompt = self._prompts.pop(run_id, "")
+
+        estimated = tokens_in is None or tokens_out is None
+        if tokens_in is None:
+            tokens_in = count_tokens(prompt)
+        if tokens_out is None:
+            tokens_out = sum(count_tokens(generation.text)
+                             for generations in response.generations for generation in generations)
+
+        self._pending[run_id] = {**self.attributes, "tokens_in": tokens_in,
+                                 "tokens_cached": tm.extract_cached_tokens(response), "tokens_out": tokens_out,
+                                 "estimated": estimated, "latency_s": None}
+        self.records.append(self._pending[run_id])
+
+        return tokens_in, tokens_out
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        start = self._starts.get(run_id)
+        super().on_llm_end(response, run_id=run_id, **kwargs)
+        record = self._pending.pop(run_id, None)
+        if start is not None and record is not None:
+            record["latency_s"] = round(time.perf_counter() - start, 3)
+
+
+def save_usage(project_output_path, records):
+    """
+    Appends the usage of the requests of a test suite to the usage file of the project.
+
+    Args:
+        project_output_path (str): Output folder of the project (next to the jacocoresults folder).
+        records (list): Usage records collected by a UsageCallbackHandler.
+
+    Returns:
+        None
+    """
+    if not records:
+        return
+
+    usage_path = os.path.join(project_output_path, USAGE_FILENAME)
+    os.makedirs(project_output_path, exist_ok=True)
+
+    pd.DataFrame(records).reindex(columns=USAGE_COLUMNS).to_csv(usage_path,
+                                                                mode='a',
+                                                                header=not os.path.exists(usage_path),
+                                                                index=False)
+
+
+def read_usage(usage_paths):
+    """
+    Reads and concatenates usage files.
+
+    Args:
+        usage_paths (list): Paths of the token_usage.csv files (missing files are ignored).
+
+    Returns:
+        DataFrame: The usage of every request.
+    """
+    frames = [pd.read_csv(path) for path in usage_paths if os.path.exists(path)]
+
+    # Files written before a column was added miss it
+    return pd.concat(frames, ignore_index=True).reindex(columns=USAGE_COLUMNS) if frames \
+        else pd.DataFrame(columns=USAGE_COLUMNS)
+
+
+def save_cascade(project_output_path, records):
+    """
+    Appends the outcome of the stages of the cascade of a test suite to the cascade file of the project.
+
+    Args:
+        project_output_path (str): Output folder of the project (next to the jacocoresults folder).
+        records (list): Stage records collected by langchainHelper.improve_testsuite_readability_cascade.
+
+    Returns:
+        None
+    """
+    if not records:
+        return
+
+    cascade_path = os.path.join(project_output_path, CASCADE_FILENAME)
+    os.makedirs(project_output_path, exist_ok=True)
+
+    pd.DataFrame(records).reindex(columns=CASCADE_COLUMNS).to_csv(cascade_path,
+                                                                  mode='a',
+                                                                  header=not os.path.exists(cascade_path),
+                                                                  index=False)
+
+
+def summarize_cascade(cascade_paths):
+    """
+    Computes the success rate of every stage of the cascades, to tune the order of the models.
+
+    Args:
+        cascade_paths (list): Paths of the cascade_stages.csv files (missing files are ignored).
+
+    Returns:
+        DataFrame: Per stage and model, the tests received, the tests accepted, the success rate and the number of
+        tests failing every validation.
+    """
+    frames = [pd.read_csv(path) for path in cascade_paths if os.path.exists(path)]
+    if not frames:
+        return pd.DataFrame(columns=["stage", "model", "tests", "accepted", "success_rate"])
+
+    stages = pd.concat(frames, ignore_index=True)
+    summary = pd.crosstab([stages["stage"], stages["model"]], stages["outcome"]).reset_index()
+    summary.columns.name = None
+    for outcome in lch.VALIDATION_OUTCOMES:
+        if outcome not in summary:
+            summary[outcome] = 0
+
+    summary["tests"] = summary[lch.VALIDATION_OUTCOMES].sum(axis=1)
+    summary["success_rate"] = (summary["accepted"] / summary["tests"]).round(3)
+
+    return summary[["stage", "model", "tests", *lch.VALIDATION_OUTCOMES, "success_rate"]]
+
+
+def request_cost(model, tokens_in, tokens_out):
+    """
+    Computes the cost of a number of tokens.
+
+    Args:
+        model (str): The model name (see langchainHelper.MODELS).
+        tokens_in: Prompt tokens (a number or a Series).
+        tokens_out: Completion tokens (a number or a Series).
+
+    Returns:
+        The cost in USD, None if the price of the model is unknown.
+    """
+    if model not in PRICES:
+        return None
+
+    price_in, price_out = PRICES[model]
+
+    return (tokens_in * price_in + tokens_out * price_out) / 1_000_000
+
+
+def summarize_usage(usage, by=("model", "project", "suite", "repetition")):
+    """
+    Aggregates the usage of the requests.
+
+    Args:
+        usage (DataFrame): The usage of every request (see read_usage).
+        by (tuple): Columns to aggregate by.
+
+    Returns:
+        DataFrame: Requests, tokens, latency, throughput (completion tokens per second) and cost per group.
+    """
+    usage = usage.assign(cost_usd=[request_cost(model, tokens_in, tokens_out) for model, tokens_in, tokens_out
+                                   in zip(usage["model"], usage["tokens_in"], usage["tokens_out"])])
+
+    summary = usage.groupby(list(by), as_index=False).agg(requests=("tokens_in", "size"),
+                                                          tokens_in=("tokens_in", "sum"),
+                                                          tokens_cached=("tokens_cached", "sum"),
+                                                          tokens_out=("tokens_out", "sum"),
+                                                          estimated=("estimated", "sum"),
+                                                          latency_s=("latency_s", "sum"),
+                                                          cost_usd=("cost_usd", "sum"))
+    summary["tokens_out_per_s"] = (summary["tokens_out"] / summary["latency_s"]).round(2)
+
+    return summary
+
+
+def estimate_run(paths, case, repetition, usage_paths=()):
+    """
+    Estimates the tokens, the cost and the LLM time of a run before starting it.
+
+    The prompts of the run are built and counted exactly, while completions are assumed to be about as long as
+    the tests they rewrite. The latency of the requests is taken from the previous runs of the same model when
+    available (usage_paths). Maven runs are not included in the duration.
+
+    Args:
+        paths (list): Paths of the projects.
+        case (int): The identifier of the model (see langchainHelper.MODELS).
+        repetition (int): Number of repetitions.
+        usage_paths (list): Usage files of previous runs.
+
+    Returns:
+        dict: requests, tokens_in, tokens_out, cost_usd and duration_s of the planned run.
+    """
+    model = lch.MODELS.get(case)
+    requests = tokens_in = tokens_out = 0
+
+    for path in paths:
+        path_tsuites = p.extract_testsuites_from_path(path)
+        path_sourcec = p.extract_sourcecode_from_testsuite(path, path_tsuites)
+
+        for tsuite_key, source_key in zip(path_tsuites, path_sourcec):
+            sourcecode = path_sourcec[source_key]
+            sc_methods_dic = p.fill_sourcecode_memory(sourcecode)
+
+            # Every test is sent after the context prompt of its test suite
+            context = count_tokens(lch.context_prompt(ci.class_information(sourcecode)))
+
+            for single_test in p.java_methods_extraction(path_tsuites[tsuite_key]):
+                prompt = count_tokens(lch.generation_prompt(single_test,
+                                                            p.find_all_method_calls(single_test, sc_methods_dic)))
+
+                requests += 1
+                tokens_in += context + prompt
+                tokens_out += int(count_tokens(single_test) * COMPLETION_TO_TEST_RATIO)
+
+    requests *= repetition
+    tokens_in *= repetition
+    tokens_out *= repetition
+
+    history = read_usage(usage_paths)
+    history = history[(history["model"] == model) & history["latency_s"].notna()]
+    mean_latency = history["latency_s"].mean() if len(history) > 0 else DEFAULT_LATENCY_S
+
+    return {"model": model,
+            "requests": requests,
+            "tokens_in": tokens_in,
+            "tokens_out": tokens_out,
+            "cost_usd": request_cost(model, tokens_in, tokens_out),
+            "duration_s": round(requests * mean_latency)}
@@ -1,8 +1,13 @@
+import ClassInformationHelper as ci
+import FingerprintHelper as fh
 import langchainHelper as lch
 import Parser as p
 import Output_handler as oh
+import Telemetry as tm
+import UsageHelper as uh
 
-def improve_test_readability(temperature, sourcecode, testsuite, testsuite_name, output_path, case, project_name, rep):
+def improve_test_readability(temperature, sourcecode, testsuite, testsuite_name, output_path, case, project_name, rep,
+                             cascade=None, incremental=False, clustering=False):
     """
     Improves the readability of a given test suite using a Language Model (LLM).
 
@@ -15,30 +20,130 @@ def improve_test_readability(temperature, sourcecode, testsuite, testsuite_name,
         case (int): The identifier for selecting the LLM model to use.
         project_name (str): The name of the project.
         rep (int): The current iteration or repetition number for naming the output files.
+        cascade (list): Cheaper models (cases) tried before the selected one, see
+            langchainHelper.improve_testsuite_readability_cascade.
+        incremental (bool): Reuse the rewrites of the tests whose fingerprint (test, called methods, model
+            configuration and repetition) did not change since a previous run on the same output path.
+        clustering (bool): Rewrite one test per cluster of near-duplicate tests, deriving the others (see
+            langchainHelper.improve_testsuite_readability_clustered).
 
     Returns:
-        bool: True if the export was successful, False otherwise.
+        int: 1 if the export was successful (an exception is raised otherwise).
     """
 
-    # Split the test suite into individual methods, returning an array of strings
-    test_suite_methods = p.java_methods_extraction(testsuite)
+    labels = {"project": project_name.strip('/'), "suite": testsuite_name, "repetition": rep}
 
-    # Extract class information from the source code
-    class_inf = p.class_information_extraction(sourcecode)
+    with tm.span("parse.testsuite", **labels) as span:
+        # Split the test suite into individual methods, returning an array of strings
+        test_suite_methods = p.java_methods_extraction(testsuite)
+        span["tests"] = len(test_suite_methods)
 
-    # Extract methods and constructors from the source code, storing them in a dictionary (signature: body, ...)
-    sc_methods_dic = p.fill_sourcecode_memory(sourcecode)
+        # Extract class information from the source code, parsed once and cached across the runs
+        class_inf = ci.class_information(sourcecode, output_path)
+
+        # Extract methods and constructors from the source code, storing them in a dictionary (signature: body, ...)
+        sc_methods_dic = p.fill_sourcecode_memory(sourcecode)
+
+    # Tests unchanged since a previous run reuse their rewrite instead of being sent again
+    reused = {}
+    if incremental:
+        store = fh.FingerprintStore(output_path + project_name)
+        fingerprints = fh.suite_fingerprints(test_suite_methods,
+                                             sc_methods_dic,
+                                             fh.model_config(case, temperature, cascade, clustering),
+                                             rep)
+        found = store.get_many(fingerprints)
+        reused = {index: found[fingerprint] for index, fingerprint in enumerate(fingerprints) if fingerprint in found}
+        tm.count("tests.reused", len(reused), **labels)
+
+    # Record the tokens used by every request of the test suite, per model of the cascade
+    usage = {stage_case: uh.UsageCallbackHandler(lch.MODELS.get(stage_case), case=stage_case, **labels)
+             for stage_case in [*(cascade or []), case]}
+    stage_callbacks = {stage_case: [handler] for stage_case, handler in usage.items()}
+    stage_records = []
 
     # Improve the test suite using a Language Model (LLM)
-    test_suite_methods_improved = lch.improve_testsuite_readability(temperature,
-                                                                    test_suite_methods,
-                                                                    class_inf,
-                                                                    sc_methods_dic,
-                                                                    case,
-                                                                    sourcecode)
+    try:
+        with tm.span("llm.testsuite", tests=len(test_suite_methods), **labels):
+            test_suite_methods_improved = lch.improve_testsuite_readability(temperature,
+                                                                            test_suite_methods,
+                                                                            class_inf,
+                                                                            sc_methods_dic,
+                                                                            case,
+                                                                            labels,
+                                                                            [usage[case]],
+                                                                            cascade=cascade,
+                                                                            stage_callbacks=stage_callbacks,
+                                                                            stage_records=stage_records,
+                                                                            reused=reused,
+                                                                            clustering=clustering)
+    finally:
+        uh.save_usage(output_path + project_name, [record for handler in usage.values() for record in handler.records])
+        uh.save_cascade(output_path + project_name, stage_records)
+    tm.count("tests.rewritten", len(test_suite_methods_improved) - len(reused), **labels)
+
+    if incremental:
+        # Reused by the next runs only once the repetition compiled and ran (see pipeline.run_project)
+        store.stage_many(dict(zip(fingerprints, test_suite_methods_improved)), rep)
 
     # Export the newly improved test suite
+    # Flushed to the disk with the other test suites of the repetition (see Output_handler.commit_export)
     return oh.export_new_testsuite(output_path + project_name + '/' + str(rep),
                                    testsuite_name,
                                    p.extract_initial_info_of_the_test_suite(testsuite),
-                                   test_suite_methods_improved)
+                                   test_suite_methods_improved,
+                                   fsync=False)
+
+
+def improve_test_readability_variants(temperature, sourcecode, testsuite, testsuite_name, output_path, case,
+                                      project_name, repetition):
+    """
+    Improves the readability of a given test suite once per repetition, requesting all the variants of a test
+    together (see langchainHelper.improve_testsuite_readability_variants).
+
+    Args:
+        temperature (int): The temperature setting for the LLM to control the creativity of the output.
+        sourcecode (str): The source code of the class under test.
+        testsuite (str): The Java test suite as a string.
+        testsuite_name (str): The name of the test suite.
+        output_path (str): The path where the modified test suites will be saved.
+        case (int): The identifier for selecting the LLM model to use.
+        project_name (str): The name of the project.
+        repetition (int): Number of repetitions, the variants are saved in the folders 0 to repetition - 1.
+
+    Returns:
+        list: The result of the export of every repetition (1, an exception is raised otherwise).
+    """
+    labels = {"project": project_name.strip('/'), "suite": testsuite_name, "repetition": "all"}
+
+    with tm.span("parse.testsuite", variants=repetition, **labels) as span:
+        test_suite_methods = p.java_methods_extraction(testsuite)
+        span["tests"] = len(test_suite_methods)
+        class_inf = ci.class_information(sourcecode, output_path)
+        sc_methods_dic = p.fill_sourcecode_memory(sourcecode)
+
+    # Record the tokens used by every request of the test suite
+    usage = uh.UsageCallbackHandler(lch.MODELS.get(case), case=case, **labels)
+
+    try:
+        with tm.span("llm.testsuite", tests=len(test_suite_methods), variants=repetition, **labels):
+            variants = lch.improve_testsuite_readability_variants(temperature,
+                                                                  test_suite_methods,
+                                                                  class_inf,
+                                                                  sc_methods_dic,
+                                                                  case,
+                                                                  repetition,
+                                                                  labels,
+                                                                  [usage])
+    finally:
+        uh.save_usage(output_path + project_name, usage.records)
+    tm.count("tests.rewritten", sum(len(variant) for variant in variants), **labels)
+
+    # Export every variant in the folder of its repetition
+    initial_info = p.extract_initial_info_of_the_test_suite(testsuite)
+    return [oh.export_new_testsuite(output_path + project_name + '/' + str(rep),
+                                    testsuite_name,
+                                    initial_info,
+                                    variant,
+                                    fsync=False)
+            for rep, variant in enumerate(variants)]
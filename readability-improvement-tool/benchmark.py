@@ -0,0 +1,329 @@
+import argparse
+import hashlib
+import json
+import os
+import platform
+import re
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+import ClusterHelper as ch
+import EmbeddingsHelper as eh
+import Output_handler as oh
+import Parser as p
+import langchainHelper as lch
+
+# Corpus of real EvoSuite test suites and classes shipped with the repository
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "classes-readability-survey")
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+# Size of the mock embeddings, as text-embedding-3-small
+EMBEDDING_SIZE = 1536
+
+
+class MockChatModel(BaseChatModel):
+    """
+    Chat model answering without any network call: the test of a GENERATION prompt is returned with a new name,
+    the tests of a de-duplication prompt are returned numbered.
+    """
+
+    @property
+    def _llm_type(self):
+        return "mock"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        # Only the last message (the prompt sent after the context) is answered
+        prompt = messages[-1].content.rsplit("Human:", 1)[-1]
+
+        if "Test to modify:" in prompt:
+            test = prompt.rsplit("Test to modify:", 1)[1].split("-----", 1)[0].strip()
+            answer = "```java\n" + re.sub(r"void (\w+)\(", r"void readable_\1(", test, count=1) + "\n```"
+        elif "Tests:" in prompt:
+            tests = p.java_methods_extraction(prompt.rsplit("Tests:", 1)[1])
+            answer = "\n\n".join(re.sub(r"void (\w+)\(", rf"void \1_{index}(", test, count=1)
+                                 for index, test in enumerate(tests))
+        else:
+            answer = "Understood."
+
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=answer))])
+
+
+def load_corpus(corpus_path):
+    """
+    Loads the classes and their EvoSuite test suites.
+
+    Args:
+        corpus_path (str): Folder with one sub-folder per project, each with the classes and a test-evosuite folder.
+
+    Returns:
+        list: One dict per class (project, name, sourcecode, testsuite).
+    """
+    corpus = []
+    for project in sorted(os.listdir(corpus_path)):
+        tests_path = os.path.join(corpus_path, project, "test-evosuite")
+        if not os.path.isdir(tests_path):
+            continue
+
+        for filename in sorted(os.listdir(tests_path)):
+            if not filename.endswith("_ESTest.java"):
+                continue
+
+            class_path = os.path.join(corpus_path, project, filename.replace("_ESTest.java", ".java"))
+            if not os.path.exists(class_path):
+                continue
+
+            with open(class_path, 'r', encoding="utf-8") as file:
+                sourcecode = file.read()
+            with open(os.path.join(tests_path, filename), 'r', encoding="utf-8") as file:
+                testsuite = file.read()
+
+            corpus.append({"project": project, "name": filename, "sourcecode": sourcecode, "testsuite": testsuite})
+
+    return corpus
+
+
+def synthetic_jacoco_xml(corpus, path, scale):
+    """
+    Writes a JaCoCo XML report covering the methods of the corpus classes, repeated scale times.
+
+    Args:
+        corpus (list): The corpus (see load_corpus).
+        path (str): Path of the report.
+        scale (int): Number of copies of the corpus packages in the report.
+
+    Returns:
+        int: Number of methods in the report.
+    """
+    methods = 0
+    with open(path, 'w') as file:
+        file.write('<?xml version="1.0" encoding="UTF-8" standalone="yes"?><report name="benchmark">')
+        for copy in range(scale):
+            for entry in corpus:
+                class_name = entry["name"].replace("_ESTest.java", "")
+                package = f"{entry['project'].replace('-', '/')}/copy{copy}"
+                file.write(f'<package name="{package}"><class name="{package}/{class_name}" '
+                           f'sourcefilename="{class_name}.java">')
+                for line_nr, signature in enumerate(p.fill_sourcecode_memory(entry["sourcecode"])):
+                    name = signature.split("(")[0]
+                    file.write(f'<method name="{name}" desc="()V" line="{line_nr + 1}">')
+                    for counter in ("INSTRUCTION", "LINE", "COMPLEXITY", "METHOD"):
+                        file.write(f'<counter type="{counter}" missed="{line_nr % 3}" covered="{line_nr % 7 + 1}"/>')
+                    file.write('</method>')
+                    methods += 1
+                file.write('<counter type="CLASS" missed="0" covered="1"/></class></package>')
+        file.write('</report>')
+
+    return methods
+
+
+def mock_embedding(text):
+    """
+    Embeds a text by hashing its tokens, so that similar tests get similar vectors.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        numpy.ndarray: The embedding.
+    """
+    vector = np.zeros(EMBEDDING_SIZE)
+    for token in re.findall(r"\w+", text):
+        vector[int(hashlib.md5(token.encode()).hexdigest()[:8], 16) % EMBEDDING_SIZE] += 1.0
+
+    return vector
+
+
+def measure(function, items, repeat):
+    """
+    Measures a stage: peak memory on a first traced run, then the median time of repeat runs.
+
+    Args:
+        function (callable): The stage.
+        items (int): Number of items processed by a run of the stage.
+        repeat (int): Number of timed runs.
+
+    Returns:
+        dict: items, seconds (median), items_per_s and peak_kib.
+    """
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+
+    seconds = statistics.median(timings)
+
+    return {"items": items,
+            "seconds": round(seconds, 6),
+            "items_per_s": round(items / seconds, 2) if seconds > 0 else float("inf"),
+            "peak_kib": round(peak / 1024, 1)}
+
+
+def run_benchmarks(corpus, repeat, xml_scale, repetitions, workdir):
+    """
+    Runs every stage of the pipeline over the corpus with a mock LLM.
+
+    Args:
+        corpus (list): The corpus (see load_corpus).
+        repeat (int): Number of timed runs of each stage.
+        xml_scale (int): Copies of the corpus in the synthetic JaCoCo report.
+        repetitions (int): Mock repetitions compared by the similarity stage.
+        workdir (str): Temporary folder for the exported files.
+
+    Returns:
+        dict: {stage name: measures}.
+    """
+    suites = [p.java_methods_extraction(entry["testsuite"]) for entry in corpus]
+    memories = [p.fill_sourcecode_memory(entry["sourcecode"]) for entry in corpus]
+    class_information = [p.class_information_extraction(entry["sourcecode"]) for entry in corpus]
+    tests = sum(len(suite) for suite in suites)
+
+    results = {}
+
+    results["parse.methods"] = measure(
+        lambda: [p.java_methods_extraction(entry["testsuite"]) for entry in corpus], tests, repeat)
+
+    results["parse.class_information"] = measure(
+        lambda: [p.class_information_extraction(entry["sourcecode"]) for entry in corpus], len(corpus), repeat)
+
+    results["parse.sourcecode_memory"] = measure(
+        lambda: [p.fill_sourcecode_memory(entry["sourcecode"]) for entry in corpus], len(corpus), repeat)
+
+    results["parse.clustering"] = measure(lambda: [ch.cluster_tests(suite) for suite in suites], tests, repeat)
+
+    results["parse.method_calls"] = measure(
+        lambda: [p.find_all_method_calls(test, memory) for suite, memory in zip(suites, memories) for test in suite],
+        tests, repeat)
+
+    def build_prompts():
+        for suite, memory, information in zip(suites, memories, class_information):
+            lch.context_prompt(information)
+            for test in suite:
+                lch.generation_prompt(test, p.find_all_method_calls(test, memory))
+
+    results["prompt.build"] = measure(build_prompts, tests, repeat)
+
+    mock = MockChatModel()
+    rewritten = []
+
+    def rewrite():
+        rewritten.clear()
+        for suite, memory, information in zip(suites, memories, class_information):
+            rewritten.append(lch.improve_testsuite_readability(0, suite, information, memory, 0, llm=mock))
+
+    results["llm.mock_rewrite"] = measure(rewrite, tests, repeat)
+
+    results["dedup"] = measure(lambda: [p.find_duplicate_tests(suite + suite) for suite in rewritten],
+                               2 * tests, repeat)
+
+    export_path = os.path.join(workdir, "export")
+    results["export"] = measure(
+        lambda: ([oh.export_new_testsuite(export_path, entry["name"], p.extract_initial_info_of_the_test_suite(
+            entry["testsuite"]), suite, fsync=False) for entry, suite in zip(corpus, rewritten)],
+                 oh.commit_export(export_path)), tests, repeat)
+
+    xml_path = os.path.join(workdir, "jacoco_0.xml")
+    methods = synthetic_jacoco_xml(corpus, xml_path, xml_scale)
+    results["jacoco.xml_ingest"] = measure(lambda: oh.extract_xml_coverage_info(xml_path), methods, repeat)
+    results["jacoco.xml_ingest"]["report_kib"] = round(os.path.getsize(xml_path) / 1024, 1)
+
+    variants = [[test] + [re.sub(r"\d+", str(rep), test) for rep in range(1, repetitions)]
+                for suite in rewritten for test in suite]
+    embeddings = [[mock_embedding(variant) for variant in test_variants] for test_variants in variants]
+    pairs = len(variants) * repetitions * (repetitions - 1) // 2
+
+    def similarities():
+        for test_embeddings in embeddings:
+            for i in range(len(test_embeddings) - 1):
+                for j in range(i + 1, len(test_embeddings)):
+                    round(eh.cosine_similarity_of_two_embeddings(test_embeddings[i], test_embeddings[j]), 2)
+
+    results["similarity"] = measure(similarities, pairs, repeat)
+
+    return results
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """
+    Finds the stages slower or more memory hungry than the baseline beyond the tolerance.
+
+    Args:
+        results (dict): Current measures.
+        baseline (dict): Baseline measures.
+        tolerance (float): Accepted relative degradation (0.25 = 25%).
+
+    Returns:
+        list: Descriptions of the regressions.
+    """
+    regressions = []
+    for stage, measures in results.items():
+        reference = baseline.get(stage)
+        if reference is None:
+            continue
+
+        if measures["items_per_s"] < reference["items_per_s"] * (1 - tolerance):
+            regressions.append(f"{stage}: {measures['items_per_s']} items/s "
+                               f"(baseline {reference['items_per_s']} items/s)")
+        if measures["peak_kib"] > reference["peak_kib"] * (1 + tolerance):
+            regressions.append(f"{stage}: peak {measures['peak_kib']} KiB (baseline {reference['peak_kib']} KiB)")
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks the pipeline over the classes-readability-survey corpus "
+                                                 "with a mock LLM.")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="Path to the corpus")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs of each stage")
+    parser.add_argument("--xml-scale", type=int, default=50, help="Copies of the corpus in the JaCoCo report")
+    parser.add_argument("--repetitions", type=int, default=5, help="Repetitions compared by the similarity stage")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Path to the baseline file")
+    parser.add_argument("--save-baseline", action="store_true", help="Save the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Accepted relative degradation")
+
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    assert corpus, f"No test suites found in {args.corpus}"
+
+    with tempfile.TemporaryDirectory() as workdir:
+        results = run_benchmarks(corpus, args.repeat, args.xml_scale, args.repetitions, workdir)
+
+    print(f"{'stage':<26}{'items':>10}{'seconds':>12}{'items/s':>14}{'peak KiB':>12}")
+    for stage, measures in results.items():
+        print(f"{stage:<26}{measures['items']:>10}{measures['seconds']:>12.4f}"
+              f"{measures['items_per_s']:>14.1f}{measures['peak_kib']:>12.1f}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as file:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(), "stages": results},
+                      file, indent=2)
+        print(f"Baseline saved in {args.baseline}")
+        return
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r') as file:
+            baseline = json.load(file)["stages"]
+
+        regressions = compare_with_baseline(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print("No regression with respect to the baseline.")
+
+
+if __name__ == "__main__":
+    main()
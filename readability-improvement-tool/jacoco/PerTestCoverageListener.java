@@ -0,0 +1,73 @@
+import java.io.File;
+import java.io.FileOutputStream;
+import java.io.IOException;
+import java.lang.reflect.Method;
+import java.nio.channels.FileLock;
+
+import org.junit.runner.Description;
+import org.junit.runner.notification.RunListener;
+
+/**
+ * JUnit listener giving each test method its own JaCoCo coverage session.
+ *
+ * The execution data collected by the JaCoCo agent is reset when a test starts and dumped when it
+ * finishes, so every test method produces its own exec file (target/jacoco-per-test/Class#method.exec)
+ * while all the tests still run in a single JVM.
+ *
+ * Resetting the agent removes the data from the exec file it writes when the JVM exits: every dump,
+ * the coverage collected between the tests included, is therefore also appended to that file
+ * (target/jacoco.exec, or the jacoco.pertest.destfile property), so that the aggregate report
+ * still covers the whole run. The agent must append to its file (append=true, the default).
+ *
+ * The agent is reached through reflection, so the listener does not need JaCoCo at compile time.
+ */
+public class PerTestCoverageListener extends RunListener {
+
+    private final File outputDir = new File(System.getProperty("jacoco.pertest.dir", "target/jacoco-per-test"));
+    private final File aggregateFile = new File(System.getProperty("jacoco.pertest.destfile", "target/jacoco.exec"));
+    private final Object agent;
+    private final Method getExecutionData;
+
+    public PerTestCoverageListener() {
+        try {
+            Class<?> rt = Class.forName("org.jacoco.agent.rt.RT");
+            agent = rt.getMethod("getAgent").invoke(null);
+            getExecutionData = Class.forName("org.jacoco.agent.rt.IAgent").getMethod("getExecutionData", boolean.class);
+        } catch (Exception e) {
+            throw new IllegalStateException("The JaCoCo agent is not attached to the test JVM", e);
+        }
+        outputDir.mkdirs();
+    }
+
+    @Override
+    public void testStarted(Description description) throws Exception {
+        // The coverage collected outside of the tests (class loading, static initializers, ...) only
+        // belongs to the aggregate report
+        appendToAggregate((byte[]) getExecutionData.invoke(agent, true));
+    }
+
+    @Override
+    public void testFinished(Description description) throws Exception {
+        byte[] data = (byte[]) getExecutionData.invoke(agent, true);
+        appendToAggregate(data);
+
+        File execFile = new File(outputDir, description.getClassName() + "#" + description.getMethodName() + ".exec");
+        try (FileOutputStream out = new FileOutputStream(execFile)) {
+            out.write(data);
+        } catch (IOException e) {
+            System.err.println("Unable to write " + execFile + ": " + e);
+        }
+    }
+
+    private void appendToAggregate(byte[] data) {
+        // Exec files are sequences of sessions: the report merges the appended dumps with the final
+        // dump of the agent. The lock is the one taken by the agent when it writes the file.
+        aggregateFile.getAbsoluteFile().getParentFile().mkdirs();
+        try (FileOutputStream out = new FileOutputStream(aggregateFile, true);
+             FileLock lock = out.getChannel().lock()) {
+            out.write(data);
+        } catch (IOException e) {
+            throw new IllegalStateException("Unable to append the coverage to " + aggregateFile, e);
+        }
+    }
+}
@@ -1,31 +1,65 @@
 import os
 import langchain_openai
 from dotenv import load_dotenv
-from langchain.chains import ConversationChain
-from langchain.memory import ConversationBufferWindowMemory
 from langchain_community.chat_models import BedrockChat
+from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_google_genai import ChatGoogleGenerativeAI
+import ClusterHelper as ch
+import LocalModelHelper as lmh
 import Parser as p
+import Telemetry as tm
 
-def improve_testsuite_readability(temperature, testsuite, class_information, sourcecode, case):
+
+# Models available for the "case" input selected by the user
+MODELS = {
+    1: "gpt-4",
+    2: "gpt-3.5-turbo",
+    3: "gemini-1.5-pro-001",
+    4: "meta.llama3-8b-instruct-v1:0",
+    5: "meta.llama3-70b-instruct-v1:0",
+    6: "anthropic.claude-3-haiku-20240307-v1:0",
+    7: "anthropic.claude-3-sonnet-20240229-v1:0",
+    8: "mistral.mistral-7b-instruct-v0:2",
+    9: "mistral.mixtral-8x7b-instruct-v0:1",
+    10: "amazon.titan-text-express-v1",
+    11: "mistral.mistral-large-2402-v1:0",
+    12: "local-gguf",
+}
+
+# Models running on the machine of the tool (see LocalModelHelper), the tests of a suite are submitted together
+LOCAL_CASES = {12}
+
+# Models returning several completions of the same prompt in a single request (OpenAI "n" parameter)
+MULTI_VARIANT_CASES = {1, 2}
+
+# Rounds of renaming requested when the rewritten tests have the same names
+DEDUPLICATION_ROUNDS = 3
+
+# Outcomes of a stage of the cascade: the request to the model failed, or the outcomes of the validation of the
+# rewritten test, in the order the checks are made (see validate_test)
+VALIDATION_OUTCOMES = ["request_failed", "accepted", "not_extracted", "not_parsable", "not_rename_only"]
+
+
+def select_llm(temperature, case):
     """
-    Improves the readability of a test suite by modifying the identifiers, test names, and variable names.
+    Defines the LLM based on the "case" input selected by the user.
 
     Args:
         temperature (int): The temperature setting for the LLM to control the creativity of the output.
-        testsuite (list): A list of test methods to be improved.
-        class_information (str): Information about the class being tested.
-        sourcecode (str): Source code of the class under test.
-        case (int): The identifier for selecting the LLM model to use.
+        case (int): The identifier for selecting the LLM model to use (see MODELS).
 
     Returns:
-        list: A list of modified test methods with improved readability.
+        BaseChatModel: The selected LLM.
     """
     # Load API keys from environment variables
     load_dotenv()
+
+    # The local model needs neither network nor API keys
+    if case in LOCAL_CASES:
+        return lmh.local_chat_model(temperature)
+
     api_key = os.environ['OPENAI_API_KEY']
 
-    # Define the LLM based on the "case" input selected by the user
     if case == 1:
         llm = langchain_openai.ChatOpenAI(openai_api_key=api_key,
                                           temperature=temperature,
@@ -100,39 +134,46 @@ def improve_testsuite_readability(temperature, testsuite, class_information, sou
                           })
         print("-------------MISTRAL LARGE USED-------------")
 
-    # List to hold modified test suite methods
-    modified_ts_array = []
+    return llm
+
+
+def context_prompt(class_information):
+    """
+    Builds the system prompt giving the instructions and the context of the class under test.
+
+    The prompt is identical for all the requests of a test suite and is sent first, so that the providers caching
+    prompt prefixes reuse it for every test. Only OpenAI does it automatically (prompts over 1024 tokens): the Bedrock
+    and Gemini models get no caching.
 
-    # Define conversation memory
-    memory = ConversationBufferWindowMemory(k=1)
-    conversation_buffer = ConversationChain(llm=llm,
-                                            memory=memory)
+    Args:
+        class_information (str): Information about the class being tested.
 
-    # Define the first prompt: INTENTION PROMPT
-    prompt1 = f"""You are a professional java programmer.
+    Returns:
+        str: The prompt.
+    """
+    return f"""You are a professional java programmer.
               The ultimate goal is to improve the readability of the test cases I will send 
               you, particularly by modifying the identifiers, test name and variable names. 
-              Thinking in steps:
-              1. Initially (this prompt), I will send you the general information of the class to give you the 
-              context and the aim of the class.
-              2. In the next prompt I will send you a single test of a test suite of which you need to improve 
+              Every message will contain a single test of a test suite of which you need to improve 
               the readability and the source code of the original class methods that were called in the test.
               
               General information of the class:
               
               {class_information}"""
 
-    # Initialize the conversation buffer with the intention prompt
-    conversation_buffer.predict(input=prompt1)
-    # Load memory variables for the conversation
-    memory.load_memory_variables({})
 
-    for single_test in testsuite:
-        # Extract all method calls used in the single test from the source code
-        sourcecode_test_calls = p.find_all_method_calls(single_test, sourcecode)
+def generation_prompt(single_test, sourcecode_test_calls):
+    """
+    Builds the second prompt (GENERATION PROMPT), asking to improve the readability of a single test.
+
+    Args:
+        single_test (str): The test to improve.
+        sourcecode_test_calls (str): Source code of the methods called in the test.
 
-        # Define the second prompt: GENERATION PROMPT
-        prompt2 = f"""Improve the readability of the test below by modifying ONLY the 
+    Returns:
+        str: The prompt.
+    """
+    return f"""Improve the readability of the test below by modifying ONLY the 
                   identifiers, test name and variable names, NOT THE FUNCTIONS CALLED 
                   INSIDE THE TESTS, STATIC METHOD OR CALLED STATIC CLASS. The changes must not affect the functioning 
                   of the test in any way.
@@ -147,48 +188,510 @@ def improve_testsuite_readability(temperature, testsuite, class_information, sou
                   
                   Answer with code only. Close all the brackets correctly."""
 
+
+def request(llm, context, prompt, callbacks):
+    """
+    Sends a prompt after the context of the test suite, without any conversation history.
+
+    Args:
+        llm (BaseChatModel): The LLM.
+        context (str): The system prompt of the test suite (see context_prompt).
+        prompt (str): The prompt.
+        callbacks (list): LangChain callbacks receiving the request.
+
+    Returns:
+        str: The text of the answer.
+    """
+    messages = [SystemMessage(content=context), HumanMessage(content=prompt)]
+
+    return llm.invoke(messages, config={"callbacks": callbacks}).content
+
+
+def improve_testsuite_readability(temperature, testsuite, class_information, sourcecode, case, labels=None,
+                                  callbacks=None, llm=None, cascade=None, stage_callbacks=None, stage_records=None,
+                                  reused=None, clustering=False):
+    """
+    Improves the readability of a test suite by modifying the identifiers, test names, and variable names.
+
+    Every test is sent in its own request, after the same context prompt (instructions and class information).
+
+    Args:
+        temperature (int): The temperature setting for the LLM to control the creativity of the output.
+        testsuite (list): A list of test methods to be improved.
+        class_information (str): Information about the class being tested.
+        sourcecode (str): Source code of the class under test.
+        case (int): The identifier for selecting the LLM model to use.
+        labels (dict): Attributes identifying the test suite in the telemetry (project, suite, repetition).
+        callbacks (list): LangChain callbacks receiving every request, a Telemetry.TelemetryCallbackHandler
+            by default.
+        llm (BaseChatModel): Model to use instead of the one selected by case (e.g. a mock in the benchmarks).
+        cascade (list): Cheaper models (cases) tried first, see improve_testsuite_readability_cascade.
+        stage_callbacks (dict): {case: callbacks} of the models of the cascade.
+        stage_records (list): Receives the outcome of every stage of the cascade.
+        reused (dict): {test index: rewritten test} of the tests rewritten by a previous run (see
+            FingerprintHelper), not sent again.
+        clustering (bool): Rewrite one test per cluster of near-duplicate tests, see
+            improve_testsuite_readability_clustered.
+
+    Returns:
+        list: A list of modified test methods with improved readability.
+    """
+    if clustering:
+        return improve_testsuite_readability_clustered(temperature, testsuite, class_information, sourcecode, case,
+                                                       labels, callbacks, llm, cascade, stage_callbacks,
+                                                       stage_records, reused)
+
+    if cascade:
+        return improve_testsuite_readability_cascade(temperature, testsuite, class_information, sourcecode,
+                                                     [*cascade, case], labels, stage_callbacks, stage_records,
+                                                     reused)
+
+    reused = reused or {}
+
+    llm = llm or select_llm(temperature, case)
+
+    # List to hold modified test suite methods
+    modified_ts_array = []
+
+    # Record latency and tokens of every request
+    labels = {"case": case, **(labels or {})}
+    callbacks = callbacks or [tm.TelemetryCallbackHandler(**labels)]
+
+    # Stable prefix of every request: instructions and class information
+    context = context_prompt(class_information)
+
+    if case in LOCAL_CASES:
+        # All the tests are queued together in the worker of the local model
+        pending = [test_index for test_index in range(len(testsuite)) if test_index not in reused]
+        prompts = [generation_prompt(testsuite[test_index], p.find_all_method_calls(testsuite[test_index], sourcecode))
+                   for test_index in pending]
+        with tm.span("llm.generation", tests=len(prompts), **labels):
+            answers = llm.batch([[SystemMessage(content=context), HumanMessage(content=prompt2)] for prompt2 in prompts],
+                                config={"callbacks": callbacks, "max_concurrency": lmh.MAX_BATCH_PROMPTS})
+
+        rewritten = {**reused, **{test_index: extract_test(answer.content, labels)
+                                  for test_index, answer in zip(pending, answers)}}
+        return deduplicate_tests([rewritten[test_index] for test_index in range(len(testsuite))],
+                                 lambda prompt: request(llm, context, prompt, callbacks),
+                                 labels)
+
+    for test_index, single_test in enumerate(testsuite):
+        # Rewritten by a previous run, neither the test nor its context changed since
+        if test_index in reused:
+            modified_ts_array.append(reused[test_index])
+            continue
+
+        # Extract all method calls used in the single test from the source code
+        with tm.span("parse.method_calls", **labels):
+            sourcecode_test_calls = p.find_all_method_calls(single_test, sourcecode)
+
+        # Define the variable suffix: GENERATION PROMPT
+        prompt2 = generation_prompt(single_test, sourcecode_test_calls)
+
         # Predict and process the prompt
-        conversation_buffer.predict(input=prompt2)
+        with tm.span("llm.generation", test=test_index, **labels):
+            answer = request(llm, context, prompt2, callbacks)
+
+        modified_ts_array.append(extract_test(answer, labels))
+
+    # Check for duplicates in modified test suites
+    deduplicate_tests(modified_ts_array,
+                      lambda prompt: request(llm, context, prompt, callbacks),
+                      labels)
+
+    return modified_ts_array
+
+
+def extract_test(answer, labels):
+    """
+    Extracts the rewritten test from the answer of the LLM.
+
+    Args:
+        answer (str): The text of the answer.
+        labels (dict): Attributes identifying the test suite in the telemetry.
+
+    Returns:
+        str: The test.
+    """
+    with tm.span("parse.extraction", **labels):
+        test_extracted = p.new_test_extraction(answer)
+
+    if test_extracted == "":
+        raise Exception("no test extracted from the response.")
+
+    return test_extracted
+
+
+def validate_test(original_test, answer):
+    """
+    Validates the answer of the LLM: the test must be extractable, parse as Java code and only rename identifiers
+    of the original test.
+
+    Args:
+        original_test (str): The test sent to the LLM.
+        answer (str): The text of the answer.
+
+    Returns:
+        tuple: (the extracted test, "" if none, the outcome of the validation, see VALIDATION_OUTCOMES).
+    """
+    test_extracted = p.new_test_extraction(answer)
+
+    if test_extracted == "":
+        return test_extracted, "not_extracted"
+    if not p.is_parsable_test(test_extracted):
+        return test_extracted, "not_parsable"
+    # The original test is compared without what follows its closing bracket, as the extracted one
+    if not p.is_rename_only(p.new_test_extraction(original_test), test_extracted):
+        return test_extracted, "not_rename_only"
+
+    return test_extracted, "accepted"
 
-        # Extract the improved test from the conversation buffer
-        test_extracted = p.new_test_extraction(
-            conversation_buffer.dict()["memory"]["chat_memory"]["messages"][-1]["content"])
 
+def improve_testsuite_readability_cascade(temperature, testsuite, class_information, sourcecode, cases, labels=None,
+                                          stage_callbacks=None, stage_records=None, reused=None):
+    """
+    Improves the readability of a test suite with a cascade of models: every test is sent to the first model, and
+    escalated to the next one when the request fails or the answer is not valid (see validate_test). The answer of
+    the last model is kept as long as a test can be extracted from it, and its errors are raised, as without cascade.
+
+    Args:
+        temperature (int): The temperature setting for the LLM to control the creativity of the output.
+        testsuite (list): A list of test methods to be improved.
+        class_information (str): Information about the class being tested.
+        sourcecode (str): Source code of the class under test.
+        cases (list): The models of the cascade, from the cheapest to the strongest.
+        labels (dict): Attributes identifying the test suite in the telemetry (project, suite, repetition).
+        stage_callbacks (dict): {case: LangChain callbacks receiving the requests of the model}, a
+            Telemetry.TelemetryCallbackHandler by default.
+        stage_records (list): Receives the outcome of every stage of every test (see UsageHelper.save_cascade).
+        reused (dict): {test index: rewritten test} of the tests rewritten by a previous run, not sent again.
+
+    Returns:
+        list: A list of modified test methods with improved readability.
+    """
+    labels = {**(labels or {})}
+    stage_callbacks = stage_callbacks or {}
+    stage_records = stage_records if stage_records is not None else []
+    reused = reused or {}
+    llms = {}
+
+    # Stable prefix of every request: instructions and class information
+    context = context_prompt(class_information)
+
+    def stage_request(stage_case, prompt):
+        if stage_case not in llms:
+            llms[stage_case] = select_llm(temperature, stage_case)
+        callbacks = stage_callbacks.setdefault(stage_case, [tm.TelemetryCallbackHandler(case=stage_case, **labels)])
+        return request(llms[stage_case], context, prompt, callbacks)
+
+    modified_ts_array = []
+
+    for test_index, single_test in enumerate(testsuite):
+        if test_index in reused:
+            modified_ts_array.append(reused[test_index])
+            continue
+
+        with tm.span("parse.method_calls", **labels):
+            sourcecode_test_calls = p.find_all_method_calls(single_test, sourcecode)
+
+        prompt2 = generation_prompt(single_test, sourcecode_test_calls)
+
+        for stage, stage_case in enumerate(cases):
+            try:
+                with tm.span("llm.generation", test=test_index, stage=stage, case=stage_case, **labels):
+                    answer = stage_request(stage_case, prompt2)
+            except Exception:
+                # A failing cheaper model (rate limit, timeout, ...) passes the test to the next one
+                if stage == len(cases) - 1:
+                    raise
+                answer = None
+
+            if answer is None:
+                test_extracted, outcome = "", "request_failed"
+            else:
+                with tm.span("parse.validation", **labels):
+                    test_extracted, outcome = validate_test(single_test, answer)
+
+            stage_records.append({**labels, "model": MODELS.get(stage_case), "case": stage_case, "stage": stage,
+                                  "test": test_index, "outcome": outcome})
+            tm.count(f"cascade.{outcome}", 1, stage=stage, case=stage_case, **labels)
+
+            if outcome == "accepted":
+                break
+
+        # The last model of the cascade is trusted as without cascade
         if test_extracted == "":
             raise Exception("no test extracted from the response.")
         modified_ts_array.append(test_extracted)
 
-    # Check for duplicates in modified test suites
-    if len(modified_ts_array) > 0:
-        duplicated_index = p.find_duplicate_tests(modified_ts_array)
-        k = 0
+    def deduplication_request(prompt):
+        # The renaming of the duplicated tests is simple enough for the first model, the last one answers if it fails
+        try:
+            return stage_request(cases[0], prompt)
+        except Exception:
+            return stage_request(cases[-1], prompt)
+
+    deduplicate_tests(modified_ts_array, deduplication_request, labels)
+
+    return modified_ts_array
+
+
+def deduplication_prompt(duplicated_tests):
+    """
+    Builds the prompt asking to rename tests having the same name.
 
-        while len(duplicated_index) != 0 or k == 3:
-            for index_list in duplicated_index:
-                # Join all the duplicated tests into a single string
-                tmp = "\n ".join(modified_ts_array[index] for index in index_list)
+    Args:
+        duplicated_tests (str): The tests having the same name.
 
-                prompt3 = f"""These tests have the same names, change them so they differ and their objective names remains 
+    Returns:
+        str: The prompt.
+    """
+    return f"""These tests have the same names, change them so they differ and their objective names remains 
                 clear, the content of the tests must remain exactly identical.
                 Answer with only code.
                 
                 Tests:
-                {tmp}
+                {duplicated_tests}
                 """
 
-                # Predict and process the prompt to resolve duplicates
-                conversation_buffer.predict(input=prompt3)
 
-                no_dupl_tests = p.java_methods_extraction(
-                    conversation_buffer.dict()["memory"]["chat_memory"]["messages"][-1]["content"])
+def deduplicate_tests(modified_ts_array, predict, labels):
+    """
+    Asks the LLM to rename the tests having the same name, for at most DEDUPLICATION_ROUNDS rounds.
+
+    Args:
+        modified_ts_array (list): The rewritten tests, updated in place.
+        predict (function): Sends a prompt to the LLM and returns the text of the answer.
+        labels (dict): Attributes identifying the test suite in the telemetry.
+
+    Returns:
+        list: The rewritten tests.
+    """
+    if len(modified_ts_array) == 0:
+        return modified_ts_array
+
+    duplicated_index = p.find_duplicate_tests(modified_ts_array)
+    k = 0
+
+    while len(duplicated_index) != 0 and k < DEDUPLICATION_ROUNDS:
+        for index_list in duplicated_index:
+            # Join all the duplicated tests into a single string
+            tmp = "\n ".join(modified_ts_array[index] for index in index_list)
 
-                for indexes, new_test in zip(index_list, no_dupl_tests):
-                    # Update modified test suite with the new test names
-                    modified_ts_array[indexes] = new_test
+            # Predict and process the prompt to resolve duplicates
+            with tm.span("llm.deduplication", tests=len(index_list), **labels):
+                answer = predict(deduplication_prompt(tmp))
 
-                k = k + 1
+            for indexes, new_test in zip(index_list, p.java_methods_extraction(answer)):
+                # Update modified test suite with the new test names
+                modified_ts_array[indexes] = new_test
 
-                # Re-check for duplicates
-                duplicated_index = p.find_duplicate_tests(modified_ts_array)
+        k = k + 1
+
+        # Re-check for duplicates
+        duplicated_index = p.find_duplicate_tests(modified_ts_array)
+        tm.count("llm.deduplication_rounds", 1, **labels)
 
     return modified_ts_array
+
+
+def naming_prompt(tests):
+    """
+    Builds the prompt asking only for the names of tests whose variables were already renamed.
+
+    Args:
+        tests (list): The tests.
+
+    Returns:
+        str: The prompt.
+    """
+    numbered_tests = "\n".join(f"Test {number}:\n{test}\n" for number, test in enumerate(tests, 1))
+
+    return f"""Give each test below a new name describing what it checks, the content of the tests must not change.
+                Answer with one line per test, in the format <test number>: <new test name>.
+                
+                {numbered_tests}
+                """
+
+
+def improve_testsuite_readability_clustered(temperature, testsuite, class_information, sourcecode, case, labels=None,
+                                            callbacks=None, llm=None, cascade=None, stage_callbacks=None,
+                                            stage_records=None, reused=None):
+    """
+    Improves the readability of a test suite rewriting only one test per cluster of near-duplicate tests (see
+    ClusterHelper.cluster_tests).
+
+    The representative of every cluster is rewritten first. Its variable names are then applied to the other tests
+    of the cluster, and their test names are asked in a single names-only request per cluster. The tests
+    too different from their representative (new generated variables, names clashing, invalid names, or a
+    representative not only renamed) get their own request, as without clustering.
+
+    Args:
+        temperature (int): The temperature setting for the LLM to control the creativity of the output.
+        testsuite (list): A list of test methods to be improved.
+        class_information (str): Information about the class being tested.
+        sourcecode (str): Source code of the class under test.
+        case (int): The identifier for selecting the LLM model to use.
+        labels (dict): Attributes identifying the test suite in the telemetry (project, suite, repetition).
+        callbacks (list): LangChain callbacks receiving every request.
+        llm (BaseChatModel): Model to use instead of the one selected by case.
+        cascade (list): Cheaper models (cases) tried first, also asked for the names.
+        stage_callbacks (dict): {case: callbacks} of the models of the cascade.
+        stage_records (list): Receives the outcome of every stage of the cascade.
+        reused (dict): {test index: rewritten test} of the tests rewritten by a previous run, not sent again.
+
+    Returns:
+        list: A list of modified test methods with improved readability.
+    """
+    reused = reused or {}
+
+    def rewrite(kept):
+        # The tests in kept are not sent to the LLM
+        return improve_testsuite_readability(temperature, testsuite, class_information, sourcecode, case, labels,
+                                             callbacks, llm, cascade, stage_callbacks, stage_records, kept)
+
+    pending = [test_index for test_index in range(len(testsuite)) if test_index not in reused]
+    with tm.span("parse.clustering", tests=len(pending), **(labels or {})) as span:
+        clusters = [[pending[position] for position in cluster]
+                    for cluster in ch.cluster_tests([testsuite[test_index] for test_index in pending])]
+        span["clusters"] = len(clusters)
+    members = {member for cluster in clusters for member in cluster[1:]}
+    if not members:
+        return rewrite(reused)
+
+    # The representatives first, the other tests of the clusters are kept as they are for now
+    first = rewrite({**reused, **{member: testsuite[member] for member in members}})
+
+    # The names are simple enough for the first model of the cascade
+    naming_case = cascade[0] if cascade else case
+    naming_llm = llm or select_llm(temperature, naming_case)
+    naming_callbacks = (stage_callbacks or {}).get(naming_case) if cascade else callbacks
+    naming_callbacks = naming_callbacks or [tm.TelemetryCallbackHandler(case=naming_case, **(labels or {}))]
+    context = context_prompt(class_information)
+
+    derived = {}
+    for cluster in clusters:
+        if len(cluster) == 1:
+            continue
+
+        # The names given to the variables of the representative, if it was only renamed
+        renames = p.rename_map(p.new_test_extraction(testsuite[cluster[0]]), first[cluster[0]])
+        if renames is None:
+            continue
+
+        candidates = {}
+        for member in cluster[1:]:
+            member_test = p.new_test_extraction(testsuite[member])
+            renamed_test = ch.derive_test(member_test, renames)
+            if renamed_test is not None:
+                candidates[member] = (member_test, renamed_test)
+        if not candidates:
+            continue
+
+        with tm.span("llm.naming", tests=len(candidates), **(labels or {})):
+            answer = request(naming_llm, context, naming_prompt([test for _, test in candidates.values()]),
+                             naming_callbacks)
+        names = p.test_names_extraction(answer)
+
+        for number, (member, (member_test, renamed_test)) in enumerate(candidates.items(), 1):
+            if number not in names:
+                continue
+            named_test = p.apply_renames(renamed_test, {}, names[number])
+            if named_test is not None and p.is_parsable_test(named_test) and p.is_rename_only(member_test, named_test):
+                derived[member] = named_test
+
+    tm.count("tests.derived", len(derived), **(labels or {}))
+    tm.count("tests.divergent", len(members) - len(derived), **(labels or {}))
+
+    # The tests not derived from their representative get their own request
+    return rewrite({**{test_index: first[test_index] for test_index in range(len(testsuite))
+                       if test_index not in members}, **derived})
+
+
+def sample_variants(llm, messages, variants, case, callbacks):
+    """
+    Samples several answers to the same conversation.
+
+    The models in MULTI_VARIANT_CASES return all the answers in a single request, the others (or the missing
+    answers) are requested one at a time.
+
+    Args:
+        llm (BaseChatModel): The LLM.
+        messages (list): The conversation.
+        variants (int): Number of answers.
+        case (int): The identifier of the model.
+        callbacks (list): LangChain callbacks receiving every request.
+
+    Returns:
+        list: The text of the answers.
+    """
+    answers = []
+    if case in MULTI_VARIANT_CASES:
+        result = llm.generate([messages], callbacks=callbacks, n=variants)
+        answers = [generation.text for generation in result.generations[0]]
+
+    while len(answers) < variants:
+        answers.append(llm.invoke(messages, config={"callbacks": callbacks}).content)
+
+    return answers[:variants]
+
+
+def improve_testsuite_readability_variants(temperature, testsuite, class_information, sourcecode, case, variants,
+                                           labels=None, callbacks=None, llm=None):
+    """
+    Improves the readability of a test suite several times, sampling all the variants of a test together.
+
+    Every test is sent after the same context prompt, so that the variants share the same conversation and are
+    requested in a single call for the models supporting it (see sample_variants).
+
+    Args:
+        temperature (int): The temperature setting for the LLM to control the creativity of the output.
+        testsuite (list): A list of test methods to be improved.
+        class_information (str): Information about the class being tested.
+        sourcecode (str): Source code of the class under test.
+        case (int): The identifier for selecting the LLM model to use.
+        variants (int): Number of rewritten test suites (one per repetition).
+        labels (dict): Attributes identifying the test suite in the telemetry (project, suite).
+        callbacks (list): LangChain callbacks receiving every request, a Telemetry.TelemetryCallbackHandler
+            by default.
+        llm (BaseChatModel): Model to use instead of the one selected by case (e.g. a mock in the benchmarks).
+
+    Returns:
+        list: One list of modified test methods per variant.
+    """
+    llm = llm or select_llm(temperature, case)
+
+    labels = {"case": case, **(labels or {})}
+    callbacks = callbacks or [tm.TelemetryCallbackHandler(**labels)]
+
+    # Stable prefix of every request: instructions and class information
+    context = context_prompt(class_information)
+
+    modified_ts_arrays = [[] for _ in range(variants)]
+
+    for test_index, single_test in enumerate(testsuite):
+        with tm.span("parse.method_calls", **labels):
+            sourcecode_test_calls = p.find_all_method_calls(single_test, sourcecode)
+
+        prompt2 = generation_prompt(single_test, sourcecode_test_calls)
+
+        with tm.span("llm.generation", test=test_index, variants=variants, **labels):
+            answers = sample_variants(llm,
+                                      [SystemMessage(content=context), HumanMessage(content=prompt2)],
+                                      variants,
+                                      case,
+                                      callbacks)
+
+        with tm.span("parse.extraction", **labels):
+            for modified_ts_array, answer in zip(modified_ts_arrays, answers):
+                test_extracted = p.new_test_extraction(answer)
+                if test_extracted == "":
+                    raise Exception("no test extracted from the response.")
+                modified_ts_array.append(test_extracted)
+
+    for variant, modified_ts_array in enumerate(modified_ts_arrays):
+        deduplicate_tests(modified_ts_array,
+                          lambda prompt: request(llm, context, prompt, callbacks),
+                          {**labels, "repetition": variant})
+
+    return modified_ts_arrays
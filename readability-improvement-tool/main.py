@@ -1,12 +1,30 @@
-import logging
+import time
 
 import streamlit as st
-import app as a
+import JobQueue as jq
 import Parser as p
 import Output_handler as oh
-import EmbeddingsHelper as eh
+import ProgressHelper as ph
+import pipeline as pl
+import UsageHelper as uh
+import langchainHelper as lch
 import os
 
+# Workers started with the tool (in addition to the ones started with JobQueue.py), 0 to only use external workers
+APP_WORKERS = int(os.environ.get("APP_WORKERS", 1))
+
+# Seconds between two refreshes of the progress of the running jobs
+REFRESH_INTERVAL_S = 3
+
+
+@st.cache_resource
+def background_workers():
+    # Started once per server, shared by all the sessions
+    return jq.start_workers(APP_WORKERS) if APP_WORKERS > 0 else None
+
+
+background_workers()
+
 # Project title and description
 st.title("Improve EvoSuite Test Suites Readability using LLM")
 st.text("IER is a tool that facilitates the enhancement of the readability of a Java \n"
@@ -26,13 +44,18 @@ st.markdown("""
 - **9:** mistral.mixtral-8x7b-instruct-v0:1
 - **10:** amazon.titan-text-express-v1
 - **11:** mistral.mistral-large-2402-v1:0
+- **12:** local GGUF model (LOCAL_MODEL_PATH, see README)
 """)
 
 # Selection part
 st.header("Inputs")
 
 case_selection = st.selectbox("Select the model:",
-                              (1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11))
+                              (1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12))
+
+# Cheaper models tried first, a test is sent to the selected model only when their rewrite is not valid
+cascade = st.multiselect("Cascade: cheaper models tried first (in order):",
+                         [case for case in lch.MODELS if case != case_selection])
 
 temperature = st.select_slider("Choose the temperature:",
                                options=[0, 1, 2],
@@ -49,6 +72,32 @@ repetition = st.number_input("How many times do you want to iterate?",
                              max_value=10,
                              step=1)
 
+# Per-test coverage attribution (requires the listener to be registered in the pom.xml, see README)
+per_test_coverage = st.checkbox("Collect the coverage of every single test")
+
+# All the repetitions of a test are requested together (in a single request for the OpenAI models)
+multi_variant = st.checkbox("Generate all the repetitions of a test together")
+
+# Tests unchanged since a previous run on the same output path are not sent again
+incremental = st.checkbox("Reuse the rewrites of the tests unchanged since a previous run")
+
+# Near-duplicate tests are derived from one rewritten test of their cluster, only their names are requested
+clustering = st.checkbox("Rewrite one test per cluster of near-duplicate tests")
+
+# Estimate of the tokens, cost and LLM time of the run before starting it
+if st.button("Estimate"):
+    if not (case_selection and projects_paths):
+        st.error("Insert the model and the projects paths to estimate the run.")
+    else:
+        paths = [f'/Users{s.strip()}' for s in projects_paths.split('/Users') if s.strip()]
+        previous_usage = [os.path.join(output_path + p.extract_project_name(path), uh.USAGE_FILENAME)
+                          for path in paths] if output_path else []
+        estimate = uh.estimate_run(paths, case_selection, repetition, previous_usage)
+        cost = "unknown cost" if estimate["cost_usd"] is None else f"{estimate['cost_usd']:.2f} USD"
+        st.info(f"{estimate['model']}: about {estimate['requests']} requests, {estimate['tokens_in']} prompt tokens "
+                f"and {estimate['tokens_out']} completion tokens, {cost} and "
+                f"{estimate['duration_s'] / 60:.0f} minutes of LLM time (Maven excluded).")
+
 # Submit button
 if st.button("Submit"):
     # Check every field are not empty
@@ -60,89 +109,90 @@ if st.button("Submit"):
         if not folder_res:
             st.error(message)
         else:
-            # MAIN LOOP OF THE TOOL
-
             # Extract paths from the user input
             paths = [f'/Users{s.strip()}' for s in projects_paths.split('/Users') if s.strip()]
 
-            for path in paths:
-                # Extract the project name from the path
-                project_name = p.extract_project_name(path)
-
-                # Initial Jacoco information
-                # Copy the initial test suite files to preserve the original state
-                oh.copy_initial_files(path + "/src/test/java",
-                                      output_path + project_name + "/evosuite")
-
-                # Run Jacoco to get initial coverage
-                oh.run_jacoco(path)
-
-                # Save Jacoco results in the specified output path
-                oh.save_jacoco_csv(os.path.join(output_path + project_name, "jacocoresults"),
-                                   os.path.join(path, "target/site/jacoco/jacoco.csv"),
-                                   -1)
-
-                i = 0
-                while i < repetition:
-                    try:
-                        # Extract test suites and source code
-                        path_tsuites = p.extract_testsuites_from_path(path)  # {filename: content}
-                        path_sourcec = p.extract_sourcecode_from_testsuite(path, path_tsuites)  # {source filename: content}
-
-                        # Generate new test suite based on the provided models and temperature
-                        for tsuite_key, source_key in zip(path_tsuites, path_sourcec):
-                            testsuite = path_tsuites[tsuite_key]
-                            sourcecode = path_sourcec[source_key]
-
-                            result = a.improve_test_readability(temperature,
-                                                                sourcecode,
-                                                                testsuite,
-                                                                tsuite_key,
-                                                                output_path,
-                                                                case_selection,
-                                                                project_name,
-                                                                i)
-
-                            if result == 1:
-                                st.success(f"{tsuite_key} test suite modified successfully.")
-                            else:
-                                st.error(
-                                    f"""{tsuite_key} test suite not modified successfully. \n Exception: {result}""")
-
-                        # Replace modified test suites in the project to prepare for Jacoco execution
-                        oh.replace_files(os.path.join(path, "src/test/java"),
-                                         os.path.join(output_path + project_name, str(i)))
-
-                        # Run Jacoco on the modified test suite
-                        oh.run_jacoco(path)
-
-                        # Save the results of the Jacoco coverage
-                        oh.save_jacoco_csv(os.path.join(output_path + project_name, "jacocoresults"),
-                                           os.path.join(path, "target/site/jacoco/jacoco.csv"),
-                                           i)
-
-                        # Restore the project to its initial state for the next iteration
-                        oh.replace_files(os.path.join(path, "src/test/java"),
-                                         os.path.join(output_path + project_name, "evosuite"))
-
-                        i += 1
-                    except Exception as e:
-                        # Log the error and retry
-                        logging.error(f"Error occurred: {e}. Retrying...")
-
-                        # Restore the project to its initial state in case of an error
-                        oh.replace_files(os.path.join(path, "src/test/java"),
-                                         os.path.join(output_path + project_name, "evosuite"))
-
-                        continue
-
-                    # Compare the CSV files to verify if the identifier modifications affected the coverage
-                    oh.compare_jacoco_csv(os.path.join(output_path + project_name, "jacocoresults"),
-                                          os.path.join(output_path + project_name))
-
-                    # Final replacement to restore the project to its initial state
-                    oh.replace_files(os.path.join(path, "src/test/java"),
-                                     os.path.join(output_path + project_name, "evosuite"))
-
-            # Perform cosine similarity analysis of the embeddings
-            eh.embeddings_cosine_similarity(output_path, projects_paths, repetition)
+            # One job per project, run by the workers (see JobQueue.py): the session only follows their progress
+            options = {"per_test_coverage": per_test_coverage, "multi_variant": multi_variant, "cascade": cascade,
+                       "incremental": incremental, "clustering": clustering}
+            try:
+                pl.check_options(options)
+            except ValueError as e:
+                st.error(str(e))
+            else:
+                job_ids = [jq.submit(path, output_path, case_selection, temperature, repetition, options)
+                           for path in paths]
+                st.session_state.setdefault("job_ids", []).extend(job_ids)
+                st.success(f"{len(job_ids)} jobs queued ({', '.join(map(str, job_ids))}).")
+
+# Progress of the jobs submitted in this session, read from the job database and from the traces of the runs
+if st.session_state.get("job_ids"):
+    st.header("Jobs")
+    auto_refresh = st.checkbox("Refresh automatically", value=True)
+    st.button("Refresh")
+
+    jobs = jq.list_jobs(st.session_state["job_ids"])
+    st.table([{"job": job["id"], "project": p.extract_project_name(job["project_path"]).strip('/'),
+               "status": job["status"], "worker": job["worker"], "error": job["error"]} for job in jobs])
+
+    # {job id: ProgressHelper.RunProgress}, each poll only reads the new records of the trace
+    progress = st.session_state.setdefault("progress", {})
+
+    for job in jobs:
+        if job["trace_path"] and (job["id"] not in progress or progress[job["id"]].trace_path != job["trace_path"]):
+            progress[job["id"]] = ph.RunProgress(job["trace_path"])
+        if job["id"] not in progress:
+            continue
+
+        run = progress[job["id"]]
+        run.poll()
+        suites = run.suite_table()
+        metrics = run.metrics()
+
+        st.subheader(f"Job {job['id']}: {p.extract_project_name(job['project_path']).strip('/')} ({job['status']})")
+        if len(suites) > 0 and suites["tests"].notna().all():
+            st.progress(min(suites["done"].sum() / suites["tests"].sum(), 1.0),
+                        text=f"{suites['done'].sum()} / {suites['tests'].sum()} tests of the started suites")
+
+        columns = st.columns(4)
+        columns[0].metric("Tests per minute", metrics["tests_per_minute"] or "-")
+        columns[1].metric("LLM latency p50 / p90 (s)",
+                          f"{metrics.get('llm_latency_p50_s', '-')} / {metrics.get('llm_latency_p90_s', '-')}")
+        columns[2].metric("LLM latency p99 (s)", metrics.get("llm_latency_p99_s", "-"))
+        columns[3].metric("Maven runs (mean s)", f"{metrics['maven_runs']} ({metrics['maven_mean_s'] or '-'})")
+
+        st.dataframe(suites, hide_index=True,
+                     column_config={"progress": st.column_config.ProgressColumn("progress", min_value=0, max_value=1)})
+
+        with st.expander("Messages"):
+            for level, message in jq.job_messages(job["id"]):
+                getattr(st, level, st.info)(message)
+            st.info(f"Run trace saved in {job['trace_path']}")
+
+        # Where the time of the run went, once it is finished
+        if run.summary:
+            with st.expander("Stage timings"):
+                st.table([{"stage": name, **timing} for name, timing in run.summary["stages"].items()])
+                st.json(run.summary["counters"])
+
+    finished = [job for job in jobs if job["status"] in ("done", "failed")]
+    if finished:
+        project_outputs = [job["output_path"] + p.extract_project_name(job["project_path"]) for job in finished]
+
+        # Tokens and cost of the finished jobs per model, project, suite and repetition
+        usage = uh.read_usage([os.path.join(project_output, uh.USAGE_FILENAME) for project_output in project_outputs])
+        if len(usage) > 0:
+            st.subheader("Token usage")
+            st.dataframe(uh.summarize_usage(usage))
+
+        # Success rate of every stage of the cascade
+        cascade_summary = uh.summarize_cascade([os.path.join(project_output, uh.CASCADE_FILENAME)
+                                                for project_output in project_outputs])
+        if len(cascade_summary) > 0:
+            st.subheader("Cascade stages")
+            st.dataframe(cascade_summary)
+
+    # Poll again while jobs are queued or running: every rerun of the page returns quickly, the page never blocks
+    if auto_refresh and any(job["status"] in ("queued", "running") for job in jobs):
+        time.sleep(REFRESH_INTERVAL_S)
+        st.rerun()
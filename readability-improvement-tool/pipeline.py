@@ -0,0 +1,263 @@
+import logging
+import os
+
+import app as a
+import ClassInformationHelper as ci
+import CoverageHelper as ch
+import EmbeddingsHelper as eh
+import FingerprintHelper as fh
+import Output_handler as oh
+import Parser as p
+import Telemetry as tm
+import langchainHelper as lch
+
+
+def log_report(level, message):
+    """
+    Default report of run_project, writing the messages in the log.
+
+    Args:
+        level (str): "success", "error" or "info".
+        message (str): The message.
+
+    Returns:
+        None
+    """
+    if level == "error":
+        logging.error(message)
+    else:
+        logging.info(message)
+
+
+# Options of run_project that only apply when the repetitions are generated one at a time
+PER_REPETITION_OPTIONS = ("cascade", "incremental", "clustering")
+
+
+def check_options(options):
+    """
+    Checks that options of run_project can be used together.
+
+    Args:
+        options (dict): Options of run_project (per_test_coverage, multi_variant, cascade, incremental, clustering).
+
+    Returns:
+        None
+
+    Raises:
+        ValueError: If all the repetitions of a test are generated together with options that only apply to one
+            repetition at a time.
+    """
+    if options.get("multi_variant"):
+        conflicting = [name for name in PER_REPETITION_OPTIONS if options.get(name)]
+        if conflicting:
+            raise ValueError(f"Generating all the repetitions of a test together cannot be combined with "
+                             f"{', '.join(conflicting)}.")
+
+
+def run_project(path, output_path, case, temperature, repetition, per_test_coverage=False, multi_variant=False,
+                cascade=None, incremental=False, clustering=False, report=log_report):
+    """
+    Improves the readability of the test suites of a project once per repetition, measuring the coverage of the
+    original and of every modified test suite, then computes the similarity of the repetitions.
+
+    The test sources of the project are replaced during the run and restored at the end: a project must not be
+    used by two runs at the same time (see JobQueue).
+
+    Args:
+        path (str): The root path of the project.
+        output_path (str): The output folder of the tool.
+        case (int): The identifier for selecting the LLM model to use.
+        temperature (int): The temperature setting for the LLM to control the creativity of the output.
+        repetition (int): Number of repetitions.
+        per_test_coverage (bool): Collect the coverage of every single test.
+        multi_variant (bool): Generate all the repetitions of a test together.
+        cascade (list): Cheaper models (cases) tried before the selected one.
+        incremental (bool): Reuse the rewrites of the tests unchanged since a previous run (see FingerprintHelper).
+        clustering (bool): Rewrite one test per cluster of near-duplicate tests (see ClusterHelper).
+        report (function): Receives the progress messages, report(level, message).
+
+    Returns:
+        None
+
+    Raises:
+        ValueError: If the options cannot be used together (see check_options).
+    """
+    check_options({"multi_variant": multi_variant, "cascade": cascade, "incremental": incremental,
+                   "clustering": clustering})
+
+    # Extract the project name from the path
+    project_name = p.extract_project_name(path)
+    with tm.span("project", project=project_name.strip('/')):
+        # Parse the classes under test in parallel ahead of the LLM stage, the summaries are cached in the output
+        ci.prebuild(output_path, [path])
+
+        # Initial Jacoco information
+        # Copy the initial test suite files to preserve the original state
+        oh.copy_initial_files(path + "/src/test/java",
+                              output_path + project_name + "/evosuite")
+
+        # Run Jacoco to get initial coverage
+        oh.run_jacoco(path, per_test_coverage)
+
+        # Save Jacoco results in the specified output path
+        oh.save_jacoco_csv(os.path.join(output_path + project_name, "jacocoresults"),
+                           os.path.join(path, "target/site/jacoco/jacoco.csv"),
+                           -1)
+        if per_test_coverage:
+            ch.save_per_test_coverage(os.path.join(output_path + project_name, "jacocoresults"), path, -1)
+
+        # Generate the test suites of all the repetitions before running Jacoco on each of them
+        variants_generated = set()  # repetitions whose test suites were generated with all the variants
+        if multi_variant and repetition > 1:
+            try:
+                with tm.span("variants", project=project_name.strip('/'), repetitions=repetition):
+                    # The repetition folders are not used until all their test suites are written again
+                    for rep in range(repetition):
+                        oh.discard_export(os.path.join(output_path + project_name, str(rep)))
+
+                    path_tsuites = p.extract_testsuites_from_path(path)
+                    path_sourcec = p.extract_sourcecode_from_testsuite(path, path_tsuites)
+
+                    for tsuite_key, source_key in zip(path_tsuites, path_sourcec):
+                        results = a.improve_test_readability_variants(temperature,
+                                                                      path_sourcec[source_key],
+                                                                      path_tsuites[tsuite_key],
+                                                                      tsuite_key,
+                                                                      output_path,
+                                                                      case,
+                                                                      project_name,
+                                                                      repetition)
+                        # The export raises on failure
+                        for rep in range(len(results)):
+                            report("success", f"{tsuite_key} test suite modified successfully "
+                                              f"(repetition {rep}).")
+                variants_generated = set(range(repetition))
+            except Exception as e:
+                # Fall back to one generation per repetition
+                report("error", f"Error occurred while generating the variants: {e}. "
+                                f"Generating one repetition at a time...")
+
+        i = 0
+        while i < repetition:
+            try:
+                with tm.span("repetition", project=project_name.strip('/'), repetition=i):
+                    # The test suites were already generated with all the variants
+                    if i not in variants_generated:
+                        # The repetition folder is not used until all its test suites are written again
+                        oh.discard_export(os.path.join(output_path + project_name, str(i)))
+
+                        # Rewrites staged by a run of the repetition that stopped before succeeding
+                        if incremental:
+                            fh.FingerprintStore(output_path + project_name).discard_repetition(i)
+
+                        # Extract test suites and source code
+                        path_tsuites = p.extract_testsuites_from_path(path)  # {filename: content}
+                        path_sourcec = p.extract_sourcecode_from_testsuite(path, path_tsuites)  # {source filename: content}
+
+                        # Generate new test suite based on the provided models and temperature
+                        for tsuite_key, source_key in zip(path_tsuites, path_sourcec):
+                            testsuite = path_tsuites[tsuite_key]
+                            sourcecode = path_sourcec[source_key]
+
+                            a.improve_test_readability(temperature,
+                                                       sourcecode,
+                                                       testsuite,
+                                                       tsuite_key,
+                                                       output_path,
+                                                       case,
+                                                       project_name,
+                                                       i,
+                                                       cascade,
+                                                       incremental,
+                                                       clustering)
+
+                            # The generation and the export raise on failure, reported by the retry below
+                            report("success", f"{tsuite_key} test suite modified successfully.")
+
+                    # Flush all the test suites of the repetition and write its manifest
+                    oh.commit_export(os.path.join(output_path + project_name, str(i)))
+
+                    # Replace modified test suites in the project to prepare for Jacoco execution, only with the
+                    # committed test suites
+                    oh.replace_files(os.path.join(path, "src/test/java"),
+                                     os.path.join(output_path + project_name, str(i)),
+                                     committed=True)
+
+                    # Run Jacoco on the modified test suite
+                    oh.run_jacoco(path, per_test_coverage)
+
+                    # Save the results of the Jacoco coverage
+                    oh.save_jacoco_csv(os.path.join(output_path + project_name, "jacocoresults"),
+                                       os.path.join(path, "target/site/jacoco/jacoco.csv"),
+                                       i)
+                    if per_test_coverage:
+                        ch.save_per_test_coverage(os.path.join(output_path + project_name, "jacocoresults"),
+                                                  path, i)
+
+                    # The rewrites of the repetition compiled and ran: the next runs can reuse them
+                    if incremental:
+                        fh.FingerprintStore(output_path + project_name).commit_repetition(i)
+
+                    # Restore the project to its initial state for the next iteration
+                    oh.replace_files(os.path.join(path, "src/test/java"),
+                                     os.path.join(output_path + project_name, "evosuite"))
+
+                i += 1
+            except ch.ListenerNotConfiguredError:
+                # Retrying cannot register the listener: the run fails
+                oh.replace_files(os.path.join(path, "src/test/java"),
+                                 os.path.join(output_path + project_name, "evosuite"))
+                raise
+            except Exception as e:
+                tm.count("repetitions.retried", 1, project=project_name.strip('/'), repetition=i)
+
+                # The pre-generated variant of the repetition failed (e.g. it breaks the build): the retry generates
+                # the repetition again instead of reusing the same test suites
+                variants_generated.discard(i)
+
+                # The retry must not get the same rewrites back from the fingerprints of the failed repetition
+                if incremental:
+                    fh.FingerprintStore(output_path + project_name).discard_repetition(i)
+
+                # Report the error and retry
+                report("error", f"Repetition {i} failed: {e}. Retrying...")
+
+                # Restore the project to its initial state in case of an error
+                oh.replace_files(os.path.join(path, "src/test/java"),
+                                 os.path.join(output_path + project_name, "evosuite"))
+
+                continue
+
+        # Compare the coverage of every repetition with the original one to verify if the identifier
+        # modifications affected the coverage
+        coverage_diffs = oh.compare_jacoco_csv(os.path.join(output_path + project_name, "jacocoresults"),
+                                               os.path.join(output_path + project_name),
+                                               repetition)
+        for rep, rep_diffs in coverage_diffs.groupby("rep"):
+            not_measured = rep_diffs["status"] == "not_measured"
+            if not_measured.any():
+                report("error", f"{project_name}: the coverage of repetition {rep} was not measured "
+                                f"({', '.join(rep_diffs.loc[not_measured, 'element'])})")
+            if not not_measured.all():
+                report("error", f"{project_name}: the coverage of repetition {rep} changed for "
+                                f"{', '.join(rep_diffs.loc[~not_measured, 'element'].unique())}")
+
+        # Compare the coverage of every single test with the one of the test it replaced
+        if per_test_coverage:
+            for changed in ch.compare_per_test_results(os.path.join(output_path + project_name,
+                                                                    "jacocoresults"),
+                                                       os.path.join(output_path + project_name)):
+                report("error", f"{project_name}: in repetition {changed['rep']} the coverage of "
+                                f"{changed['suite']}.{changed['modified_test']} differs from "
+                                f"{changed['original_test']}")
+
+        # Final replacement to restore the project to its initial state
+        oh.replace_files(os.path.join(path, "src/test/java"),
+                         os.path.join(output_path + project_name, "evosuite"))
+
+        # Remove the test suites of the previous runs no longer used by any folder
+        oh.prune_blobs(output_path + project_name)
+
+    # Perform cosine similarity analysis of the embeddings
+    with tm.span("embeddings", project=project_name.strip('/')):
+        eh.embeddings_cosine_similarity(output_path, path, repetition, lch.MODELS.get(case))
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The modules of the tool import each other by name, as when it runs from its folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
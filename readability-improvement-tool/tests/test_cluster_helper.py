@@ -0,0 +1,74 @@
+import os
+
+import ClusterHelper as ch
+import Parser as p
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "classes-readability-survey")
+
+
+def corpus_tests(project, suite):
+    with open(os.path.join(CORPUS, project, "test-evosuite", suite + "_ESTest.java"), encoding="utf-8") as file:
+        return [p.new_test_extraction(method) for method in p.java_methods_extraction(file.read())]
+
+
+def rewrite(test):
+    # Stands for the answer of the model: every declared name renamed
+    return p.apply_renames(test, {name: name.rstrip("0123456789") + "Renamed" for name in p.variable_names(test)},
+                           "testRewritten")
+
+
+def test_cluster_tests_puts_the_representative_first():
+    tests = corpus_tests("commons-cli", "PatternOptionBuilder")
+    clusters = ch.cluster_tests(tests)
+
+    assert sorted(index for cluster in clusters for index in cluster) == list(range(len(tests)))
+    assert all(cluster == sorted(cluster) for cluster in clusters)
+    assert any(len(cluster) > 1 for cluster in clusters)
+
+
+def test_derive_test_from_the_representative_of_a_corpus_suite():
+    tests = corpus_tests("commons-cli", "PatternOptionBuilder")
+
+    members = 0
+    for cluster in ch.cluster_tests(tests):
+        representative = tests[cluster[0]]
+        renames = p.rename_map(representative, rewrite(representative))
+        assert renames is not None
+
+        for member in cluster[1:]:
+            derived = ch.derive_test(tests[member], renames)
+            assert derived is not None
+            assert p.is_rename_only(tests[member], derived)
+            assert p.extract_test_name(derived) == p.extract_test_name(tests[member])
+            assert p.variable_names(derived) <= set(renames.values())
+            members += 1
+
+    assert members > 0
+
+
+def test_derive_test_rejects_a_member_with_other_variables():
+    representative = "public void test0() { String string0 = \"a\"; assertNotNull(string0); }"
+    member = "public void test1() { String string0 = \"b\"; String string1 = string0.trim(); assertNotNull(string1); }"
+    renames = p.rename_map(representative, representative.replace("string0", "text"))
+
+    assert ch.derive_test(member, renames) is None
+
+
+def test_apply_renames_keeps_static_receivers():
+    test = "public void test0() { boolean boolean0 = StringUtils.isEmpty(\"\"); assertTrue(boolean0); }"
+
+    assert p.apply_renames(test, {"boolean0": "empty", "StringUtils": "utils"}, "testIsEmpty") == \
+        "public void testIsEmpty() { boolean empty = StringUtils.isEmpty(\"\"); assertTrue(empty); }"
+
+
+def test_apply_renames_with_unicode_escapes():
+    test = "public void test0() { String s\\u00e9 = \"caf\\u00e9\"; String string0 = s\\u00e9.trim(); }"
+
+    assert p.apply_renames(test, {"sé": "accented", "string0": "trimmed"}) == \
+        "public void test0() { String accented = \"caf\\u00e9\"; String trimmed = accented.trim(); }"
+
+
+def test_apply_renames_rejects_clashing_names():
+    test = "public void test0() { String string0 = \"a\"; String string1 = string0.trim(); }"
+
+    assert p.apply_renames(test, {"string1": "string0"}) is None
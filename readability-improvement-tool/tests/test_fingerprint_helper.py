@@ -0,0 +1,44 @@
+import FingerprintHelper as fh
+
+TEST = "public void test0() { String string0 = \"a\"; assertNotNull(string0); }"
+
+
+def test_fingerprint_depends_on_the_generation_mode():
+    single = fh.model_config(2, 0, [6])
+    clustered = fh.model_config(2, 0, [6], clustering=True)
+
+    assert single["generation"] == "single" and clustered["generation"] == "clustered"
+    assert fh.test_fingerprint(TEST, "", single, 0) != fh.test_fingerprint(TEST, "", clustered, 0)
+
+
+def test_fingerprint_depends_on_the_test_the_model_and_the_repetition():
+    config = fh.model_config(2, 0)
+    fingerprint = fh.test_fingerprint(TEST, "", config, 0)
+
+    assert fingerprint == fh.test_fingerprint(TEST, "", fh.model_config(2, 0), 0)
+    assert fingerprint != fh.test_fingerprint(TEST.replace('"a"', '"b"'), "", config, 0)
+    assert fingerprint != fh.test_fingerprint(TEST, "", fh.model_config(1, 0), 0)
+    assert fingerprint != fh.test_fingerprint(TEST, "", fh.model_config(2, 1), 0)
+    assert fingerprint != fh.test_fingerprint(TEST, "", config, 1)
+
+
+def test_staged_rewrites_are_reused_only_after_their_repetition_succeeded(tmp_path):
+    store = fh.FingerprintStore(str(tmp_path))
+
+    store.stage_many({"a": "rewrite a", "b": "rewrite b"}, 0)
+    assert store.get_many(["a", "b"]) == {}
+
+    store.commit_repetition(0)
+    assert store.get_many(["a", "b"]) == {"a": "rewrite a", "b": "rewrite b"}
+
+
+def test_failed_repetition_discards_its_rewrites(tmp_path):
+    store = fh.FingerprintStore(str(tmp_path))
+    store.put_many({"a": "previous a", "c": "previous c"})
+
+    store.stage_many({"a": "rewrite a", "b": "rewrite b"}, 1)
+    store.discard_repetition(1)
+    store.commit_repetition(1)
+
+    # The rewrite reused by the failed repetition is not reused again
+    assert store.get_many(["a", "b", "c"]) == {"c": "previous c"}
@@ -0,0 +1,83 @@
+from contextlib import closing
+
+import pytest
+
+import JobQueue as jq
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "jobs.sqlite")
+
+
+def submit(db_path, project_path, options=None):
+    return jq.submit(project_path, "output/", 1, 0, 2, options=options, db_path=db_path)
+
+
+def test_jobs_are_claimed_in_submission_order(db_path):
+    first = submit(db_path, "projects/commons-cli")
+    second = submit(db_path, "projects/commons-lang", {"cascade": True})
+
+    job = jq.claim_job("worker-1", db_path)
+    # the claimed job is returned as it was queued (attempts counts the previous attempts)
+    assert (job["id"], job["attempts"]) == (first, 0)
+    job = jq.list_jobs([first], db_path=db_path)[0]
+    assert (job["status"], job["worker"], job["attempts"]) == ("running", "worker-1", 1)
+    job = jq.claim_job("worker-2", db_path)
+    assert (job["id"], job["options"]) == (second, {"cascade": True})
+    assert jq.claim_job("worker-3", db_path) is None
+
+
+def test_a_project_runs_one_job_at_a_time(db_path):
+    first = submit(db_path, "projects/commons-cli")
+    second = submit(db_path, "projects/commons-cli")
+    other = submit(db_path, "projects/commons-lang")
+
+    assert jq.claim_job("worker-1", db_path)["id"] == first
+    # the second job of the locked project is skipped, not the jobs of other projects
+    assert jq.claim_job("worker-2", db_path)["id"] == other
+    assert jq.claim_job("worker-2", db_path) is None
+
+    jq.finish_job(first, db_path=db_path)
+    assert jq.claim_job("worker-2", db_path)["id"] == second
+    assert [job["status"] for job in jq.list_jobs(db_path=db_path)] == ["done", "running", "running"]
+
+
+def test_failed_job_unlocks_its_project(db_path):
+    first = submit(db_path, "projects/commons-cli")
+    second = submit(db_path, "projects/commons-cli")
+    jq.claim_job("worker-1", db_path)
+
+    jq.finish_job(first, error="RuntimeError('build failed')", db_path=db_path)
+
+    assert jq.list_jobs([first], db_path=db_path)[0]["status"] == "failed"
+    assert jq.claim_job("worker-1", db_path)["id"] == second
+
+
+def test_stale_job_is_queued_again(db_path):
+    job_id = submit(db_path, "projects/commons-cli")
+    jq.claim_job("worker-1", db_path)
+
+    # a heartbeat keeps the job and the lock of its project
+    jq.heartbeat(job_id, db_path)
+    assert jq.claim_job("worker-2", db_path) is None
+
+    with closing(jq.connect(db_path)) as connection:
+        connection.execute("UPDATE jobs SET heartbeat_at = heartbeat_at - ? WHERE id = ?",
+                           (jq.STALE_JOB_S + 1, job_id))
+
+    job = jq.claim_job("worker-2", db_path)
+    # run_job restores the test suites of the interrupted attempt
+    assert (job["id"], job["attempts"]) == (job_id, 1)
+    job = jq.list_jobs([job_id], db_path=db_path)[0]
+    assert (job["status"], job["worker"], job["attempts"]) == ("running", "worker-2", 2)
+    with closing(jq.connect(db_path)) as connection:
+        locks = [tuple(row) for row in connection.execute("SELECT project_path, job_id FROM project_locks")]
+    assert locks == [("projects/commons-cli", job_id)]
+
+
+def test_submit_rejects_conflicting_options(db_path):
+    with pytest.raises(ValueError):
+        submit(db_path, "projects/commons-cli", {"multi_variant": True, "clustering": True})
+
+    assert jq.list_jobs(db_path=db_path) == []
@@ -0,0 +1,81 @@
+import os
+import re
+
+import pytest
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+import Parser as p
+import langchainHelper as lch
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "classes-readability-survey")
+
+
+class RecordingModel(BaseChatModel):
+    """
+    Answers every test with the same test name, so that the suite needs de-duplication requests, and records the
+    messages of every request.
+    """
+    requests: list = []
+
+    @property
+    def _llm_type(self):
+        return "recording"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.requests.append(messages)
+        prompt = messages[-1].content
+        if "Test to modify:" in prompt:
+            test = prompt.split("Test to modify:")[1].split("-----")[0]
+            answer = re.sub(r"void test\d+", "void testSame", test)
+        elif "Tests:" in prompt:
+            answer = prompt.split("Tests:")[1]
+        else:
+            # Names-only request of the clustered tests
+            tests = len(re.findall(r"^\s*Test \d+:", prompt, re.MULTILINE))
+            answer = "\n".join(f"{number}: testNamed{number}" for number in range(1, tests + 1))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=answer))])
+
+
+def corpus_suite():
+    folder = os.path.join(CORPUS, "commons-cli")
+    with open(os.path.join(folder, "test-evosuite", "Options_ESTest.java"), encoding="utf-8") as file:
+        testsuite = p.java_methods_extraction(file.read())[:12]
+    with open(os.path.join(folder, "Options.java"), encoding="utf-8") as file:
+        sourcecode = file.read()
+
+    return testsuite, p.fill_sourcecode_memory(sourcecode), p.class_information_extraction(sourcecode)
+
+
+def system_messages(requests):
+    assert all(isinstance(messages[0], SystemMessage) and len(messages) == 2 for messages in requests)
+    return [messages[0].content for messages in requests]
+
+
+def is_deduplication(messages):
+    return "have the same names" in messages[-1].content
+
+
+@pytest.mark.parametrize("clustering", [False, True])
+def test_system_message_is_identical_for_every_test_and_deduplication(clustering):
+    testsuite, sourcecode, class_information = corpus_suite()
+    model = RecordingModel(requests=[])
+
+    lch.improve_testsuite_readability(0, testsuite, class_information, sourcecode, 2, llm=model,
+                                      clustering=clustering)
+
+    assert any(is_deduplication(messages) for messages in model.requests)
+    assert set(system_messages(model.requests)) == {lch.context_prompt(class_information)}
+
+
+def test_system_message_is_identical_across_the_models_of_a_cascade(monkeypatch):
+    testsuite, sourcecode, class_information = corpus_suite()
+    models = {case: RecordingModel(requests=[]) for case in (6, 2)}
+    monkeypatch.setattr(lch, "select_llm", lambda temperature, case: models[case])
+
+    lch.improve_testsuite_readability(0, testsuite, class_information, sourcecode, 2, cascade=[6])
+
+    requests = models[6].requests + models[2].requests
+    assert any(is_deduplication(messages) for messages in requests)
+    assert set(system_messages(requests)) == {lch.context_prompt(class_information)}
@@ -0,0 +1,117 @@
+import pytest
+
+import Output_handler as oh
+
+REPORT = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<report name="project">
+  <package name="org/example">
+    <class name="org/example/Options" sourcefilename="Options.java">
+      <method name="addOption" desc="(Ljava/lang/String;)Lorg/example/Options;" line="10">
+        <counter type="INSTRUCTION" missed="{missed}" covered="{covered}"/>
+        <counter type="LINE" missed="0" covered="2"/>
+        <counter type="METHOD" missed="0" covered="1"/>
+      </method>
+      <method name="addOption" desc="(Lorg/example/Option;)Lorg/example/Options;" line="10">
+        <counter type="INSTRUCTION" missed="0" covered="7"/>
+        <counter type="LINE" missed="0" covered="1"/>
+        <counter type="METHOD" missed="0" covered="1"/>
+      </method>
+      <counter type="INSTRUCTION" missed="0" covered="19"/>
+    </class>
+    <sourcefile name="Options.java">
+      <counter type="INSTRUCTION" missed="0" covered="19"/>
+    </sourcefile>
+  </package>
+</report>
+"""
+
+
+def write_report(tmp_path, name, missed=0, covered=12):
+    path = tmp_path / name
+    path.write_text(REPORT.format(missed=missed, covered=covered))
+    return str(path)
+
+
+def specific_table(path):
+    return oh.read_xml_coverage_table(path).to_pandas().set_index(oh.SPECIFIC_KEYS)
+
+
+def test_read_xml_coverage_table(tmp_path):
+    table = oh.read_xml_coverage_table(write_report(tmp_path, "jacoco.xml"))
+
+    assert table.schema == oh.XML_COVERAGE_SCHEMA
+    rows = table.to_pylist()
+    assert [row["desc"] for row in rows] == ["(Ljava/lang/String;)Lorg/example/Options;",
+                                              "(Lorg/example/Option;)Lorg/example/Options;"]
+    assert rows[0]["sourcefile"] == "Options.java"
+    assert rows[0]["classname"] == "org/example/Options"
+    assert rows[0]["line_nr"] == 10
+    assert (rows[0]["instr_missed"], rows[0]["instr_covered"]) == (0, 12)
+    # Counters missing from the report and the class totals are not read
+    assert rows[0]["comp_missed"] is None
+    assert rows[1]["instr_covered"] == 7
+
+
+def test_overloads_on_the_same_line_have_their_own_key(tmp_path):
+    assert specific_table(write_report(tmp_path, "jacoco.xml")).index.is_unique
+
+
+def test_diff_coverage_of_identical_reports(tmp_path):
+    original = specific_table(write_report(tmp_path, "original.xml"))
+    current = specific_table(write_report(tmp_path, "current.xml"))
+
+    assert oh.diff_coverage(original, current).empty
+
+
+def test_diff_coverage_reports_the_changed_overload(tmp_path):
+    original = specific_table(write_report(tmp_path, "original.xml"))
+    current = specific_table(write_report(tmp_path, "current.xml", missed=3, covered=9))
+
+    diff = oh.diff_coverage(original, current)
+
+    assert diff.to_dict("records") == [{
+        "element": "org/example/Options.addOption.(Ljava/lang/String;)Lorg/example/Options;.10",
+        "status": "changed",
+        "changes": "instr_missed: 0 -> 3; instr_covered: 12 -> 9",
+    }]
+
+
+def test_diff_coverage_reports_missing_and_added_elements(tmp_path):
+    table = specific_table(write_report(tmp_path, "original.xml"))
+
+    diff = oh.diff_coverage(table, table.iloc[:1])
+    assert diff[["element", "status"]].values.tolist() == [
+        ["org/example/Options.addOption.(Lorg/example/Option;)Lorg/example/Options;.10", "missing"]]
+
+    diff = oh.diff_coverage(table.iloc[:1], table)
+    assert diff["status"].tolist() == ["added"]
+
+
+def save_tables(folder, rep, xml_path):
+    # The aggregate table is only read by the comparison, a single class is enough
+    name = "original" if rep == -1 else rep
+    oh.pq.write_table(oh.pa.table({"PACKAGE": ["org.example"], "CLASS": ["Options"], "INSTRUCTION_COVERED": [19]}),
+                      str(folder / f"jacoco_{name}.parquet"))
+    oh.extract_xml_coverage_info(xml_path, str(folder / f"jacoco_{name}_xml.parquet"))
+
+
+def test_extract_xml_coverage_info_raises_on_a_truncated_report(tmp_path):
+    path = tmp_path / "jacoco.xml"
+    path.write_text(REPORT.format(missed=0, covered=12)[:400])
+
+    with pytest.raises(oh.ET.ParseError):
+        oh.extract_xml_coverage_info(str(path))
+    assert not (tmp_path / "jacoco_xml.parquet").exists()
+
+
+def test_compare_jacoco_csv_fails_a_repetition_without_coverage(tmp_path):
+    results = tmp_path / "jacocoresults"
+    results.mkdir()
+    save_tables(results, -1, write_report(tmp_path, "original.xml"))
+    save_tables(results, 0, write_report(tmp_path, "current.xml"))
+
+    diffs = oh.compare_jacoco_csv(str(results), str(tmp_path), repetitions=2)
+
+    assert diffs[["rep", "report", "status"]].values.tolist() == [[1, "aggregate", "not_measured"],
+                                                                  [1, "specific", "not_measured"]]
+    assert (tmp_path / "comparison_results_specific.txt").read_text() == "0: True\n1: False\n"
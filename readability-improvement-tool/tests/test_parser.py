@@ -0,0 +1,67 @@
+import Parser as p
+
+TEST = """public void test0() throws Throwable {
+  String[] stringArray0 = new String[3];
+  stringArray0[2] = "a";
+  boolean boolean0 = StringUtils.isEmpty(stringArray0[2]);
+  try {
+    StringUtils.join(stringArray0, null);
+  } catch (IllegalArgumentException e) {
+    Runnable runnable0 = () -> stringArray0.clone();
+  }
+  assertFalse(boolean0);
+}"""
+
+
+def test_declared_names():
+    assert p.declared_names(TEST) == {"stringArray0", "boolean0", "e", "runnable0"}
+
+
+def test_declared_names_of_lambdas():
+    test = "public void test1() { Function<String, Integer> function0 = s -> s.length(); " \
+           "BiFunction<String, String, Integer> biFunction0 = (a, b) -> 1; }"
+
+    assert p.declared_names(test) == {"function0", "s", "biFunction0", "a", "b"}
+
+
+def test_declared_names_of_unparsable_test():
+    assert p.declared_names("public void test0() { int = ; }") == set()
+
+
+def test_rename_map_of_renamed_variables():
+    modified = TEST.replace("test0", "testIsEmpty").replace("stringArray0", "values") \
+        .replace("boolean0", "empty").replace(" e)", " exception)")
+
+    assert p.rename_map(TEST, modified) == {"test0": "testIsEmpty", "stringArray0": "values", "boolean0": "empty",
+                                             "e": "exception", "runnable0": "runnable0"}
+
+
+def test_rename_map_allows_renaming_indexed_arrays():
+    assert p.is_rename_only(TEST, TEST.replace("stringArray0", "values"))
+
+
+def test_rename_map_rejects_renaming_a_static_receiver():
+    assert p.is_parsable_test(TEST.replace("StringUtils", "stringUtilities"))
+    assert not p.is_rename_only(TEST, TEST.replace("StringUtils", "stringUtilities"))
+
+
+def test_rename_map_rejects_renaming_methods_and_types():
+    assert not p.is_rename_only(TEST, TEST.replace("isEmpty", "isBlank"))
+    assert not p.is_rename_only(TEST, TEST.replace("String[]", "Object[]"))
+
+
+def test_rename_map_rejects_merged_names():
+    assert p.rename_map(TEST, TEST.replace("boolean0", "stringArray0")) is None
+
+
+def test_rename_map_rejects_hiding_a_class():
+    assert p.rename_map(TEST, TEST.replace("boolean0", "StringUtils")) is None
+
+
+def test_rename_map_rejects_other_changes():
+    assert p.rename_map(TEST, TEST.replace('"a"', '"b"')) is None
+    assert p.rename_map(TEST, TEST.replace("assertFalse(boolean0);", "")) is None
+
+
+def test_variable_names():
+    assert p.variable_names(TEST) == {"stringArray0", "boolean0", "e", "runnable0"}
@@ -0,0 +1,21 @@
+import pytest
+
+import pipeline as pl
+
+
+@pytest.mark.parametrize("option", ["cascade", "incremental", "clustering"])
+def test_check_options_rejects_per_repetition_options_with_variants(option):
+    with pytest.raises(ValueError, match=option):
+        pl.check_options({"multi_variant": True, option: [6] if option == "cascade" else True})
+
+
+def test_check_options_accepts_compatible_options():
+    pl.check_options({"multi_variant": True, "per_test_coverage": True, "cascade": [], "incremental": False})
+    pl.check_options({"cascade": [6], "incremental": True, "clustering": True})
+
+
+def test_run_project_rejects_conflicting_options_before_touching_the_project(tmp_path):
+    with pytest.raises(ValueError):
+        pl.run_project(str(tmp_path / "missing-project"), str(tmp_path) + "/", 2, 0, 2, multi_variant=True,
+                       incremental=True)
+    assert list(tmp_path.iterdir()) == []